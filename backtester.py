@@ -0,0 +1,520 @@
+import argparse
+import contextlib
+import csv
+import heapq
+import importlib.util
+import io
+import itertools
+import json
+import os
+import time
+import traceback
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import data_cache
+from datamodel import ConversionObservation, Listing, Observation, OrderDepth, Trade, TradingState
+from matching import match_orders
+
+# Replays the island-data-bottle CSVs through a strategy file's Trader, one tick at a time.
+# Usage: python backtester.py <strategy file> <round> [--days D ...] [--names] [--passive] [--cached] [--budget-ms MS] [--report FILE] [--profile time|memory]
+# A round of "3+4" replays round 3 and round 4 days side by side (day 0 with day 1, ...),
+# which is the product set round 5 traded. --cached reads the memory-mapped arrays built by
+# data_cache.py instead of parsing the CSVs, and also passes the cached round 2 observations
+# to run() as ORCHIDS ConversionObservations, settling the conversions it returns.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_POSITION_LIMITS = {
+    "AMETHYSTS": 20,
+    "STARFRUIT": 20,
+    "ORCHIDS": 100,
+    "CHOCOLATE": 250,
+    "STRAWBERRIES": 350,
+    "ROSES": 60,
+    "GIFT_BASKET": 60,
+    "COCONUT": 300,
+    "COCONUT_COUPON": 600
+}
+
+# The platform kills run() somewhere past this, see the round 5 lambda timeouts
+DEFAULT_BUDGET_MS = 900
+
+# Number of equal slices of the day that latency growth is reported over
+LATENCY_BUCKETS = 10
+
+
+def load_strategy(path):
+    # Strategy files are named like round5-joshlee.py, so they can't be imported by name
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0].replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def day_files(round_num: int, names: bool = False) -> List[Tuple[int, str, str]]:
+    # (day, prices path, trades path) for every day of a round, trades with names come from the round 5 bottle
+    data_dir = os.path.join(ROOT, f"round-{round_num}-island-data-bottle")
+    days = []
+
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.startswith(f"prices_round_{round_num}_day_"):
+            continue
+        day = int(filename[len(f"prices_round_{round_num}_day_"):-len(".csv")])
+
+        if names:
+            trades_path = os.path.join(ROOT, "round-5-island-data-bottle", f"trades_round_{round_num}_day_{day}_wn.csv")
+        else:
+            trades_path = os.path.join(data_dir, f"trades_round_{round_num}_day_{day}_nn.csv")
+
+        days.append((day, os.path.join(data_dir, filename), trades_path))
+
+    return sorted(days)
+
+
+def read_csv(path: str) -> Iterator[Dict[str, str]]:
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f, delimiter=";")
+        if "product" not in reader.fieldnames and "symbol" not in reader.fieldnames:
+            raise ValueError(path + " holds observations only, there is no order book to replay")
+        yield from reader
+
+
+def iter_books(prices_path: str) -> Iterator[Tuple[int, Dict[str, OrderDepth], Dict[str, float]]]:
+    # (timestamp, order depths, mid prices) per tick, streamed from a prices CSV
+    for timestamp, tick_rows in itertools.groupby(read_csv(prices_path), key=lambda row: int(row["timestamp"])):
+        order_depths, mids = {}, {}
+
+        for row in tick_rows:
+            order_depth = OrderDepth()
+            for level in (1, 2, 3):
+                if row[f"bid_price_{level}"]:
+                    order_depth.buy_orders[int(float(row[f"bid_price_{level}"]))] = int(float(row[f"bid_volume_{level}"]))
+                if row[f"ask_price_{level}"]:
+                    order_depth.sell_orders[int(float(row[f"ask_price_{level}"]))] = -int(float(row[f"ask_volume_{level}"]))
+
+            order_depths[row["product"]] = order_depth
+            mids[row["product"]] = float(row["mid_price"])
+
+        yield timestamp, order_depths, mids
+
+
+def iter_trades(trades_path: str) -> Iterator[Tuple[int, List[Trade]]]:
+    for timestamp, rows in itertools.groupby(read_csv(trades_path), key=lambda row: int(row["timestamp"])):
+        yield timestamp, [Trade(row["symbol"], int(float(row["price"])), int(row["quantity"]), row["buyer"], row["seller"], timestamp) for row in rows]
+
+
+def tagged(key, timestamps: List[int], rows: List[tuple]) -> Iterator[Tuple[int, str, tuple]]:
+    for timestamp, row in zip(timestamps, rows):
+        yield timestamp, key, row
+
+
+def iter_cached_books(round_num: int, day: int) -> Iterator[Tuple[int, Dict[str, OrderDepth], Dict[str, float]]]:
+    # Same ticks as iter_books, read from the data_cache arrays of that round and day
+    rows = []
+    for product in data_cache.products(round_num, day):
+        prices = data_cache.load_prices(round_num, day, product)
+        rows.append(tagged(product, prices["timestamp"].tolist(), prices.tolist()))
+
+    col = {name: idx for idx, name in enumerate(data_cache.PRICE_DTYPE.names)}
+    levels = [(col[f"bid_price_{level}"], col[f"bid_volume_{level}"], col[f"ask_price_{level}"], col[f"ask_volume_{level}"]) for level in (1, 2, 3)]
+
+    for timestamp, tick_rows in itertools.groupby(heapq.merge(*rows, key=lambda row: row[0]), key=lambda row: row[0]):
+        order_depths, mids = {}, {}
+
+        for _, product, row in tick_rows:
+            order_depth = OrderDepth()
+            # Missing levels are cached as price 0
+            for bid_price, bid_volume, ask_price, ask_volume in levels:
+                if row[bid_price]:
+                    order_depth.buy_orders[row[bid_price]] = row[bid_volume]
+                if row[ask_price]:
+                    order_depth.sell_orders[row[ask_price]] = -row[ask_volume]
+
+            order_depths[product] = order_depth
+            mids[product] = row[col["mid_price"]]
+
+        yield timestamp, order_depths, mids
+
+
+def iter_cached_trades(round_num: int, day: int, names: bool = False) -> Iterator[Tuple[int, List[Trade]]]:
+    trader_names = data_cache.trade_names(round_num, day, names)
+    rows = []
+    for symbol in data_cache.day_index(round_num, day).get("trades_wn" if names else "trades_nn", {}):
+        trades = data_cache.load_trades(round_num, day, symbol, names)
+        rows.append(tagged(symbol, trades["timestamp"].tolist(), trades.tolist()))
+
+    for timestamp, tick_rows in itertools.groupby(heapq.merge(*rows, key=lambda row: row[0]), key=lambda row: row[0]):
+        yield timestamp, [Trade(symbol, price, quantity, trader_names[buyer], trader_names[seller], timestamp) for _, symbol, (_, price, quantity, buyer, seller) in tick_rows]
+
+
+def iter_ticks(files: List[Tuple[str, str]]) -> Iterator[Tuple[int, Dict[str, OrderDepth], Dict[str, List[Trade]], Dict[str, float], Dict[str, List[Trade]]]]:
+    # Merges one or more (prices, trades) pairs into a single stream of
+    # (timestamp, order depths, market trades, mid prices, prints). Prints are the trades
+    # printed during this tick, they are delivered as market trades with the next tick.
+    return merge_ticks([iter_books(prices_path) for prices_path, _ in files], [iter_trades(trades_path) for _, trades_path in files])
+
+
+def iter_cached_ticks(round_days: List[Tuple[int, int]], names: bool = False) -> Iterator[Tuple[int, Dict[str, OrderDepth], Dict[str, List[Trade]], Dict[str, float], Dict[str, List[Trade]]]]:
+    # iter_ticks over the data_cache arrays of one or more (round, day) pairs
+    return merge_ticks([iter_cached_books(round_num, day) for round_num, day in round_days], [iter_cached_trades(round_num, day, names) for round_num, day in round_days])
+
+
+def cached_observations(round_days: List[Tuple[int, int]]) -> Dict[int, Observation]:
+    # Timestamp -> Observation from the data_cache observations of the (round, day) pairs that
+    # have them (round 2). The files only hold one ORCHIDS price, so it is both the bid and ask.
+    observations = {}
+    for round_num, day in round_days:
+        if "observations" not in data_cache.day_index(round_num, day):
+            continue
+        for timestamp, price, transport_fees, export_tariff, import_tariff, sunlight, humidity in data_cache.load_observations(round_num, day)[
+                ["timestamp", "ORCHIDS", "TRANSPORT_FEES", "EXPORT_TARIFF", "IMPORT_TARIFF", "SUNLIGHT", "HUMIDITY"]].tolist():
+            observations[timestamp] = Observation({}, {"ORCHIDS": ConversionObservation(price, price, transport_fees, export_tariff, import_tariff, sunlight, humidity)})
+    return observations
+
+
+def convert(conversions: int, observation: Observation, position: Dict[str, int], cash: Dict[str, float]) -> int:
+    # Settles run()'s conversion request against the tick's conversion observations, returns
+    # the units converted. Like the exchange, conversions only bring a position back towards
+    # flat: a short buys at askPrice + transportFees + importTariff, a long sells at
+    # bidPrice - transportFees - exportTariff, up to abs(conversions) units. The sign is
+    # ignored since the position decides the direction.
+    if not conversions or len(observation.conversionObservations) != 1:
+        return 0
+    (product, o), = observation.conversionObservations.items()
+    units = min(abs(int(conversions)), abs(position.get(product, 0)))
+    if not units:
+        return 0
+
+    if position[product] < 0:
+        position[product] += units
+        cash[product] = cash.get(product, 0.0) - units * (o.askPrice + o.transportFees + o.importTariff)
+    else:
+        position[product] -= units
+        cash[product] = cash.get(product, 0.0) + units * (o.bidPrice - o.transportFees - o.exportTariff)
+    return units
+
+
+def merge_ticks(book_streams, trade_streams):
+    books = heapq.merge(*book_streams, key=lambda tick: tick[0])
+    trades = heapq.merge(*trade_streams, key=lambda tick: tick[0])
+    pending = next(trades, None)
+    market_trades = {}
+
+    for timestamp, ticks in itertools.groupby(books, key=lambda tick: tick[0]):
+        order_depths, mids = {}, {}
+        for _, tick_depths, tick_mids in ticks:
+            order_depths.update(tick_depths)
+            mids.update(tick_mids)
+
+        prints = {}
+        while pending is not None and pending[0] <= timestamp:
+            for trade in pending[1]:
+                prints.setdefault(trade.symbol, []).append(trade)
+            pending = next(trades, None)
+
+        yield timestamp, order_depths, market_trades, mids, prints
+        market_trades = prints
+
+
+class NullWriter(io.TextIOBase):
+    # Swallows the strategy's print() output, which would otherwise dominate replay time
+    def write(self, s):
+        return len(s)
+
+
+class PlatformLog:
+    # Writes a replay in the platform's log format: "Sandbox logs" with each tick's run() output
+    # as lambdaLog, then the "Activities log" (book and pnl per product per tick) and the
+    # "Trade History". log_replay.py reads it back like a log downloaded from the platform.
+    def __init__(self, path: str, day: int):
+        self.file = open(path, "w")
+        self.day = day
+        self.activities = []
+        self.trades = []
+        self.file.write("Sandbox logs:\n")
+
+    def tick(self, timestamp: int, output: str, order_depths: Dict[str, OrderDepth], mids: Dict[str, float], pnl_by_product: Dict[str, float], trades: List[Trade]):
+        self.file.write(json.dumps({"sandboxLog": "", "lambdaLog": output, "timestamp": timestamp}, indent=2) + "\n")
+
+        for product, order_depth in order_depths.items():
+            book = order_depth.book
+            bids, asks = list(book.buy_orders.items()), list(book.sell_orders.items())
+            levels = []
+            for side, sign in ((bids, 1), (asks, -1)):
+                for level in range(3):
+                    levels += [str(side[level][0]), str(sign * side[level][1])] if level < len(side) else ["", ""]
+            self.activities.append(";".join([str(self.day), str(timestamp), product] + levels + [str(mids.get(product, "")), str(pnl_by_product.get(product, 0.0))]))
+
+        self.trades.extend({"timestamp": trade.timestamp, "buyer": trade.buyer, "seller": trade.seller, "symbol": trade.symbol, "currency": "SEASHELLS", "price": trade.price, "quantity": trade.quantity} for trade in trades)
+
+    def close(self):
+        self.file.write("\n\n\nActivities log:\n")
+        self.file.write("day;timestamp;product;bid_price_1;bid_volume_1;bid_price_2;bid_volume_2;bid_price_3;bid_volume_3;ask_price_1;ask_volume_1;ask_price_2;ask_volume_2;ask_price_3;ask_volume_3;mid_price;profit_and_loss\n")
+        self.file.write("\n".join(self.activities))
+        self.file.write("\n\n\n\n\nTrade History:\n")
+        self.file.write(json.dumps(self.trades, indent=2))
+        self.file.close()
+
+
+def percentile(sorted_values: List[int], pct: float) -> int:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def latency_report(latencies_ns: List[int], timestamps: List[int], budget_ms: float) -> dict:
+    # Summarises per-tick run() latency: percentiles, ticks over budget, and how latency grows with
+    # the tick index. A positive slope means run() gets slower as the day goes on, e.g. O(t) state.
+    n = len(latencies_ns)
+    ordered = sorted(latencies_ns)
+    budget_ns = budget_ms * 1e6
+
+    buckets = []
+    for bucket in range(LATENCY_BUCKETS):
+        chunk = latencies_ns[bucket * n // LATENCY_BUCKETS:(bucket + 1) * n // LATENCY_BUCKETS]
+        if chunk:
+            buckets.append(round(sum(chunk) / len(chunk) / 1e6, 4))
+
+    # Least squares slope of latency against tick index
+    slope = 0.0
+    if n > 1:
+        mean_idx = (n - 1) / 2
+        mean_latency = sum(latencies_ns) / n
+        cov = sum((idx - mean_idx) * (latency - mean_latency) for idx, latency in enumerate(latencies_ns))
+        var = sum((idx - mean_idx) ** 2 for idx in range(n))
+        slope = cov / var
+
+    return {
+        "p50_ms": percentile(ordered, 50) / 1e6,
+        "p95_ms": percentile(ordered, 95) / 1e6,
+        "p99_ms": percentile(ordered, 99) / 1e6,
+        "max_ms": (ordered[-1] if ordered else 0) / 1e6,
+        "mean_ms": (sum(ordered) / n if n else 0) / 1e6,
+        "budget_ms": budget_ms,
+        "over_budget": [{"timestamp": timestamp, "ms": latency / 1e6} for timestamp, latency in zip(timestamps, latencies_ns) if latency > budget_ns],
+        "bucket_mean_ms": buckets,
+        "growth_ns_per_tick": round(slope, 3)
+    }
+
+
+def replay_day(trader, ticks, limits: Dict[str, int], budget_ms: float = DEFAULT_BUDGET_MS, passive: bool = False, orders_log: list = None,
+               platform_log: PlatformLog = None, trader_data: str = "", start_position: Dict[str, int] = None, hedges: Dict[str, List[str]] = None,
+               observations: Dict[int, Observation] = None) -> dict:
+    # passive: orders left after crossing the book also trade against the tick's market prints
+    # orders_log: gets (timestamp, orders) appended every tick, orders is None when run() raised
+    # platform_log: also write the replay as a platform log, with run()'s output
+    # trader_data, start_position: state to start from when ticks begin mid-day. The pnl then
+    # includes the starting position, marked at the mid prices.
+    # hedges: hedged product -> hedging products, their pnl and drawdown is reported with and
+    # without the hedging products' pnl
+    # observations: timestamp -> Observation passed to run(), see cached_observations. Ticks
+    # without one get empty observations and their conversions are dropped.
+    position = {product: 0 for product in limits}
+    position.update(start_position or {})
+    cash = {product: 0.0 for product in limits}
+    last_mids = {}
+    own_trades = {}
+    listings = {}
+    num_ticks, errors, first_error, converted = 0, 0, None, 0
+    no_observation = Observation({}, {})
+    peak_pnl, max_drawdown = 0.0, 0.0
+    # hedged product -> [unhedged peak, unhedged drawdown, hedged peak, hedged drawdown]
+    hedge_drawdowns = {product: [0.0, 0.0, 0.0, 0.0] for product in hedges or {}}
+    latencies_ns, timestamps = [], []
+    sink = NullWriter()
+
+    start = time.perf_counter()
+    for timestamp, order_depths, market_trades, mids, prints in ticks:
+        for product in order_depths:
+            if product not in listings:
+                listings[product] = Listing(product, product, "SEASHELLS")
+                position.setdefault(product, 0)
+                cash.setdefault(product, 0.0)
+
+        observation = observations.get(timestamp, no_observation) if observations else no_observation
+        state = TradingState(trader_data, timestamp, listings, order_depths, own_trades, market_trades, dict(position), observation)
+
+        if platform_log is not None:
+            sink = io.StringIO()
+
+        tick_start = time.perf_counter_ns()
+        try:
+            with contextlib.redirect_stdout(sink):
+                orders, conversions, trader_data = trader.run(state)
+            logged = orders
+        except Exception:
+            # The exchange drops the tick's orders when run() raises, state carries over unchanged
+            orders, conversions, logged = {}, 0, None
+            errors += 1
+            first_error = first_error or traceback.format_exc()
+        latencies_ns.append(time.perf_counter_ns() - tick_start)
+        timestamps.append(timestamp)
+        if orders_log is not None:
+            orders_log.append((timestamp, logged))
+
+        fills = match_orders(orders, order_depths, position, limits, prints if passive else None)
+        own_trades = {}
+        for product, product_fills in fills.items():
+            position[product] += int(product_fills[:, 1].sum())
+            cash[product] -= float((product_fills[:, 0] * product_fills[:, 1]).sum())
+            own_trades[product] = [Trade(product, int(price), int(abs(qty)), "SUBMISSION" if qty > 0 else "", "" if qty > 0 else "SUBMISSION", timestamp) for price, qty in product_fills]
+        converted += convert(conversions, observation, position, cash)
+
+        last_mids.update(mids)
+        num_ticks += 1
+
+        # Mark to market every tick for the drawdown, products without a mid yet count at 0
+        pnl = sum(cash.values()) + sum(qty * last_mids[product] for product, qty in position.items() if qty and product in last_mids)
+        peak_pnl = max(peak_pnl, pnl)
+        max_drawdown = max(max_drawdown, peak_pnl - pnl)
+
+        for product, drawdowns in hedge_drawdowns.items():
+            unhedged = mark_to_market(product, cash, position, last_mids)
+            hedged = unhedged + sum(mark_to_market(hedge, cash, position, last_mids) for hedge in hedges[product])
+            drawdowns[0] = max(drawdowns[0], unhedged)
+            drawdowns[1] = max(drawdowns[1], drawdowns[0] - unhedged)
+            drawdowns[2] = max(drawdowns[2], hedged)
+            drawdowns[3] = max(drawdowns[3], drawdowns[2] - hedged)
+
+        if platform_log is not None:
+            tick_pnl = {product: cash[product] + position[product] * last_mids[product] for product in order_depths if product in last_mids}
+            platform_log.tick(timestamp, sink.getvalue(), order_depths, mids, tick_pnl, [trade for trades in prints.values() for trade in trades] + [trade for trades in own_trades.values() for trade in trades])
+    elapsed = time.perf_counter() - start
+
+    # Mark open positions to the last mid price
+    pnl_by_product = {product: cash[product] + position[product] * last_mids.get(product, 0.0) for product in cash if product in last_mids}
+
+    hedge_report = {}
+    for product, drawdowns in hedge_drawdowns.items():
+        unhedged = pnl_by_product.get(product, 0.0)
+        hedge_report[product] = {
+            "hedged_by": hedges[product],
+            "unhedged_pnl": unhedged,
+            "hedged_pnl": unhedged + sum(pnl_by_product.get(hedge, 0.0) for hedge in hedges[product]),
+            "unhedged_max_drawdown": drawdowns[1],
+            "hedged_max_drawdown": drawdowns[3]
+        }
+
+    return {
+        "ticks": num_ticks,
+        "seconds": elapsed,
+        "pnl": sum(pnl_by_product.values()),
+        "pnl_by_product": pnl_by_product,
+        "max_drawdown": max_drawdown,
+        "hedges": hedge_report,
+        "position": {product: qty for product, qty in position.items() if qty != 0},
+        "converted": converted,
+        "errors": errors,
+        "first_error": first_error,
+        "latency": latency_report(latencies_ns, timestamps, budget_ms),
+        # Section timings of a Trader that profiles its run() (round 5 with profile set)
+        "profile": trader.profiler.report() if getattr(trader, "profiler", None) is not None else {}
+    }
+
+
+def mark_to_market(product: str, cash: Dict[str, float], position: Dict[str, int], mids: Dict[str, float]) -> float:
+    return cash.get(product, 0.0) + position.get(product, 0) * mids.get(product, 0.0)
+
+
+def hedged_products(trader_class) -> Dict[str, List[str]]:
+    # Hedged product -> products hedging it, if the Trader declares any
+    hedged = getattr(trader_class, "hedged_products", None)
+    return hedged() if hedged is not None else {}
+
+
+def position_limits(trader_class) -> Dict[str, int]:
+    limits = dict(DEFAULT_POSITION_LIMITS)
+    limits.update(getattr(trader_class, "POSITION_LIMITS", {}))
+    return limits
+
+
+def cached_day_groups(rounds: List[int]) -> List[List[Tuple[int, int]]]:
+    # The (round, day) pairs replayed side by side, one list per day of the first round
+    return [list(day_group) for day_group in zip(*[[(round_num, day) for day in data_cache.days(round_num)] for round_num in rounds])]
+
+
+def day_streams(rounds: List[int], names: bool = False, cached: bool = False) -> List[Tuple[int, Callable[[], Iterator]]]:
+    # (day of the first round, tick stream factory) for each day group of the rounds, replayed side by side
+    if cached:
+        return [(round_days[0][1], lambda round_days=round_days: iter_cached_ticks(round_days, names)) for round_days in cached_day_groups(rounds)]
+
+    per_round = [day_files(round_num, names) for round_num in rounds]
+    return [(day_group[0][0], lambda day_group=day_group: iter_ticks([(prices_path, trades_path) for _, prices_path, trades_path in day_group])) for day_group in zip(*per_round)]
+
+
+def run_backtest(strategy_path: str, rounds: List[int], days: List[int] = None, names: bool = False, budget_ms: float = DEFAULT_BUDGET_MS, passive: bool = False, cached: bool = False, trader_class=None,
+                 log_prefix: str = None, profile: str = None) -> List[dict]:
+    # Every day starts from a fresh Trader and empty traderData, like a submission run.
+    # trader_class replaces the strategy file's Trader, e.g. a subclass with other parameters.
+    # log_prefix: write each day as a platform log to <log_prefix>-day-<day>.log
+    # profile: set as the Trader's profile, "time" or "memory", for the per-section timings
+    if trader_class is None:
+        trader_class = load_strategy(strategy_path).Trader
+    if profile is not None:
+        trader_class = type(trader_class.__name__, (trader_class,), {"profile": profile})
+    limits = position_limits(trader_class)
+    results = []
+    # Observations are only cached, CSV replays get empty ones
+    day_groups = cached_day_groups(rounds) if cached else None
+
+    for idx, (day, ticks) in enumerate(day_streams(rounds, names, cached)):
+        if days is not None and day not in days:
+            continue
+
+        platform_log = PlatformLog(f"{log_prefix}-day-{day}.log", day) if log_prefix else None
+        observations = cached_observations(day_groups[idx]) if cached else None
+        result = replay_day(trader_class(), ticks(), limits, budget_ms, passive, platform_log=platform_log, hedges=hedged_products(trader_class), observations=observations)
+        if platform_log is not None:
+            platform_log.close()
+        result["day"] = day
+        results.append(result)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay island-data-bottle CSVs through a Trader")
+    parser.add_argument("strategy", help="strategy file, e.g. round5-joshlee.py")
+    parser.add_argument("round", help="round number, or rounds joined with + to replay them together (e.g. 3+4), or a log-<name> imported by log_replay.py")
+    parser.add_argument("--days", type=int, nargs="*", help="only replay these days (of the first round)")
+    parser.add_argument("--names", action="store_true", help="use the round 5 trade files, which name buyers and sellers")
+    parser.add_argument("--passive", action="store_true", help="also fill resting orders against the trades printed each tick")
+    parser.add_argument("--cached", action="store_true", help="replay from the data_cache.py arrays instead of the CSVs")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="flag run() calls slower than this")
+    parser.add_argument("--report", help="write the full results, including per-tick latency stats, to this JSON file")
+    parser.add_argument("--log", help="also write each day as a platform log, to <LOG>-day-<day>.log")
+    parser.add_argument("--profile", choices=["time", "memory"], help="time each section of run() (memory: also trace allocations, slower)")
+    args = parser.parse_args()
+
+    rounds = [int(round_num) if round_num.lstrip("-").isdigit() else round_num for round_num in args.round.split("+")]
+    if not args.cached and any(isinstance(round_num, str) for round_num in rounds):
+        parser.error("imported logs are only in the data cache, add --cached")
+    results = run_backtest(args.strategy, rounds, args.days, args.names, args.budget_ms, args.passive, args.cached, log_prefix=args.log, profile=args.profile)
+
+    for result in results:
+        latency = result["latency"]
+        print(f"day {result['day']}: pnl {result['pnl']:.1f} (max drawdown {result['max_drawdown']:.1f}) over {result['ticks']} ticks in {result['seconds']:.2f}s, {result['errors']} errors"
+              + (f", {result['converted']} units converted" if result["converted"] else ""))
+        print(f"    latency p50 {latency['p50_ms']:.3f}ms p95 {latency['p95_ms']:.3f}ms p99 {latency['p99_ms']:.3f}ms max {latency['max_ms']:.3f}ms, "
+              f"{len(latency['over_budget'])} ticks over {latency['budget_ms']:g}ms, growth {latency['growth_ns_per_tick']:.1f}ns/tick")
+        for product, pnl in sorted(result["pnl_by_product"].items()):
+            print(f"    {product:<16} {pnl:>12.1f}")
+        if result["profile"]:
+            print(f"    {'section':<20} {'calls':>6} {'mean us':>9} {'p50 us':>7} {'p99 us':>7} {'max us':>9} {'peak KB':>8}")
+        for name, section in result["profile"].items():
+            peak = f"{section['max_peak_bytes'] / 1024:>8.1f}" if "max_peak_bytes" in section else f"{'':>8}"
+            print(f"    {name:<20} {section['calls']:>6} {section['mean_us']:>9.1f} {section['p50_us']:>7} {section['p99_us']:>7} {section['max_us']:>9.1f} {peak}")
+        for product, hedge in sorted(result["hedges"].items()):
+            print(f"    {product} hedged with {'+'.join(hedge['hedged_by'])}: pnl unhedged {hedge['unhedged_pnl']:.1f} hedged {hedge['hedged_pnl']:.1f}, "
+                  f"max drawdown unhedged {hedge['unhedged_max_drawdown']:.1f} hedged {hedge['hedged_max_drawdown']:.1f}")
+        if result["first_error"]:
+            print("    first error:")
+            print("    " + result["first_error"].strip().replace("\n", "\n    "))
+
+    print(f"total pnl {sum(result['pnl'] for result in results):.1f}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"strategy": args.strategy, "rounds": rounds, "names": args.names, "passive": args.passive, "days": results}, f, indent=2, sort_keys=True)
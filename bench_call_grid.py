@@ -0,0 +1,86 @@
+import statistics
+import sys
+import time
+import timeit
+
+import numpy as np
+
+import backtester
+import black_scholes
+import data_cache
+
+# Per-call cost of the round 5 COCONUT_COUPON pricing: the old BS_CALL (numpy scalars and
+# statistics.NormalDist), CallPriceGrid.exact (the closed form with math.erfc) and the grid's
+# linear and cubic lookups, each lookup also as a ratio to exact, which is what the grid has to
+# beat. Then the grid's build time and its worst error against the exact formula. Also checks that every COCONUT mid
+# in the data prices as before (np.log and math.log can differ in the last bit). Then the live
+# ImpliedVol solver over the round 4 COCONUT_COUPON mids, tick by tick with warm starts, against
+# black_scholes.implied_vol on the whole round.
+# Usage: python bench_call_grid.py [strategy file]
+
+N = statistics.NormalDist(mu=0, sigma=1)
+
+
+def bs_call(S, K, T, r, sigma):
+    # What Trader.BS_CALL was
+    d1 = (np.log(S / K) + (r + sigma ** 2 / 2.) * T) / (sigma * np.sqrt(T))
+    d2 = d1 - sigma * np.sqrt(T)
+    return S * N.cdf(d1) - K * np.exp(-r * T) * N.cdf(d2)
+
+
+def us_per_call(call, number=100000):
+    return min(timeit.repeat(call, number=number, repeat=7)) / number * 1e6
+
+
+if __name__ == '__main__':
+    strategy = backtester.load_strategy(sys.argv[1] if len(sys.argv) > 1 else "round5-joshlee.py")
+    grid = strategy.Trader.coconut_call
+    K, T, r, sigma = grid.K, grid.T, grid.r, grid.sigma
+
+    # Tables are built on the first lookup, time that explicitly
+    linear = strategy.CallPriceGrid(K, T, r, sigma, grid.low, grid.low + grid.intervals * grid.step, grid.step, cubic=False)
+    start = time.perf_counter()
+    linear.build()
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"grid of {grid.size} nodes, step {grid.step}, built on first use in {build_ms:.1f}ms")
+
+    # Off-node S is the general case of the interpolation, the live COCONUT mids are on nodes
+    off_node, on_node = 10000.37, 10000.5
+    exact_us = us_per_call(lambda: grid.exact(off_node))
+    print(f"{'call':<24} {'us/call':>8} {'vs exact':>9}")
+    for name, call in [("BS_CALL", lambda: bs_call(off_node, K, T, r, sigma)), ("exact", lambda: grid.exact(off_node)),
+                       ("linear price off node", lambda: linear.price(off_node)), ("cubic price off node", lambda: grid.price(off_node)),
+                       ("cubic delta off node", lambda: grid.delta(off_node)), ("price on node", lambda: grid.price(on_node)),
+                       ("delta on node", lambda: grid.delta(on_node))]:
+        us = us_per_call(call)
+        print(f"{name:<24} {us:>8.3f} {us / exact_us:>8.2f}x")
+
+    print()
+    for name, table in [("linear", linear), ("cubic", grid)]:
+        price_error, delta_error = table.max_error()
+        print(f"{name:<7} max error vs exact: price {price_error:.3g}, delta {delta_error:.3g}")
+
+    largest, count = 0.0, 0
+    for round_key, round_days in data_cache.read_index()["rounds"].items():
+        for day, entry in round_days.items():
+            if "COCONUT" not in entry.get("prices", {}):
+                continue
+            prices = data_cache.load_prices(round_key, int(day), "COCONUT")
+            for mid in ((prices["bid_price_1"] + prices["ask_price_1"]) / 2.0).tolist():
+                count += 1
+                largest = max(largest, abs(grid.price(mid) - bs_call(mid, K, T, r, sigma)))
+    print(f"largest difference from BS_CALL over {count} COCONUT mids: {largest:.3g}")
+
+    coconut, coupon = black_scholes.mids(4).tolist(), black_scholes.mids(4, "COCONUT_COUPON").tolist()
+    solver = strategy.Trader.coconut_iv
+    for name, warm in [("warm start", True), ("cold start", False)]:
+        ivs, steps = [], 0
+        start = time.perf_counter()
+        for S, price in zip(coconut, coupon):
+            ivs.append(solver.solve(price, S, ivs[-1] if warm and ivs else sigma))
+            steps += solver.steps
+        elapsed = time.perf_counter() - start
+        print(f"ImpliedVol.solve {name}: {elapsed / len(coupon) * 1e6:.2f}us/tick, {steps / len(coupon):.2f} steps/tick")
+
+    batch = black_scholes.implied_vol(coupon, coconut, K, T, r, guess=sigma)
+    print(f"largest difference from the batch implied vols: {np.max(np.abs(np.array(ivs) - batch)):.3g}")
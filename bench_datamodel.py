@@ -0,0 +1,96 @@
+import sys
+import timeit
+import tracemalloc
+import types
+
+from typing import NamedTuple
+
+from datamodel import ConversionObservation, Listing, Observation, Order, OrderDepth, Trade, TradingState
+
+# Memory per object and construction throughput of the datamodel classes, against the same
+# classes without __slots__ (what the competition's datamodel uses) and, for Trade, a
+# tuple-backed variant. Then TradingState serialization: toJSON vs toCompactJSON.
+# Usage: python bench_datamodel.py [objects]
+
+
+class TradeTuple(NamedTuple):
+    symbol: str
+    price: int
+    quantity: int
+    buyer: str = None
+    seller: str = None
+    timestamp: int = 0
+
+
+def without_slots(cls):
+    # Same __init__, but instances get a __dict__ like the original datamodel classes
+    attributes = {key: value for key, value in vars(cls).items() if key != "__slots__" and not isinstance(value, types.MemberDescriptorType)}
+    return type(cls.__name__, cls.__bases__, attributes)
+
+
+def bytes_per_object(make, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [make() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Less the list holding them
+    return (after - before - sys.getsizeof(objects)) / len(objects)
+
+
+def per_second(make, count):
+    best = min(timeit.repeat(make, number=count, repeat=5))
+    return count / best
+
+
+def replay_state() -> TradingState:
+    # A round 5 tick from the data cache, with an ORCHIDS conversion observation added
+    import backtester
+
+    for idx, (timestamp, order_depths, market_trades, mids, prints) in enumerate(backtester.iter_cached_ticks([(3, 0), (4, 1)], names=True)):
+        if idx >= 100 and market_trades:
+            break
+
+    listings = {product: Listing(product, product, "SEASHELLS") for product in order_depths}
+    observation = Observation({}, {"ORCHIDS": ConversionObservation(1096.0, 1098.0, 1.0, 9.5, -5.5, 2500.0, 79.0)})
+    own_trades = {"CHOCOLATE": [Trade("CHOCOLATE", 7999, 12, "SUBMISSION", "", timestamp - 100)]}
+    position = {product: 10 for product in order_depths}
+    return TradingState("TD2-4" + "A" * 200, timestamp, listings, order_depths, own_trades, market_trades, position, observation)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # TradingState gets the same containers every time, so only the object itself is measured
+    listings, order_depths, position, observation = {"A": Listing("A", "A", "SEASHELLS")}, {"A": OrderDepth()}, {"A": 0}, Observation({}, {})
+
+    cases = [
+        ("Order", lambda cls: lambda: cls("CHOCOLATE", 7999, 12), [Order]),
+        ("Trade", lambda cls: lambda: cls("CHOCOLATE", 7999, 12, "Remy", "Vinnie", 100), [Trade, TradeTuple]),
+        ("Listing", lambda cls: lambda: cls("CHOCOLATE", "CHOCOLATE", "SEASHELLS"), [Listing]),
+        ("ConversionObservation", lambda cls: lambda: cls(1096.0, 1098.0, 1.0, 9.5, -5.5, 2500.0, 79.0), [ConversionObservation]),
+        ("TradingState", lambda cls: lambda: cls("", 100, listings, order_depths, position, position, position, observation), [TradingState]),
+    ]
+
+    print(f"{'class':<22} {'variant':<12} {'bytes/object':>13} {'objects/s':>12}")
+    for name, factory, variants in cases:
+        for label, cls in [("__dict__", without_slots(variants[0]))] + [("__slots__" if cls is not TradeTuple else "NamedTuple", cls) for cls in variants]:
+            make = factory(cls)
+            print(f"{name:<22} {label:<12} {bytes_per_object(make, count):>13.0f} {per_second(make, count):>12,.0f}")
+
+    state = replay_state()
+    if state.fromCompactJSON(state.toCompactJSON()).toCompactJSON() != state.toCompactJSON():
+        raise AssertionError("Compact round trip mismatch")
+
+    print()
+    # Against toJSON, the keyed path toCompactJSON replaces
+    print(f"{'TradingState':<22} {'bytes':>8} {'us/call':>10} {'vs toJSON':>10}")
+    compact = state.toCompactJSON()
+    timings = {}
+    for name, call in [("toJSON", state.toJSON), ("toCompactJSON", state.toCompactJSON), ("fromCompactJSON", lambda: state.fromCompactJSON(compact))]:
+        size = len(call()) if name.startswith("to") else len(compact)
+        us = timings[name] = 1e6 / per_second(call, 2000)
+        print(f"{name:<22} {size:>8} {us:>10.1f} {us / timings['toJSON']:>9.2f}x")
+
+    # The serialization request asked for 5x over toJSON, which JSON output doesn't reach here
+    speedup = timings["toJSON"] / timings["toCompactJSON"]
+    print(f"toCompactJSON is {speedup:.1f}x faster than toJSON, target 5x: {'met' if speedup >= 5 else 'not met'}")
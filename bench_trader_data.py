@@ -0,0 +1,90 @@
+import random
+import sys
+import time
+
+import backtester
+
+# Compares encoded traderData size and encode+decode time of the round 5 codecs, then the
+# per-tick cost of TraderState when only some fields are read.
+# Usage: python bench_trader_data.py [strategy file]
+
+
+def make_state(samples, rng):
+    # Same shape as the round 5 JSON dict: ~20 keys, mostly float histories
+    state = {"starfruit_cache": [], "starfruit_spread_cache": [], "orchid_cache": [], "orchid_spread_cache": [], "sunlight_cache": [], "humidity_cache": [], "rhianna_buy": False, "rhianna_trade_before": False}
+
+    for name, start in [("etf_returns", 70000.0), ("assets_returns", 380.0), ("chocolate_returns", 8000.0), ("chocolate_estimated_returns", 8000.0),
+                        ("strawberries_returns", 4000.0), ("strawberries_estimated_returns", 4000.0), ("roses_returns", 15000.0), ("roses_estimated_returns", 15000.0),
+                        ("coconut_coupon_returns", 637.5), ("coconut_returns", 10000.0), ("coconut_estimated_returns", 10000.0)]:
+        price, series = start, []
+        for _ in range(samples):
+            price += rng.choice((-1.0, -0.5, 0.0, 0.5, 1.0))
+            series.append(price)
+        state[name] = series
+
+    # Model prices and averaged quantities have full float64 mantissas, e.g. 5046.333333333333
+    state["coconut_coupon_bsm_returns"] = [637.0 + rng.random() for _ in range(samples)]
+    state["assets_returns"] = [value / 3.0 for value in state["assets_returns"]]
+
+    return state
+
+
+def bench(codec, state, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        blob = codec.encode(state)
+        decoded = codec.decode(blob)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    if decoded != state:
+        raise AssertionError("Round trip mismatch")
+
+    return len(blob), elapsed
+
+
+def bench_lazy(strategy, state, touched, repeat):
+    # One tick of TraderState: decode, read `touched` fields, encode back
+    codec = strategy.BinaryCodec()
+    fields = {name: strategy.StateField("list") for name in state}
+    blob = codec.encode(state)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        trader_state = strategy.TraderState.decode(fields, codec, blob)
+        for name in touched:
+            trader_state.get(name)
+        blob = trader_state.encode()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == '__main__':
+    strategy = backtester.load_strategy(sys.argv[1] if len(sys.argv) > 1 else "round5-joshlee.py")
+    rng = random.Random(0)
+
+    codecs = [
+        ("json", strategy.JsonCodec()),
+        ("binary b64", strategy.BinaryCodec()),
+        ("binary b85", strategy.BinaryCodec(text="b85")),
+        ("binary zlib b64", strategy.BinaryCodec(compress=True)),
+        ("binary zlib b85", strategy.BinaryCodec(compress=True, text="b85")),
+    ]
+
+    print(f"{'samples':>8} {'codec':<16} {'bytes':>10} {'vs json':>8} {'ms/roundtrip':>13}")
+    for samples in (200, 2000, 20000):
+        state = make_state(samples, rng)
+        repeat = max(1, 20000 // samples)
+        json_size = None
+
+        for name, codec in codecs:
+            size, elapsed = bench(codec, state, repeat)
+            json_size = json_size or size
+            print(f"{samples:>8} {name:<16} {size:>10} {size / json_size:>8.2f} {elapsed * 1000:>13.3f}")
+
+    print()
+    print(f"{'samples':>8} {'fields touched':<16} {'ms/tick':>10}")
+    for samples in (200, 2000):
+        state = make_state(samples, rng)
+        repeat = max(1, 20000 // samples)
+        for touched in (list(state), ["chocolate_returns", "coconut_returns"], []):
+            elapsed = bench_lazy(strategy, state, touched, repeat)
+            print(f"{samples:>8} {len(touched):<16} {elapsed * 1000:>10.3f}")
@@ -0,0 +1,189 @@
+import argparse
+import math
+import time
+from typing import Dict
+
+import numpy as np
+
+import data_cache
+
+# Vectorized Black-Scholes for research arrays: price, delta, gamma, vega and theta for arrays
+# of S, K, T and sigma (broadcast against each other) in one call, e.g. every COCONUT tick of a
+# round. T and sigma are in the same time unit (the round 4/5 strategies use days, T = 250).
+#   from black_scholes import greeks
+#   greeks(coconut_mids, 10000, 250, 0.01011932923)["delta"]
+#   implied_vol(coupon_mids, coconut_mids, 10000, 250)
+# Usage: python black_scholes.py [--round 4]    prices the round's COCONUT history and solves its
+#                                               COCONUT_COUPON implied vols, timing both
+#
+# numpy has no erf, so norm_cdf interpolates math.erfc with piecewise Chebyshev polynomials
+# fitted once at import. They agree with math.erfc to a few 1e-15, so prices match the exact
+# scalar formula the live Trader uses (CallPriceGrid.exact in round5-joshlee.py).
+
+# erfc on [-ERFC_RANGE, ERFC_RANGE] in segments of ERFC_WIDTH, outside it is 2 or 0 to double precision
+ERFC_RANGE = 6.0
+ERFC_WIDTH = 0.5
+ERFC_DEGREE = 14
+
+
+def _fit_erfc() -> np.ndarray:
+    # Power-series coefficients in t in [-1, 1] per segment, highest degree first for Horner
+    erfc = np.vectorize(math.erfc)
+    coefs = []
+    for start in np.arange(-ERFC_RANGE, ERFC_RANGE, ERFC_WIDTH):
+        chebyshev = np.polynomial.chebyshev.chebinterpolate(lambda t: erfc(start + (t + 1.0) * ERFC_WIDTH / 2.0), ERFC_DEGREE)
+        coefs.append(np.polynomial.chebyshev.cheb2poly(chebyshev)[::-1])
+    return np.array(coefs)
+
+
+ERFC_COEFS = _fit_erfc()
+
+
+def erfc(x) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    clipped = np.clip(np.nan_to_num(x), -ERFC_RANGE, ERFC_RANGE)
+    segment = np.minimum(((clipped + ERFC_RANGE) / ERFC_WIDTH).astype(np.intp), len(ERFC_COEFS) - 1)
+    t = 2.0 * (clipped + ERFC_RANGE - segment * ERFC_WIDTH) / ERFC_WIDTH - 1.0
+
+    coefs = ERFC_COEFS[segment]
+    result = coefs[..., 0]
+    for k in range(1, ERFC_DEGREE + 1):
+        result = result * t + coefs[..., k]
+
+    result = np.where(x > ERFC_RANGE, 0.0, np.where(x < -ERFC_RANGE, 2.0, result))
+    # NaN in, NaN out
+    return np.where(np.isnan(x), np.nan, result)
+
+
+def norm_cdf(x) -> np.ndarray:
+    # Like statistics.NormalDist().cdf: erfc(-x / sqrt(2)) / 2
+    return 0.5 * erfc(-np.asarray(x, dtype=np.float64) / math.sqrt(2.0))
+
+
+def norm_pdf(x) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    return np.exp(-x * x / 2.0) / math.sqrt(2.0 * math.pi)
+
+
+def d1_d2(S, K, T, sigma, r=0.0):
+    vol = sigma * np.sqrt(T)
+    d1 = (np.log(np.divide(S, K)) + (r + np.square(sigma) / 2.0) * T) / vol
+    return d1, d1 - vol
+
+
+def call_price(S, K, T, sigma, r=0.0) -> np.ndarray:
+    d1, d2 = d1_d2(S, K, T, sigma, r)
+    return S * norm_cdf(d1) - K * np.exp(-r * np.asarray(T)) * norm_cdf(d2)
+
+
+def greeks(S, K, T, sigma, r=0.0, call: bool = True) -> Dict[str, np.ndarray]:
+    # Price and greeks of a European call (or put, by put-call parity). Vega is per unit of
+    # sigma, theta per unit of T (the change in value as one unit of time passes).
+    S, K, T, sigma = (np.asarray(value, dtype=np.float64) for value in (S, K, T, sigma))
+    d1, d2 = d1_d2(S, K, T, sigma, r)
+    discounted_strike = K * np.exp(-r * T)
+    n_d1, n_d2, pdf_d1 = norm_cdf(d1), norm_cdf(d2), norm_pdf(d1)
+    sqrt_t = np.sqrt(T)
+
+    price = S * n_d1 - discounted_strike * n_d2
+    delta = n_d1
+    theta = -S * pdf_d1 * sigma / (2.0 * sqrt_t) - r * discounted_strike * n_d2
+    if not call:
+        price = price - S + discounted_strike
+        delta = delta - 1.0
+        theta = theta + r * discounted_strike
+
+    return {
+        "price": price,
+        "delta": delta,
+        "gamma": pdf_d1 / (S * sigma * sqrt_t),
+        "vega": S * pdf_d1 * sqrt_t,
+        "theta": theta
+    }
+
+
+def implied_vol(price, S, K, T, r=0.0, guess=0.01, low=1e-6, high=1.0, tolerance=1e-8, max_steps=60) -> np.ndarray:
+    # Batch version of ImpliedVol.solve in round5-joshlee.py: Newton steps on sigma for every
+    # element at once, each kept inside a per-element bracket (bisection when a step would
+    # leave it). Only elements not yet within tolerance are re-priced. NaN where the price is
+    # outside the no-arbitrage bounds.
+    price, S, K, T, guess = (np.array(value, dtype=np.float64) for value in np.broadcast_arrays(price, S, K, T, guess))
+    shape = price.shape
+    price, S, K, T, guess = (value.ravel() for value in (price, S, K, T, guess))
+
+    discounted_strike = K * np.exp(-r * T)
+    valid = (price > np.maximum(S - discounted_strike, 0.0)) & (price < S)
+    sigma = np.clip(guess, low, high)
+    lows, highs = np.full(len(sigma), low), np.full(len(sigma), high)
+
+    active = np.flatnonzero(valid)
+    for _ in range(max_steps):
+        if not len(active):
+            break
+        result = greeks(S[active], K[active], T[active], sigma[active], r)
+        diff = result["price"] - price[active]
+        pending = np.abs(diff) >= tolerance
+        active, diff, vega = active[pending], diff[pending], result["vega"][pending]
+
+        # The call price increases with sigma
+        highs[active] = np.where(diff > 0, sigma[active], highs[active])
+        lows[active] = np.where(diff > 0, lows[active], sigma[active])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = sigma[active] - diff / vega
+        inside = (vega > 0) & (step > lows[active]) & (step < highs[active])
+        sigma[active] = np.where(inside, step, (lows[active] + highs[active]) / 2)
+
+    sigma[~valid] = np.nan
+    return sigma.reshape(shape)
+
+
+def mids(round_num: int, product: str = "COCONUT") -> np.ndarray:
+    # Mid price of every tick of the round, days in order
+    mids = []
+    for day in data_cache.days(round_num):
+        prices = data_cache.load_prices(round_num, day, product)
+        mids.append((prices["bid_price_1"] + prices["ask_price_1"]) / 2.0)
+    return np.concatenate(mids)
+
+
+def scalar_call(S: float, K: float, T: float, sigma: float, r: float = 0.0) -> float:
+    # One price at a time with math.erfc, the reference norm_cdf is checked against
+    vol = sigma * math.sqrt(T)
+    d1 = (math.log(S / K) + (r + sigma ** 2 / 2.) * T) / vol
+    return S * 0.5 * math.erfc(-d1 / math.sqrt(2.0)) - K * math.exp(-r * T) * 0.5 * math.erfc(-(d1 - vol) / math.sqrt(2.0))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Price every COCONUT tick of a round with the vectorized Black-Scholes")
+    parser.add_argument("--round", type=int, default=4, help="round whose COCONUT history to price")
+    parser.add_argument("--strike", type=float, default=10000)
+    parser.add_argument("--expiry", type=float, default=250, help="time to expiry, in days")
+    parser.add_argument("--sigma", type=float, default=0.01011932923, help="daily vol")
+    args = parser.parse_args()
+
+    S = mids(args.round)
+    greeks(S, args.strike, args.expiry, args.sigma)
+
+    start = time.perf_counter()
+    result = greeks(S, args.strike, args.expiry, args.sigma)
+    greeks_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    expected = [scalar_call(s, args.strike, args.expiry, args.sigma) for s in S.tolist()]
+    scalar_ms = (time.perf_counter() - start) * 1000
+
+    grid = np.linspace(-10.0, 10.0, 200001)
+    cdf_error = np.max(np.abs(norm_cdf(grid) - [0.5 * math.erfc(-x / math.sqrt(2.0)) for x in grid.tolist()]))
+
+    print(f"round {args.round}: {len(S)} COCONUT ticks, price and greeks in {greeks_ms:.1f}ms (scalar math price loop {scalar_ms:.1f}ms)")
+    print(f"    max error vs the scalar formula: price {np.max(np.abs(result['price'] - expected)):.3g}, norm_cdf {cdf_error:.3g}")
+    for name, values in result.items():
+        print(f"    {name:<6} min {values.min():>12.6g} max {values.max():>12.6g}")
+
+    coupon = mids(args.round, "COCONUT_COUPON")
+    start = time.perf_counter()
+    ivs = implied_vol(coupon, S, args.strike, args.expiry, guess=args.sigma)
+    iv_ms = (time.perf_counter() - start) * 1000
+    repriced = call_price(S, args.strike, args.expiry, ivs)
+    print(f"    implied vol of {len(coupon)} COCONUT_COUPON mids in {iv_ms:.1f}ms: min {np.nanmin(ivs):.6g} max {np.nanmax(ivs):.6g}, "
+          f"{int(np.isnan(ivs).sum())} without one, max repricing error {np.nanmax(np.abs(repriced - coupon)):.3g}")
@@ -0,0 +1,104 @@
+import argparse
+import time
+from typing import Dict
+
+import numpy as np
+
+import backtester
+import data_cache
+
+# Batch version of FeatureEngine in round5-joshlee.py: VWAP, microprice, imbalance, depth
+# weighted mid and spread for every tick of a product's day, straight from the memory-mapped
+# data_cache arrays. Missing levels are cached as price 0 volume 0, so they drop out of the
+# sums. Each column is built from the same integer sums and the same float64 operations in the
+# same order as the live engine, which makes the results bit for bit identical; --verify checks
+# that against FeatureEngine fed with the backtester's OrderDepths.
+# Usage: python book_features.py <round> [--days D ...] [--verify] [--out CSV]
+
+NAMES = ("vwap", "microprice", "imbalance", "depth_mid", "spread")
+FEATURE_DTYPE = np.dtype([("timestamp", np.int64)] + [(name, np.float64) for name in NAMES])
+
+
+def side_sums(prices: np.ndarray, side: str):
+    # Volume and notional of one side over its three levels, as int64 like the live int sums
+    volume = sum(np.asarray(prices[f"{side}_volume_{level}"]) for level in (1, 2, 3))
+    notional = sum(np.asarray(prices[f"{side}_price_{level}"]) * np.asarray(prices[f"{side}_volume_{level}"]) for level in (1, 2, 3))
+    return volume, notional
+
+
+def book_features(prices: np.ndarray) -> np.ndarray:
+    bid_volume, bid_notional = side_sums(prices, "bid")
+    ask_volume, ask_notional = side_sums(prices, "ask")
+    best_bid, best_bid_volume = np.asarray(prices["bid_price_1"]), np.asarray(prices["bid_volume_1"])
+    best_ask, best_ask_volume = np.asarray(prices["ask_price_1"]), np.asarray(prices["ask_volume_1"])
+
+    features = np.empty(len(prices), dtype=FEATURE_DTYPE)
+    features["timestamp"] = prices["timestamp"]
+
+    # NaN while a side has no volume, the zero divisions there are thrown away
+    valid = (bid_volume != 0) & (ask_volume != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        features["vwap"] = (bid_notional / bid_volume + ask_notional / ask_volume) / 2
+        features["microprice"] = (best_bid * best_ask_volume + best_ask * best_bid_volume) / (best_bid_volume + best_ask_volume)
+        features["imbalance"] = (bid_volume - ask_volume) / (bid_volume + ask_volume)
+        features["depth_mid"] = (bid_notional + ask_notional) / (bid_volume + ask_volume)
+    features["spread"] = best_ask - best_bid
+
+    for name in NAMES:
+        features[name][~valid] = np.nan
+    return features
+
+
+def day_features(round_num, day: int) -> Dict[str, np.ndarray]:
+    return {product: book_features(data_cache.load_prices(round_num, day, product)) for product in data_cache.products(round_num, day)}
+
+
+def verify(round_num, day: int, strategy_path: str = "round5-joshlee.py") -> int:
+    # Feeds every tick's books through the live FeatureEngine and counts the ticks where any
+    # feature differs from the batch one in any bit (NaN matches NaN)
+    strategy = backtester.load_strategy(strategy_path)
+    engine = strategy.FeatureEngine()
+    batch = day_features(round_num, day)
+    rows = {product: 0 for product in batch}
+    mismatches = 0
+
+    for timestamp, order_depths, _ in backtester.iter_cached_books(round_num, day):
+        for product, order_depth in order_depths.items():
+            live = np.array(engine.update(product, strategy.OrderBook(order_depth)), dtype=np.float64)
+            expected = batch[product][rows[product]]
+            rows[product] += 1
+
+            if expected["timestamp"] != timestamp or live.tobytes() != np.array([expected[name] for name in NAMES], dtype=np.float64).tobytes():
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"{product} at {timestamp}: live {live.tolist()}, batch {[float(expected[name]) for name in NAMES]}")
+
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Book depth features of every tick, from the data cache")
+    parser.add_argument("round", help="round number, or a log-<name> imported by log_replay.py")
+    parser.add_argument("--days", type=int, nargs="*", help="only these days")
+    parser.add_argument("--verify", action="store_true", help="check every tick bit for bit against the live FeatureEngine")
+    parser.add_argument("--out", help="write each product's features to <OUT>-<day>-<product>.csv")
+    args = parser.parse_args()
+
+    round_num = int(args.round) if args.round.lstrip("-").isdigit() else args.round
+    for day in data_cache.days(round_num):
+        if args.days is not None and day not in args.days:
+            continue
+
+        start = time.perf_counter()
+        features = day_features(round_num, day)
+        elapsed = time.perf_counter() - start
+        print(f"round {round_num} day {day}: {sum(len(values) for values in features.values())} book rows of {len(features)} products in {elapsed * 1000:.1f}ms")
+        for product, values in features.items():
+            print(f"    {product:<16} " + "  ".join(f"{name} {np.nanmean(values[name]):.6g}" for name in NAMES))
+
+        if args.verify:
+            print(f"    {verify(round_num, day)} ticks differ from the live FeatureEngine")
+        if args.out:
+            for product, values in features.items():
+                np.savetxt(f"{args.out}-{day}-{product}.csv", np.column_stack([values[name] for name in FEATURE_DTYPE.names]), delimiter=";",
+                           fmt=["%d"] + ["%.17g"] * len(NAMES), header=";".join(FEATURE_DTYPE.names), comments="")
@@ -0,0 +1,263 @@
+import csv
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+# Columnar cache of the island-data-bottle CSVs. `build` parses every CSV once and writes
+# one structured .npy array per product and day under island-data-cache/, loaders then
+# np.load(mmap_mode="r") them: no parsing, columns are read as arr["mid_price"], and
+# processes loading the same day share the page cache instead of holding their own copy.
+#
+# Layout:
+#   island-data-cache/index.json
+#   island-data-cache/round-3/day-0/prices/CHOCOLATE.npy
+#   island-data-cache/round-3/day-0/trades_nn/CHOCOLATE.npy
+#   island-data-cache/round-3/day-0/trades_wn/CHOCOLATE.npy   (buyer/seller are ids into the day's names list)
+#   island-data-cache/round-2/day-0/observations.npy
+#
+# Usage: python data_cache.py build | bench
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ROOT, "island-data-cache")
+INDEX_PATH = os.path.join(CACHE_DIR, "index.json")
+
+# Bumped whenever the on-disk layout changes, older caches are rebuilt
+CACHE_VERSION = 1
+
+PRICE_DTYPE = np.dtype([("timestamp", np.int64)]
+                       + [(f"{side}_{field}_{level}", np.int64) for side in ("bid", "ask") for level in (1, 2, 3) for field in ("price", "volume")]
+                       + [("mid_price", np.float64), ("profit_and_loss", np.float64)])
+
+TRADE_DTYPE = np.dtype([("timestamp", np.int64), ("price", np.int64), ("quantity", np.int64), ("buyer", np.int32), ("seller", np.int32)])
+
+# Day index keys each source kind writes, trades_nn/trades_wn write <kind> and <kind>_names
+KIND_KEYS = {"prices": ("prices", "observations")}
+
+
+def source_files() -> List[Dict]:
+    # Every CSV in the bottles with the round/day it belongs to. The round 5 bottle only holds
+    # earlier rounds' trades with buyer/seller names, so those are filed under their own round.
+    sources = []
+
+    for round_num in range(1, 6):
+        data_dir = os.path.join(ROOT, f"round-{round_num}-island-data-bottle")
+        if not os.path.isdir(data_dir):
+            continue
+
+        for filename in sorted(os.listdir(data_dir)):
+            if not filename.endswith(".csv"):
+                continue
+            parts = filename[:-len(".csv")].split("_")
+            kind = parts[0]
+            source_round, day = int(parts[2]), int(parts[4])
+
+            if kind == "trades":
+                kind = "trades_" + parts[5]
+            sources.append({"path": os.path.join(data_dir, filename), "round": source_round, "day": day, "kind": kind})
+
+    return sources
+
+
+def read_rows(path: str):
+    with open(path, newline="") as f:
+        reader = csv.reader(f, delimiter=";")
+        header = next(reader)
+        return header, list(reader)
+
+
+def save(path: str, values: np.ndarray):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.save(path, values)
+
+
+def convert_prices(path: str, directory: str) -> Dict:
+    header, rows = read_rows(path)
+
+    if "product" not in header:
+        # Round 2 observation files: one float column per observed quantity
+        dtype = np.dtype([(name, np.int64 if name in ("timestamp", "DAY") else np.float64) for name in header])
+        save(os.path.join(directory, "observations.npy"), np.array([tuple(float(value) for value in row) for row in rows], dtype=dtype))
+        return {"observations": len(rows)}
+
+    col = {name: idx for idx, name in enumerate(header)}
+    by_product = {}
+    for row in rows:
+        by_product.setdefault(row[col["product"]], []).append(row)
+
+    products = {}
+    for product, product_rows in by_product.items():
+        # Missing book levels are stored as price 0, volume 0
+        records = [tuple(float(row[col[name]]) if row[col[name]] else 0 for name in PRICE_DTYPE.names) for row in product_rows]
+        save(os.path.join(directory, "prices", product + ".npy"), np.array(records, dtype=PRICE_DTYPE))
+        products[product] = len(product_rows)
+
+    return {"prices": products}
+
+
+def convert_trades(path: str, directory: str, kind: str) -> Dict:
+    header, rows = read_rows(path)
+    col = {name: idx for idx, name in enumerate(header)}
+
+    names = sorted({row[col["buyer"]] for row in rows} | {row[col["seller"]] for row in rows})
+    name_ids = {name: idx for idx, name in enumerate(names)}
+
+    by_symbol = {}
+    for row in rows:
+        by_symbol.setdefault(row[col["symbol"]], []).append(row)
+
+    symbols = {}
+    for symbol, symbol_rows in by_symbol.items():
+        records = [(int(row[col["timestamp"]]), int(float(row[col["price"]])), int(row[col["quantity"]]), name_ids[row[col["buyer"]]], name_ids[row[col["seller"]]]) for row in symbol_rows]
+        save(os.path.join(directory, kind, symbol + ".npy"), np.array(records, dtype=TRADE_DTYPE))
+        symbols[symbol] = len(symbol_rows)
+
+    return {kind: symbols, kind + "_names": names}
+
+
+def build(force: bool = False) -> Dict:
+    # Converts every CSV whose size or mtime changed since the last build. Days imported from
+    # platform logs (log_replay.py) have no CSV to rebuild from, so they are kept.
+    old_index = read_index()
+    index = old_index if not force else None
+    if index is None or index.get("version") != CACHE_VERSION:
+        index = {"version": CACHE_VERSION, "rounds": {}, "sources": {}}
+        if old_index is not None and old_index.get("version") == CACHE_VERSION:
+            index["rounds"].update({key: days for key, days in old_index["rounds"].items() if key.startswith("log-")})
+
+    for source in source_files():
+        stat = os.stat(source["path"])
+        stamp = [stat.st_size, stat.st_mtime]
+        relative = os.path.relpath(source["path"], ROOT)
+        if index["sources"].get(relative) == stamp:
+            continue
+
+        directory = os.path.join(CACHE_DIR, f"round-{source['round']}", f"day-{source['day']}")
+        # The day's entry and arrays for this kind are replaced, not merged, so products or
+        # symbols no longer in the CSV don't survive the rebuild
+        day_entry = index["rounds"].setdefault(str(source["round"]), {}).setdefault(str(source["day"]), {})
+        for key in KIND_KEYS.get(source["kind"], (source["kind"], source["kind"] + "_names")):
+            day_entry.pop(key, None)
+        if source["kind"] == "prices":
+            shutil.rmtree(os.path.join(directory, "prices"), ignore_errors=True)
+            if os.path.exists(os.path.join(directory, "observations.npy")):
+                os.remove(os.path.join(directory, "observations.npy"))
+            entry = convert_prices(source["path"], directory)
+        else:
+            shutil.rmtree(os.path.join(directory, source["kind"]), ignore_errors=True)
+            entry = convert_trades(source["path"], directory, source["kind"])
+
+        day_entry.update(entry)
+        index["sources"][relative] = stamp
+
+    write_index(index)
+    return index
+
+
+def write_index(index: Dict):
+    global _index
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(INDEX_PATH, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    _index = index
+
+
+def register_day(round_key: str, day: int, entry: Dict):
+    # Adds a day written outside build(), e.g. from a platform log, replacing what was there
+    index = read_index() or {"version": CACHE_VERSION, "rounds": {}, "sources": {}}
+    index["rounds"].setdefault(str(round_key), {})[str(day)] = entry
+    write_index(index)
+
+
+_index = None
+
+
+def read_index() -> Dict:
+    global _index
+    if _index is None and os.path.exists(INDEX_PATH):
+        with open(INDEX_PATH) as f:
+            _index = json.load(f)
+    return _index
+
+
+def day_index(round_num: int, day: int) -> Dict:
+    index = read_index()
+    if index is None:
+        raise FileNotFoundError("No island-data-cache, run `python data_cache.py build` first")
+    return index["rounds"][str(round_num)][str(day)]
+
+
+def days(round_num: int) -> List[int]:
+    return sorted(int(day) for day in read_index()["rounds"][str(round_num)])
+
+
+def products(round_num: int, day: int) -> List[str]:
+    return sorted(day_index(round_num, day).get("prices", {}))
+
+
+def day_dir(round_num, day: int) -> str:
+    return os.path.join(CACHE_DIR, f"round-{round_num}", f"day-{day}")
+
+
+def load_prices(round_num: int, day: int, product: str) -> np.ndarray:
+    if product not in day_index(round_num, day).get("prices", {}):
+        raise KeyError(f"No cached {product} prices for round {round_num} day {day}")
+    return np.load(os.path.join(day_dir(round_num, day), "prices", product + ".npy"), mmap_mode="r")
+
+
+def load_trades(round_num: int, day: int, symbol: str, names: bool = False) -> np.ndarray:
+    # Trades of a symbol, buyer/seller are ids into trade_names(round_num, day, names). A symbol
+    # with no trades that day gets an empty array.
+    kind = "trades_wn" if names else "trades_nn"
+    if symbol not in day_index(round_num, day).get(kind, {}):
+        return np.zeros(0, dtype=TRADE_DTYPE)
+    return np.load(os.path.join(day_dir(round_num, day), kind, symbol + ".npy"), mmap_mode="r")
+
+
+def trade_names(round_num: int, day: int, names: bool = False) -> List[str]:
+    return day_index(round_num, day).get(("trades_wn" if names else "trades_nn") + "_names", [])
+
+
+def load_observations(round_num: int, day: int) -> np.ndarray:
+    if "observations" not in day_index(round_num, day):
+        raise KeyError(f"No cached observations for round {round_num} day {day}")
+    return np.load(os.path.join(day_dir(round_num, day), "observations.npy"), mmap_mode="r")
+
+
+def bench():
+    # Cold load of every round: CSV parse (what read_data.py and the notebooks do) vs the cache
+    start = time.perf_counter()
+    for source in source_files():
+        read_rows(source["path"])
+    csv_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    total = 0
+    for round_num, round_days in read_index()["rounds"].items():
+        for day, entry in round_days.items():
+            for product in entry.get("prices", {}):
+                total += len(load_prices(round_num, int(day), product)["mid_price"])
+            for kind in ("trades_nn", "trades_wn"):
+                for symbol in entry.get(kind, {}):
+                    total += len(load_trades(round_num, int(day), symbol, kind == "trades_wn")["price"])
+            if "observations" in entry:
+                total += len(load_observations(round_num, int(day))["timestamp"])
+    cache_seconds = time.perf_counter() - start
+
+    print(f"csv parse: {csv_seconds * 1000:.1f}ms, mmap load: {cache_seconds * 1000:.1f}ms ({total} rows)")
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+
+    if command == "build":
+        index = build(force="--force" in sys.argv)
+        print(f"cached {len(index['sources'])} files in {CACHE_DIR}")
+    elif command == "bench":
+        bench()
+    else:
+        raise SystemExit("Usage: python data_cache.py build [--force] | bench")
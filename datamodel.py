@@ -1,7 +1,6 @@
 import json
 from typing import Dict, List
 from json import JSONEncoder
-import jsonpickle
 
 Time = int
 Symbol = str
@@ -11,7 +10,11 @@ UserId = str
 ObservationValue = int
 
 
+# The classes below have __slots__: no per-instance __dict__, which makes them smaller and
+# faster to build when a replay creates millions of them. Attributes are the same as the
+# competition's datamodel, but new ones can't be added to instances.
 class Listing:
+    __slots__ = ("symbol", "product", "denomination")
 
     def __init__(self, symbol: Symbol, product: Product, denomination: Product):
         self.symbol = symbol
@@ -20,6 +23,7 @@ class Listing:
         
                  
 class ConversionObservation:
+    __slots__ = ("bidPrice", "askPrice", "transportFees", "exportTariff", "importTariff", "sunlight", "humidity")
 
     def __init__(self, bidPrice: float, askPrice: float, transportFees: float, exportTariff: float, importTariff: float, sunlight: float, humidity: float):
         self.bidPrice = bidPrice
@@ -32,16 +36,18 @@ class ConversionObservation:
         
 
 class Observation:
+    __slots__ = ("plainValueObservations", "conversionObservations")
 
     def __init__(self, plainValueObservations: Dict[Product, ObservationValue], conversionObservations: Dict[Product, ConversionObservation]) -> None:
         self.plainValueObservations = plainValueObservations
         self.conversionObservations = conversionObservations
         
     def __str__(self) -> str:
-        return "(plainValueObservations: " + jsonpickle.encode(self.plainValueObservations) + ", conversionObservations: " + jsonpickle.encode(self.conversionObservations) + ")"
+        return "(plainValueObservations: " + json.dumps(self.plainValueObservations) + ", conversionObservations: " + json.dumps(self.conversionObservations, default=public_fields) + ")"
      
 
 class Order:
+    __slots__ = ("symbol", "price", "quantity")
 
     def __init__(self, symbol: Symbol, price: int, quantity: int) -> None:
         self.symbol = symbol
@@ -56,6 +62,7 @@ class Order:
     
 
 class OrderDepth:
+    __slots__ = ("buy_orders", "sell_orders", "_book")
 
     def __init__(self):
         # buy_orders: Dict[<price>: <qty>] (qty is +ve)
@@ -64,8 +71,48 @@ class OrderDepth:
         # sell_orders: Dict[<price>: <qty>] (qty is -ve)
         self.sell_orders: Dict[int, int] = {}
 
+        self._book = None
+
+    @property
+    def book(self) -> "OrderBook":
+        # Built on first access and shared by every reader for the rest of the tick. The
+        # exchange never changes an OrderDepth after handing it over, so it is not invalidated.
+        if self._book is None:
+            self._book = OrderBook(self)
+        return self._book
+
+
+class OrderBook:
+    # Sorted view of an OrderDepth with the top of book worked out once. buy_orders and
+    # sell_orders are the same dicts as OrderDepth's (sell quantities -ve), best level first.
+    # Prices and volumes of a missing side are None.
+    __slots__ = ("buy_orders", "sell_orders", "best_bid", "best_bid_volume", "best_ask", "best_ask_volume", "mid", "spread", "vwap")
+
+    def __init__(self, order_depth: OrderDepth):
+        self.buy_orders: Dict[int, int] = dict(sorted(order_depth.buy_orders.items(), reverse=True))
+        self.sell_orders: Dict[int, int] = dict(sorted(order_depth.sell_orders.items()))
+
+        self.best_bid = next(iter(self.buy_orders), None)
+        self.best_bid_volume = self.buy_orders.get(self.best_bid)
+        self.best_ask = next(iter(self.sell_orders), None)
+        self.best_ask_volume = self.sell_orders.get(self.best_ask)
+
+        self.mid = self.spread = self.vwap = None
+        if self.best_bid is not None and self.best_ask is not None:
+            self.mid = (self.best_bid + self.best_ask) / 2.0
+            self.spread = self.best_ask - self.best_bid
+
+            # Mean of the volume weighted bid and ask prices
+            bid_volume = sum(self.buy_orders.values())
+            ask_volume = -sum(self.sell_orders.values())
+            if bid_volume and ask_volume:
+                bid_vwap = sum(price * volume for price, volume in self.buy_orders.items()) / bid_volume
+                ask_vwap = -sum(price * volume for price, volume in self.sell_orders.items()) / ask_volume
+                self.vwap = (bid_vwap + ask_vwap) / 2
+
 
 class Trade:
+    __slots__ = ("symbol", "price", "quantity", "buyer", "seller", "timestamp")
 
     def __init__(self, symbol: Symbol, price: int, quantity: int, buyer: UserId=None, seller: UserId=None, timestamp: int=0) -> None:
         self.symbol = symbol
@@ -83,6 +130,7 @@ class Trade:
 
 
 class TradingState(object):
+    __slots__ = ("traderData", "timestamp", "listings", "order_depths", "own_trades", "market_trades", "position", "observations")
 
     def __init__(self,
                  traderData: str,
@@ -103,10 +151,97 @@ class TradingState(object):
         self.observations = observations
         
     def toJSON(self):
-        return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True)
+        return json.dumps(self, default=public_fields, sort_keys=True)
+
+    def toCompactJSON(self) -> str:
+        # Positional arrays instead of keyed objects, see compact_state. About 2.5-3x faster
+        # than toJSON at half the size (bench_datamodel.py), most of what is left is json
+        # formatting the numbers. Use it to log states and fromCompactJSON to read them back.
+        return json.dumps(compact_state(self), separators=(",", ":"))
+
+    @staticmethod
+    def fromCompactJSON(data: str) -> "TradingState":
+        return state_from_compact(json.loads(data))
+
+
+# Compact TradingState layout: one flat array per section, in a fixed field order
+#   [timestamp, traderData, listings, order_depths, own_trades, market_trades, position, plain_observations, conversion_observations]
+#   listings:                 [symbol, product, denomination, ...]
+#   order_depths:             [symbol, bid levels, ask levels, bid price, bid qty, ..., ask price, ask qty (-ve), ..., ...]
+#   trades:                   [symbol, price, quantity, buyer, seller, timestamp, ...]
+#   position:                 [product, position, ...]
+#   plain_observations:       [product, value, ...]
+#   conversion_observations:  [product, bidPrice, askPrice, transportFees, exportTariff, importTariff, sunlight, humidity, ...]
+def compact_state(state: "TradingState") -> list:
+    listings = []
+    for listing in state.listings.values():
+        listings += (listing.symbol, listing.product, listing.denomination)
+
+    depths = []
+    for symbol, depth in state.order_depths.items():
+        depths += (symbol, len(depth.buy_orders), len(depth.sell_orders))
+        for level in depth.buy_orders.items():
+            depths += level
+        for level in depth.sell_orders.items():
+            depths += level
+
+    trades = ([], [])
+    for out, by_symbol in zip(trades, (state.own_trades, state.market_trades)):
+        for symbol_trades in by_symbol.values():
+            for trade in symbol_trades:
+                out += (trade.symbol, trade.price, trade.quantity, trade.buyer, trade.seller, trade.timestamp)
+
+    conversions = []
+    for product, o in state.observations.conversionObservations.items():
+        conversions += (product, o.bidPrice, o.askPrice, o.transportFees, o.exportTariff, o.importTariff, o.sunlight, o.humidity)
+
+    return [state.timestamp, state.traderData, listings, depths, trades[0], trades[1],
+            [item for pair in state.position.items() for item in pair],
+            [item for pair in state.observations.plainValueObservations.items() for item in pair],
+            conversions]
+
+
+def state_from_compact(data: list) -> "TradingState":
+    timestamp, trader_data, listings, depths, own_trades, market_trades, position, plain, conversions = data
+
+    order_depths = {}
+    idx = 0
+    while idx < len(depths):
+        symbol, bids, asks = depths[idx:idx + 3]
+        levels = depths[idx + 3:idx + 3 + 2 * (bids + asks)]
+        depth = order_depths[symbol] = OrderDepth()
+        depth.buy_orders = dict(zip(levels[0:2 * bids:2], levels[1:2 * bids:2]))
+        depth.sell_orders = dict(zip(levels[2 * bids::2], levels[2 * bids + 1::2]))
+        idx += 3 + 2 * (bids + asks)
+
+    own, market = {}, {}
+    for by_symbol, flat in ((own, own_trades), (market, market_trades)):
+        for idx in range(0, len(flat), 6):
+            by_symbol.setdefault(flat[idx], []).append(Trade(*flat[idx:idx + 6]))
+
+    return TradingState(trader_data, timestamp,
+                        {listings[idx]: Listing(*listings[idx:idx + 3]) for idx in range(0, len(listings), 3)},
+                        order_depths, own, market,
+                        dict(zip(position[::2], position[1::2])),
+                        Observation(dict(zip(plain[::2], plain[1::2])),
+                                    {conversions[idx]: ConversionObservation(*conversions[idx + 1:idx + 8]) for idx in range(0, len(conversions), 8)}))
+
+
+_public_slots = {}
+
+
+def public_fields(o) -> dict:
+    # Attributes of a plain or __slots__ object, caches like OrderDepth._book are left out of the JSON
+    if hasattr(o, "__dict__"):
+        return {key: value for key, value in o.__dict__.items() if not key.startswith("_")}
+
+    names = _public_slots.get(type(o))
+    if names is None:
+        names = _public_slots[type(o)] = [name for cls in type(o).__mro__ for name in getattr(cls, "__slots__", ()) if not name.startswith("_")]
+    return {name: getattr(o, name) for name in names}
 
     
 class ProsperityEncoder(JSONEncoder):
 
         def default(self, o):
-            return o.__dict__
\ No newline at end of file
+            return public_fields(o)
\ No newline at end of file
@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import data_cache
+
+# Refits the linear price models of the strategies from the data cache and writes them to
+# regression-coefs.json. round5-joshlee.py only loads it over the coefficients pasted into its
+# Trader with REGRESSION_ARTIFACT = True; the pasted ones are what the platform runs:
+#   starfruit  next STARFRUIT trade price from the latest 4 (what round1-josh.ipynb fitted)
+#   orchid     next ORCHIDS price from the latest 4 ORCHIDS, SUNLIGHT and HUMIDITY observations.
+#              Live, orchid_cache holds the ORCHIDS order book VWAP, not the observation price,
+#              and the bottles have no ORCHIDS book to fit or check that on, so this refit is not
+#              a drop-in replacement for the pasted orchid_coef.
+# Lagged design matrices are sliding window views over each day's arrays, solved with
+# np.linalg.lstsq. Days are concatenated in order like the notebook did, so windows span the
+# overnight gap; --split-days keeps them within a day. Every day after the first also gets a
+# walk-forward refit on the days before it, scored on that day.
+# Usage: python fit_regression.py [--models starfruit orchid] [--split-days] [--out FILE] [--print]
+
+ARTIFACT_VERSION = 1
+ARTIFACT_PATH = os.path.join(data_cache.ROOT, "regression-coefs.json")
+
+# The target is the next value of the first series, source is where the series come from
+MODELS = {
+    "starfruit": {"series": ["STARFRUIT"], "lags": 4, "source": "trades"},
+    "orchid": {"series": ["ORCHIDS", "SUNLIGHT", "HUMIDITY"], "lags": 4, "source": "observations"},
+}
+
+
+def load_series(round_num: int, day: int, model: Dict) -> List[np.ndarray]:
+    # The model's series for one day, None if the day doesn't have them
+    entry = data_cache.day_index(round_num, day)
+    if model["source"] == "trades":
+        symbol = model["series"][0]
+        if symbol not in entry.get("trades_nn", {}):
+            return None
+        return [np.asarray(data_cache.load_trades(round_num, day, symbol)["price"], dtype=np.float64)]
+
+    if "observations" not in entry:
+        return None
+    observations = data_cache.load_observations(round_num, day)
+    return [np.asarray(observations[name], dtype=np.float64) for name in model["series"]]
+
+
+def model_days(model: Dict) -> List[Tuple[int, int, List[np.ndarray]]]:
+    # (round, day, series) of every cached day with the model's data, in time order. Imported
+    # logs (log-*) replay days already in the CSVs, so they are left out.
+    found = []
+    for round_key in data_cache.read_index()["rounds"]:
+        if not round_key.lstrip("-").isdigit():
+            continue
+        for day in data_cache.days(int(round_key)):
+            series = load_series(int(round_key), day, model)
+            if series is not None and len(series[0]) > model["lags"]:
+                found.append((int(round_key), day, series))
+    return sorted(found, key=lambda item: item[:2])
+
+
+def design_matrix(series: List[np.ndarray], lags: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Row i holds the `lags` values of every series before value i + lags of the first one,
+    # oldest first like the Trader's caches, then a 1 for the intercept
+    rows = len(series[0]) - lags
+    X = np.empty((rows, len(series) * lags + 1))
+    for idx, values in enumerate(series):
+        X[:, idx * lags:(idx + 1) * lags] = np.lib.stride_tricks.sliding_window_view(values, lags)[:-1]
+    X[:, -1] = 1.0
+    return X, series[0][lags:]
+
+
+def days_design(days: List[Tuple[int, int, List[np.ndarray]]], lags: int, split_days: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    if not split_days:
+        return design_matrix([np.concatenate(column) for column in zip(*(series for _, _, series in days))], lags)
+    designs = [design_matrix(series, lags) for _, _, series in days]
+    return np.vstack([X for X, _ in designs]), np.concatenate([y for _, y in designs])
+
+
+def solve(X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, float]:
+    # Least squares coefficients and intercept
+    solution = np.linalg.lstsq(X, y, rcond=None)[0]
+    return solution[:-1], float(solution[-1])
+
+
+def rmse(X: np.ndarray, y: np.ndarray, coef: np.ndarray, intercept: float) -> float:
+    return float(np.sqrt(np.mean(np.square(X[:, :-1] @ coef + intercept - y))))
+
+
+def fit_model(model: Dict, split_days: bool = False) -> Dict:
+    days = model_days(model)
+    if not days:
+        raise ValueError(f"No cached days with {', '.join(model['series'])}, run python data_cache.py build")
+    lags = model["lags"]
+
+    X, y = days_design(days, lags, split_days)
+    coef, intercept = solve(X, y)
+
+    # Refit on the days before each day, scored on that day only
+    walk_forward = []
+    for idx in range(1, len(days)):
+        train_coef, train_intercept = solve(*days_design(days[:idx], lags, split_days))
+        test_X, test_y = design_matrix(days[idx][2], lags)
+        walk_forward.append({"round": days[idx][0], "day": days[idx][1], "coef": train_coef.tolist(), "intercept": train_intercept,
+                             "rmse": rmse(test_X, test_y, train_coef, train_intercept)})
+
+    return {
+        "series": model["series"],
+        "lags": lags,
+        "coef": coef.tolist(),
+        "intercept": intercept,
+        "trained_on": [[round_num, day] for round_num, day, _ in days],
+        "rows": len(y),
+        "split_days": split_days,
+        "rmse": rmse(X, y, coef, intercept),
+        "walk_forward": walk_forward
+    }
+
+
+def fit(names: List[str], split_days: bool = False) -> Dict:
+    return {"version": ARTIFACT_VERSION, "models": {name: fit_model(MODELS[name], split_days) for name in names}}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Refit the strategies' linear price models from the data cache")
+    parser.add_argument("--models", nargs="*", choices=sorted(MODELS), default=sorted(MODELS))
+    parser.add_argument("--split-days", action="store_true", help="don't let lag windows span two days")
+    parser.add_argument("--out", default=ARTIFACT_PATH, help="artifact to write, the strategy loads regression-coefs.json")
+    parser.add_argument("--print", dest="print_attributes", action="store_true", help="also print the Trader attributes to paste as the fallback")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    artifact = fit(args.models, args.split_days)
+    elapsed = time.perf_counter() - start
+
+    with open(args.out, "w") as f:
+        json.dump(artifact, f, indent=2)
+        f.write("\n")
+
+    print(f"fitted {', '.join(args.models)} in {elapsed * 1000:.1f}ms -> {args.out}")
+    for name, model in artifact["models"].items():
+        days = ", ".join(f"{round_num}/{day}" for round_num, day in model["trained_on"])
+        print(f"{name}: {model['rows']} rows from round/day {days}, in-sample rmse {model['rmse']:.4f}")
+        for step in model["walk_forward"]:
+            print(f"    walk-forward round {step['round']} day {step['day']}: rmse {step['rmse']:.4f}, intercept {step['intercept']:.6g}")
+        if args.print_attributes:
+            print(f"    {name}_coef = {model['coef']}")
+            print(f"    {name}_intercept = {model['intercept']!r}")
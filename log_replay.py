@@ -0,0 +1,266 @@
+import argparse
+import itertools
+import json
+import os
+import re
+import shutil
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+import backtester
+import data_cache
+
+# Imports a platform log (the file downloaded for a submission, or one written by
+# backtester.py --log) into the data cache, so the day can be replayed locally:
+#   python log_replay.py build <log file> [--name NAME]       -> cached as round "log-NAME"
+#   python log_replay.py replay <strategy file> NAME [--from TIMESTAMP]
+#   python backtester.py <strategy file> log-NAME --cached
+#
+# The log is streamed line by line, only the parsed columns are kept in memory, so logs of
+# hundreds of MB are fine. What is stored, next to the usual prices/ and trades_nn/ arrays:
+#   own_trades/<symbol>.npy   the submission's fills (buyer or seller SUBMISSION)
+#   run_log.npy               the Trader's Logger records, one row per line of run() output
+#   snapshots.jsonl           compact TradingState lines (TradingState.toCompactJSON layout) found in
+#                             the run output, their traderData and position let a replay start mid-day.
+#                             Round 5 prints them when its Trader has log_state_every set.
+#
+# replay compares the orders the replay sends with the BUY/SELL records of run_log. Ticks where
+# the Logger hit its byte cap (a DROPPED record) may be missing orders, so they are skipped.
+
+SECTIONS = {"Sandbox logs:": "sandbox", "Activities log:": "activities", "Trade History:": "trades"}
+
+# The platform writes trade history objects with a trailing comma after the last field
+TRAILING_COMMA = re.compile(r",(\s*})")
+
+RUN_LOG_SIGNALS = 4
+RUN_LOG_DTYPE = np.dtype([("timestamp", np.int64), ("level", "U1"), ("product", "U20"), ("side", "U8"),
+                          ("price", np.float64), ("quantity", np.float64), ("signals", np.float64, (RUN_LOG_SIGNALS,))])
+
+
+def iter_sections(path: str) -> Iterator[Tuple[str, str]]:
+    # (section, line) for every line of the log
+    section = None
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line in SECTIONS:
+                section = SECTIONS[line]
+                continue
+            yield section, line
+
+
+def iter_objects(lines: Iterator[str]) -> Iterator[dict]:
+    # JSON objects of the sandbox logs and the trade history, one "{" ... "}" block at a time.
+    # String values (lambdaLog) never span lines, their newlines are escaped.
+    block = None
+    for line in lines:
+        stripped = line.strip()
+        if block is None:
+            if stripped == "{":
+                block = [stripped]
+            continue
+
+        block.append(stripped)
+        if stripped in ("}", "},"):
+            yield json.loads(TRAILING_COMMA.sub(r"\1", "".join(block).rstrip(",")))
+            block = None
+
+
+def parse_number(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def parse_run_output(output: str, records: List[tuple], snapshots) -> int:
+    # Logger lines become run_log records, compact TradingState lines are written to
+    # snapshots, returns the number of other lines
+    other = 0
+    for line in output.splitlines():
+        fields = line.split(";")
+        if len(fields) >= 6 and fields[1] in ("D", "I", "W") and fields[0].isdigit():
+            signals = [parse_number(value) for value in fields[6:6 + RUN_LOG_SIGNALS]]
+            signals += [np.nan] * (RUN_LOG_SIGNALS - len(signals))
+            records.append((int(fields[0]), fields[1], fields[2], fields[3], parse_number(fields[4]), parse_number(fields[5]), signals))
+        elif line.startswith("[") and snapshots is not None:
+            try:
+                state = json.loads(line)
+            except ValueError:
+                other += 1
+                continue
+            if isinstance(state, list) and len(state) == 9:
+                position = state[6]
+                snapshots.write(json.dumps({"timestamp": state[0], "traderData": state[1], "position": dict(zip(position[::2], position[1::2]))}) + "\n")
+            else:
+                other += 1
+        elif line:
+            other += 1
+    return other
+
+
+def build(log_path: str, name: str) -> Dict:
+    round_key = "log-" + name
+    round_dir = os.path.join(data_cache.CACHE_DIR, "round-" + round_key)
+    shutil.rmtree(round_dir, ignore_errors=True)
+    os.makedirs(round_dir)
+
+    records, other_lines, ticks = [], 0, 0
+    prices: Dict[str, List[tuple]] = {}
+    trades: Dict[str, Dict[str, List[tuple]]] = {"trades_nn": {}, "own_trades": {}}
+    names = {"": 0}
+    days = set()
+    header = None
+
+    lines = iter_sections(log_path)
+    snapshots_path = os.path.join(round_dir, "snapshots.jsonl")
+
+    with open(snapshots_path, "w") as snapshots:
+        for section, group in itertools.groupby(lines, key=lambda item: item[0]):
+            group = (line for _, line in group)
+
+            if section == "sandbox":
+                for entry in iter_objects(group):
+                    ticks += 1
+                    other_lines += parse_run_output(entry.get("lambdaLog", ""), records, snapshots)
+
+            elif section == "activities":
+                for line in group:
+                    if not line:
+                        continue
+                    fields = line.split(";")
+                    if header is None:
+                        header = {column: idx for idx, column in enumerate(fields)}
+                        continue
+                    days.add(int(fields[header["day"]]))
+                    # Missing book levels are stored as price 0, volume 0 like data_cache does
+                    prices.setdefault(fields[header["product"]], []).append(
+                        tuple(float(fields[header[column]]) if fields[header[column]] else 0 for column in data_cache.PRICE_DTYPE.names))
+
+            elif section == "trades":
+                for trade in iter_objects(group):
+                    own = "SUBMISSION" in (trade["buyer"], trade["seller"])
+                    buyer = names.setdefault(trade["buyer"], len(names))
+                    seller = names.setdefault(trade["seller"], len(names))
+                    trades["own_trades" if own else "trades_nn"].setdefault(trade["symbol"], []).append(
+                        (int(trade["timestamp"]), int(float(trade["price"])), int(trade["quantity"]), buyer, seller))
+
+    if len(days) != 1:
+        raise ValueError(f"{log_path} has activities for days {sorted(days)}, expected the one day of a submission run")
+    day = days.pop()
+
+    day_dir = data_cache.day_dir(round_key, day)
+    entry = {"prices": {}, "trades_nn": {}, "own_trades": {}, "trades_nn_names": sorted(names, key=names.get)}
+
+    for product, rows in prices.items():
+        data_cache.save(os.path.join(day_dir, "prices", product + ".npy"), np.array(rows, dtype=data_cache.PRICE_DTYPE))
+        entry["prices"][product] = len(rows)
+
+    for kind, by_symbol in trades.items():
+        for symbol, rows in by_symbol.items():
+            data_cache.save(os.path.join(day_dir, kind, symbol + ".npy"), np.array(rows, dtype=data_cache.TRADE_DTYPE))
+            entry[kind][symbol] = len(rows)
+
+    data_cache.save(os.path.join(day_dir, "run_log.npy"), np.array(records, dtype=RUN_LOG_DTYPE))
+    os.replace(snapshots_path, os.path.join(day_dir, "snapshots.jsonl"))
+    entry.update(run_log=len(records), run_output_other_lines=other_lines, sandbox_ticks=ticks, source=os.path.abspath(log_path))
+
+    data_cache.register_day(round_key, day, entry)
+    return {"round": round_key, "day": day, **entry}
+
+
+def load_run_log(round_key: str, day: int) -> np.ndarray:
+    if "run_log" not in data_cache.day_index(round_key, day):
+        raise KeyError(f"No run log for {round_key} day {day}, import it with log_replay.py build")
+    return np.load(os.path.join(data_cache.day_dir(round_key, day), "run_log.npy"), mmap_mode="r")
+
+
+def load_snapshot(round_key: str, day: int, timestamp: int) -> Dict:
+    # Streams snapshots.jsonl for the one at timestamp
+    with open(os.path.join(data_cache.day_dir(round_key, day), "snapshots.jsonl")) as f:
+        for line in f:
+            snapshot = json.loads(line)
+            if snapshot["timestamp"] == timestamp:
+                return snapshot
+    raise KeyError(f"No TradingState snapshot at {timestamp} in {round_key} day {day}")
+
+
+def truncated_ticks(run_log: np.ndarray) -> set:
+    # Timestamps where the Logger dropped records, their logged orders may be incomplete
+    return {int(timestamp) for timestamp in run_log["timestamp"][run_log["side"] == "DROPPED"]}
+
+
+def logged_orders(run_log: np.ndarray) -> Dict[int, List[Tuple[str, int, int]]]:
+    # Orders the live run() logged, per timestamp
+    orders = {}
+    for row in run_log[(run_log["side"] == "BUY") | (run_log["side"] == "SELL")]:
+        orders.setdefault(int(row["timestamp"]), []).append((str(row["product"]), int(row["price"]), int(row["quantity"])))
+    return orders
+
+
+def replay(strategy_path: str, name: str, start: int = None, passive: bool = False, budget_ms: float = backtester.DEFAULT_BUDGET_MS) -> dict:
+    round_key = "log-" + name
+    day = data_cache.days(round_key)[0]
+    trader_class = backtester.load_strategy(strategy_path).Trader
+
+    ticks = backtester.iter_cached_ticks([(round_key, day)])
+    trader_data, start_position = "", None
+    if start is not None:
+        snapshot = load_snapshot(round_key, day, start)
+        trader_data, start_position = snapshot["traderData"], snapshot["position"]
+        ticks = itertools.dropwhile(lambda tick: tick[0] < start, ticks)
+
+    orders_log = []
+    result = backtester.replay_day(trader_class(), ticks, backtester.position_limits(trader_class), budget_ms, passive, orders_log,
+                                   trader_data=trader_data, start_position=start_position)
+
+    # Orders the replay sent vs what the live run() logged, for the products it logged orders of
+    run_log = load_run_log(round_key, day)
+    logged = logged_orders(run_log)
+    truncated = truncated_ticks(run_log)
+    products = {product for orders in logged.values() for product, _, _ in orders}
+    mismatches = []
+    for timestamp, orders in orders_log:
+        if timestamp in truncated:
+            continue
+        replayed = sorted((product, order.price, order.quantity) for product, product_orders in (orders or {}).items() if product in products for order in product_orders)
+        if replayed != sorted(logged.get(timestamp, [])):
+            mismatches.append({"timestamp": timestamp, "live": sorted(logged.get(timestamp, [])), "replay": replayed})
+
+    result.update(day=day, order_mismatches=mismatches, compared_products=sorted(products), truncated_ticks=sorted(truncated))
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import platform logs into the data cache and replay them")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="import a log as round log-NAME")
+    build_parser.add_argument("log", help="platform log file")
+    build_parser.add_argument("--name", help="defaults to the log file name")
+
+    replay_parser = commands.add_parser("replay", help="replay an imported log through a strategy and compare orders")
+    replay_parser.add_argument("strategy", help="strategy file, e.g. round5-joshlee.py")
+    replay_parser.add_argument("name", help="NAME the log was built with")
+    replay_parser.add_argument("--from", dest="start", type=int, help="start at this timestamp, from its TradingState snapshot")
+    replay_parser.add_argument("--passive", action="store_true", help="also fill resting orders against the trades printed each tick")
+    replay_parser.add_argument("--budget-ms", type=float, default=backtester.DEFAULT_BUDGET_MS, help="flag run() calls slower than this")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        name = args.name or os.path.splitext(os.path.basename(args.log))[0]
+        entry = build(args.log, name)
+        print(f"{args.log} -> {entry['round']} day {entry['day']}: {entry['sandbox_ticks']} ticks, {sum(entry['prices'].values())} book rows, "
+              f"{sum(entry['trades_nn'].values())} market trades, {sum(entry['own_trades'].values())} own trades, {entry['run_log']} run log records")
+    else:
+        result = replay(args.strategy, args.name, args.start, args.passive, args.budget_ms)
+        latency = result["latency"]
+        print(f"day {result['day']}: pnl {result['pnl']:.1f} over {result['ticks']} ticks, {result['errors']} errors")
+        print(f"    latency p50 {latency['p50_ms']:.3f}ms p99 {latency['p99_ms']:.3f}ms max {latency['max_ms']:.3f}ms, {len(latency['over_budget'])} ticks over {latency['budget_ms']:g}ms")
+        for tick in latency["over_budget"]:
+            print(f"    over budget at {tick['timestamp']}: {tick['ms']:.1f}ms")
+        print(f"    {len(result['order_mismatches'])} ticks where orders differ from the log ({', '.join(result['compared_products'])}), "
+              f"{len(result['truncated_ticks'])} ticks with dropped log records not compared")
+        for mismatch in result["order_mismatches"][:10]:
+            print(f"    {mismatch['timestamp']}: live {mismatch['live']}, replay {mismatch['replay']}")
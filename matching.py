@@ -0,0 +1,127 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from datamodel import Order, OrderDepth, Trade
+
+# Price-time priority matching of Trader.run orders against the visible book levels.
+# Orders, book levels, prints and fills are (n, 2) int64 arrays of [price, quantity]:
+#   orders: quantity > 0 buys, < 0 sells, in the order they were returned (time priority)
+#   bids/asks: best level first, quantities positive
+#   prints: market trades printed this tick, quantities positive
+#   fills: quantity > 0 bought, < 0 sold, at the fill price
+
+EMPTY = np.zeros((0, 2), dtype=np.int64)
+
+
+def order_array(orders: List[Order]) -> np.ndarray:
+    if not orders:
+        return EMPTY
+    return np.array([(order.price, order.quantity) for order in orders], dtype=np.int64)
+
+
+def book_arrays(order_depth: OrderDepth) -> Tuple[np.ndarray, np.ndarray]:
+    book = order_depth.book
+    bids = np.array(list(book.buy_orders.items()), dtype=np.int64).reshape(-1, 2)
+    asks = np.array(list(book.sell_orders.items()), dtype=np.int64).reshape(-1, 2)
+    asks[:, 1] = -asks[:, 1]
+    return bids, asks
+
+
+def print_array(trades: List[Trade]) -> np.ndarray:
+    if not trades:
+        return EMPTY
+    return np.array([(trade.price, trade.quantity) for trade in trades], dtype=np.int64)
+
+
+def within_limit(orders: np.ndarray, position: int, limit: int) -> bool:
+    # The exchange rejects every order for a product if all buys (or all sells) filling would breach the limit
+    quantities = orders[:, 1]
+    return position + quantities[quantities > 0].sum() <= limit and position + quantities[quantities < 0].sum() >= -limit
+
+
+def take(quantity: int, levels: np.ndarray, marketable: np.ndarray) -> np.ndarray:
+    # Fills up to quantity from the marketable levels in priority order, consuming their volume in place
+    available = np.where(marketable, levels[:, 1], 0)
+    filled_before = np.cumsum(available) - available
+    taken = np.clip(quantity - filled_before, 0, available)
+    levels[:, 1] -= taken
+    return taken
+
+
+def match(orders: np.ndarray, bids: np.ndarray, asks: np.ndarray, position: int, limit: int, prints: np.ndarray = None) -> np.ndarray:
+    # Aggressive fills against the book first. With prints, whatever is left of each order then
+    # rests at its price and trades against this tick's market prints, queued behind visible
+    # book volume at the same price.
+    if len(orders) == 0 or not within_limit(orders, position, limit):
+        return EMPTY
+
+    bids, asks = bids.copy(), asks.copy()
+    fills = []
+    remaining = np.abs(orders[:, 1])
+
+    for idx, (price, quantity) in enumerate(orders):
+        if quantity > 0:
+            taken = take(quantity, asks, asks[:, 0] <= price)
+            fills.extend((level_price, qty) for level_price, qty in zip(asks[:, 0], taken) if qty > 0)
+        else:
+            taken = take(-quantity, bids, bids[:, 0] >= price)
+            fills.extend((level_price, -qty) for level_price, qty in zip(bids[:, 0], taken) if qty > 0)
+        remaining[idx] -= taken.sum()
+
+    if prints is not None and len(prints) and remaining.any():
+        print_left = prints[:, 1].copy()
+        queues = {}
+
+        for idx, (price, quantity) in enumerate(orders):
+            if remaining[idx] == 0:
+                continue
+
+            side = 1 if quantity > 0 else -1
+            if side > 0:
+                # Sellers printing below our bid would have hit us first, at our price
+                better = prints[:, 0] < price
+                book = bids
+            else:
+                better = prints[:, 0] > price
+                book = asks
+
+            if (side, price) not in queues:
+                queues[side, price] = book[book[:, 0] == price, 1].sum()
+
+            # Volume printed at our price first clears the visible queue ahead of us
+            at_price = prints[:, 0] == price
+            queued = np.where(at_price, print_left, 0)
+            queue_taken = np.clip(queues[side, price] - (np.cumsum(queued) - queued), 0, queued)
+            queues[side, price] -= queue_taken.sum()
+            print_left -= queue_taken
+
+            eligible = np.where(better | at_price, print_left, 0)
+            filled_before = np.cumsum(eligible) - eligible
+            taken = np.clip(remaining[idx] - filled_before, 0, eligible)
+            print_left -= taken
+
+            if taken.sum() > 0:
+                fills.append((price, side * taken.sum()))
+
+    if not fills:
+        return EMPTY
+    return np.array(fills, dtype=np.int64)
+
+
+def match_orders(orders: Dict[str, List[Order]], order_depths: Dict[str, OrderDepth], position: Dict[str, int], limits: Dict[str, int], prints: Dict[str, List[Trade]] = None) -> Dict[str, np.ndarray]:
+    # Matches a whole Trader.run result, returns fills per product
+    fills = {}
+
+    for product, product_orders in orders.items():
+        if product not in order_depths or not product_orders:
+            continue
+
+        bids, asks = book_arrays(order_depths[product])
+        product_prints = print_array(prints.get(product, [])) if prints is not None else None
+        product_fills = match(order_array(product_orders), bids, asks, position.get(product, 0), limits.get(product, 0), product_prints)
+
+        if len(product_fills):
+            fills[product] = product_fills
+
+    return fills
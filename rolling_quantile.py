@@ -0,0 +1,74 @@
+import argparse
+import time
+
+import numpy as np
+
+import backtester
+import data_cache
+
+# Batch rolling quantiles over data_cache arrays, the research counterpart of RollingQuantile in
+# round5-joshlee.py. Same semantics as pandas rolling(window, min_periods, center).quantile(q)
+# (linear interpolation, q=0.5 is the median), e.g. read_data.py's smoothing:
+#   python rolling_quantile.py 1 0 AMETHYSTS --window 5 --min-periods 3 --center
+# Full windows are one np.quantile over a sliding window view, only the partial windows at the
+# edges are done one by one.
+# Usage: python rolling_quantile.py <round> <day> <product> [--window W] [--q Q] [--min-periods M] [--center] [--verify] [--out CSV]
+
+
+def rolling_quantile(values: np.ndarray, window: int, q: float = 0.5, min_periods: int = None, center: bool = False) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    min_periods = window if min_periods is None else min_periods
+    n = len(values)
+    result = np.full(n, np.nan)
+
+    # Window of output i is values[i - before:i + after + 1], clipped to the array
+    after = (window - 1) // 2 if center else 0
+    before = window - 1 - after
+
+    if n >= window:
+        result[before:n - after] = np.quantile(np.lib.stride_tricks.sliding_window_view(values, window), q, axis=1)
+
+    for idx in list(range(min(before, n))) + list(range(max(n - after, before), n)):
+        partial = values[max(idx - before, 0):idx + after + 1]
+        if len(partial) >= min_periods:
+            result[idx] = np.quantile(partial, q)
+    return result
+
+
+def verify(values: np.ndarray, window: int, q: float, strategy_path: str = "round5-joshlee.py") -> float:
+    # Largest difference from the live RollingQuantile fed one value at a time (trailing windows)
+    live = backtester.load_strategy(strategy_path).RollingQuantile(window, q)
+    expected = []
+    for value in values.tolist():
+        live.append(value)
+        expected.append(live.value())
+    batch = rolling_quantile(values, window, q, min_periods=1)
+    return float(np.max(np.abs(batch - expected)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rolling quantile of a product's mid price")
+    parser.add_argument("round", type=int)
+    parser.add_argument("day", type=int)
+    parser.add_argument("product")
+    parser.add_argument("--window", type=int, default=5)
+    parser.add_argument("--q", type=float, default=0.5, help="quantile, 0.5 for the median")
+    parser.add_argument("--min-periods", type=int, help="fewest values a window needs, defaults to the window")
+    parser.add_argument("--center", action="store_true", help="center the window on each tick instead of trailing it")
+    parser.add_argument("--verify", action="store_true", help="compare trailing windows against the live RollingQuantile")
+    parser.add_argument("--out", help="write timestamp;mid_price;quantile rows to this CSV")
+    args = parser.parse_args()
+
+    prices = data_cache.load_prices(args.round, args.day, args.product)
+    mids = np.asarray(prices["mid_price"])
+
+    start = time.perf_counter()
+    smoothed = rolling_quantile(mids, args.window, args.q, args.min_periods, args.center)
+    elapsed = time.perf_counter() - start
+    print(f"{args.product} round {args.round} day {args.day}: {len(mids)} ticks in {elapsed * 1000:.1f}ms, "
+          f"mean abs deviation from the mid {np.nanmean(np.abs(smoothed - mids)):.3f}")
+
+    if args.verify:
+        print(f"    largest difference from the live RollingQuantile: {verify(mids, args.window, args.q):.3g}")
+    if args.out:
+        np.savetxt(args.out, np.column_stack([prices["timestamp"], mids, smoothed]), delimiter=";", fmt=["%d", "%.1f", "%.6g"], header="timestamp;mid_price;quantile", comments="")
@@ -1,10 +1,1046 @@
 from datamodel import OrderDepth, UserId, TradingState, Order
-from typing import List
+from typing import Dict, List, Tuple
 from collections import OrderedDict
+from array import array
+import base64
+import heapq
 import json
+import math
+import os
 import statistics
+import struct
+import time
+import tracemalloc
+import zlib
+
+
+# Sorted view of an OrderDepth with the top of book worked out once, run() builds one per product
+# per tick for every compute_* method to share. Same as datamodel.OrderBook, which the platform's
+# datamodel doesn't have, but without the VWAP: FeatureEngine works that out with the other
+# depth features. Prices and volumes of a missing side are None.
+class OrderBook:
+    __slots__ = ("buy_orders", "sell_orders", "best_bid", "best_bid_volume", "best_ask", "best_ask_volume", "mid", "spread")
+
+    def __init__(self, order_depth: OrderDepth):
+        self.buy_orders: Dict[int, int] = dict(sorted(order_depth.buy_orders.items(), reverse=True))
+        self.sell_orders: Dict[int, int] = dict(sorted(order_depth.sell_orders.items()))
+
+        self.best_bid = next(iter(self.buy_orders), None)
+        self.best_bid_volume = self.buy_orders.get(self.best_bid)
+        self.best_ask = next(iter(self.sell_orders), None)
+        self.best_ask_volume = self.sell_orders.get(self.best_ask)
+
+        self.mid = self.spread = None
+        if self.best_bid is not None and self.best_ask is not None:
+            self.mid = (self.best_bid + self.best_ask) / 2.0
+            self.spread = self.best_ask - self.best_bid
+
+
+# Depth features of every product's book, each product's in a preallocated array("d") indexed
+# by the constants below and overwritten in place every tick, so run() allocates nothing for
+# them. One pass over each side sums its volume and notional (price * volume) as ints, then:
+#   vwap        mean of the bid side's and the ask side's volume weighted price
+#   microprice  best bid and ask weighted by the volume on the opposite best level
+#   imbalance   (bid volume - ask volume) / (bid volume + ask volume), over all visible levels
+#   depth_mid   notional over volume across both sides
+#   spread      best ask - best bid
+# All NaN while a side has no volume. book_features.py computes the same columns for whole
+# days from the data cache, with the same integer sums and float operations in the same order,
+# so the two agree bit for bit.
+class FeatureEngine:
+    NAMES = ("vwap", "microprice", "imbalance", "depth_mid", "spread")
+    VWAP, MICROPRICE, IMBALANCE, DEPTH_MID, SPREAD = range(len(NAMES))
+
+    def __init__(self):
+        self.values: Dict[str, array] = {}
+
+    def update(self, product: str, book: OrderBook) -> array:
+        values = self.values.get(product)
+        if values is None:
+            values = self.values[product] = array("d", [math.nan] * len(self.NAMES))
+
+        bid_volume = bid_notional = 0
+        for price, volume in book.buy_orders.items():
+            bid_volume += volume
+            bid_notional += price * volume
+        ask_volume = ask_notional = 0
+        for price, volume in book.sell_orders.items():
+            ask_volume -= volume
+            ask_notional -= price * volume
+
+        if not (bid_volume and ask_volume):
+            for idx in range(len(values)):
+                values[idx] = math.nan
+            return values
+
+        best_bid_volume, best_ask_volume = book.best_bid_volume, -book.best_ask_volume
+        values[self.VWAP] = (bid_notional / bid_volume + ask_notional / ask_volume) / 2
+        values[self.MICROPRICE] = (book.best_bid * best_ask_volume + book.best_ask * best_bid_volume) / (best_bid_volume + best_ask_volume)
+        values[self.IMBALANCE] = (bid_volume - ask_volume) / (bid_volume + ask_volume)
+        values[self.DEPTH_MID] = (bid_notional + ask_notional) / (bid_volume + ask_volume)
+        values[self.SPREAD] = book.best_ask - book.best_bid
+        return values
+
+
+# What the strategies read about the market each tick, built once at the top of run(): the
+# sorted OrderBook of every product and, per product, its top of book, mid, spread, VWAP (None
+# while a side has no volume), FeatureEngine row and the position going into the tick. Each
+# field is a dict keyed by product, so a strategy picks its columns without touching the order
+# depths again.
+class MarketSnapshot:
+    __slots__ = ("timestamp", "books", "buy_orders", "sell_orders", "best_bid", "best_bid_volume", "best_ask", "best_ask_volume", "mid", "spread", "vwap", "features", "position")
+
+    def __init__(self, state: TradingState, features: FeatureEngine):
+        self.timestamp = state.timestamp
+        self.books = {product: OrderBook(order_depth) for product, order_depth in state.order_depths.items()}
+
+        books = self.books.items()
+        self.buy_orders = {product: book.buy_orders for product, book in books}
+        self.sell_orders = {product: book.sell_orders for product, book in books}
+        self.best_bid = {product: book.best_bid for product, book in books}
+        self.best_bid_volume = {product: book.best_bid_volume for product, book in books}
+        self.best_ask = {product: book.best_ask for product, book in books}
+        self.best_ask_volume = {product: book.best_ask_volume for product, book in books}
+        self.mid = {product: book.mid for product, book in books}
+        self.spread = {product: book.spread for product, book in books}
+        self.features = {product: features.update(product, book) for product, book in books}
+        vwap = FeatureEngine.VWAP
+        self.vwap = {product: None if math.isnan(values[vwap]) else values[vwap] for product, values in self.features.items()}
+
+        # 0 for products with a book but no position
+        self.position = dict.fromkeys(self.books, 0)
+        self.position.update(state.position)
+
+
+# Fixed-capacity FIFO of the latest values, oldest values are overwritten once full
+class RingBuffer:
+    def __init__(self, capacity: int, values: List[float] = ()):
+        values = list(values[-capacity:])
+        self.capacity = capacity
+        self.data = values + [0.0] * (capacity - len(values))
+        self.start = 0
+        self.size = len(values)
+
+    def append(self, value: float):
+        if self.size < self.capacity:
+            self.data[(self.start + self.size) % self.capacity] = value
+            self.size += 1
+        else:
+            self.data[self.start] = value
+            self.start = (self.start + 1) % self.capacity
+
+    def to_list(self) -> List[float]:
+        # Values in insertion order, oldest first
+        end = self.start + self.size
+        if end <= self.capacity:
+            return self.data[self.start:end]
+        return self.data[self.start:] + self.data[:end - self.capacity]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.to_list()[idx]
+        if idx < 0:
+            idx += self.size
+        if not 0 <= idx < self.size:
+            raise IndexError("RingBuffer index out of range")
+        return self.data[(self.start + idx) % self.capacity]
+
+
+# Rolling mean/stdev over one or more trailing windows sharing a single RingBuffer.
+# Each window keeps a running sum and a Welford-style sum of squared deviations,
+# so a push is O(1) per window instead of slicing and re-reducing the history.
+class RollingStats:
+    # Recompute the running moments from the buffer every this many pushes to stop float drift
+    RESYNC_EVERY = 1000
+
+    def __init__(self, windows: List[int], values: List[float] = ()):
+        self.windows = sorted(windows)
+        self.buffer = RingBuffer(self.windows[-1])
+        self.totals = [0.0] * len(self.windows)
+        self.m2s = [0.0] * len(self.windows)
+        self.pushes = 0
+
+        for value in values:
+            self.append(value)
+
+    def append(self, value: float):
+        buffer = self.buffer
+        size = len(buffer)
+
+        for idx, window in enumerate(self.windows):
+            total = self.totals[idx]
+            if size < window:
+                # Window still filling up
+                n = size + 1
+                old_mean = total / size if size else 0.0
+                total += value
+                self.m2s[idx] += (value - old_mean) * (value - total / n)
+            else:
+                # Slide window: value enters, buffer[-window] leaves
+                leaving = buffer[size - window]
+                old_mean = total / window
+                total += value - leaving
+                self.m2s[idx] += (value - leaving) * (value - total / window + leaving - old_mean)
+            self.totals[idx] = total
+
+        buffer.append(value)
+        self.pushes += 1
+
+        if self.pushes % self.RESYNC_EVERY == 0:
+            self.resync()
+
+    def resync(self):
+        values = self.buffer.to_list()
+
+        for idx, window in enumerate(self.windows):
+            tail = values[-window:]
+            total = math.fsum(tail)
+            mean = total / len(tail)
+            self.totals[idx] = total
+            self.m2s[idx] = math.fsum((value - mean) ** 2 for value in tail)
+
+    def _window_index(self, window: int) -> int:
+        return self.windows.index(window)
+
+    def count(self, window: int) -> int:
+        return min(len(self.buffer), window)
+
+    def mean(self, window: int) -> float:
+        return self.totals[self._window_index(window)] / self.count(window)
+
+    def variance(self, window: int) -> float:
+        # Sample variance, matching statistics.variance
+        return max(self.m2s[self._window_index(window)], 0.0) / (self.count(window) - 1)
+
+    def stdev(self, window: int) -> float:
+        return math.sqrt(self.variance(window))
+
+    def last(self) -> float:
+        return self.buffer[-1]
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __getitem__(self, idx):
+        return self.buffer[idx]
+
+    def to_dict(self) -> dict:
+        return {"v": self.buffer.to_list(), "t": self.totals, "m": self.m2s, "p": self.pushes}
+
+    @classmethod
+    def from_dict(cls, windows: List[int], data) -> "RollingStats":
+        # Plain lists are histories written before RollingStats existed
+        if isinstance(data, list):
+            return cls(windows, data[-max(windows):])
+
+        stats = cls(windows)
+        stats.buffer = RingBuffer(stats.windows[-1], data["v"])
+        stats.totals = data["t"]
+        stats.m2s = data["m"]
+        stats.pushes = data["p"]
+        return stats
+
+
+# Quantile of the latest `window` values, interpolated linearly between the two values around
+# it like pandas rolling().quantile() (q=0.5 is rolling().median()). Two heaps split the window:
+# `low` (a max-heap, stored negated) holds the smallest floor(q * (n - 1)) + 1 values and `high`
+# the rest, so the answer is read off their tops. Each value carries its insertion id, expired
+# ids are dropped when they reach a top (or in one sweep once a window's worth has built up),
+# so an append costs O(log window) amortized.
+class RollingQuantile:
+    def __init__(self, window: int, q: float = 0.5, values: List[float] = ()):
+        self.window = window
+        self.q = q
+        self.low: List[tuple] = []
+        self.high: List[tuple] = []
+        # Ids of the unexpired values in low, and of expired values still in a heap
+        self.low_ids = set()
+        self.expired = set()
+        self.count = 0
+
+        for value in values:
+            self.append(value)
+
+    def append(self, value: float):
+        if self.count >= self.window:
+            expiring = self.count - self.window
+            self.low_ids.discard(expiring)
+            self.expired.add(expiring)
+            if len(self.expired) > self.window:
+                self._compact()
+
+        self._prune(self.low)
+        if self.low and value <= -self.low[0][0]:
+            heapq.heappush(self.low, (-value, self.count))
+            self.low_ids.add(self.count)
+        else:
+            heapq.heappush(self.high, (value, self.count))
+        self.count += 1
+
+        # Move tops across until low holds its share of the window
+        target = int(self.q * (len(self) - 1)) + 1
+        while len(self.low_ids) > target:
+            self._prune(self.low)
+            negated, idx = heapq.heappop(self.low)
+            self.low_ids.discard(idx)
+            heapq.heappush(self.high, (-negated, idx))
+        while len(self.low_ids) < target:
+            self._prune(self.high)
+            value, idx = heapq.heappop(self.high)
+            heapq.heappush(self.low, (-value, idx))
+            self.low_ids.add(idx)
+
+    def _compact(self):
+        # Expired values buried under a top would otherwise pile up, drop them all at once
+        self.low = [entry for entry in self.low if entry[1] not in self.expired]
+        self.high = [entry for entry in self.high if entry[1] not in self.expired]
+        heapq.heapify(self.low)
+        heapq.heapify(self.high)
+        self.expired.clear()
+
+    def _prune(self, heap: List[tuple]):
+        while heap and heap[0][1] in self.expired:
+            self.expired.discard(heapq.heappop(heap)[1])
+
+    def value(self) -> float:
+        self._prune(self.low)
+        self._prune(self.high)
+        lower = -self.low[0][0]
+        position = self.q * (len(self) - 1)
+        fraction = position - int(position)
+        if not fraction:
+            return lower
+        return lower + fraction * (self.high[0][0] - lower)
+
+    def __len__(self) -> int:
+        return min(self.count, self.window)
+
+    def to_dict(self) -> dict:
+        # The heaps as they are, so loading is linear with no re-sorting
+        return {"l": [-value for value, _ in self.low], "li": [idx for _, idx in self.low], "h": [value for value, _ in self.high],
+                "hi": [idx for _, idx in self.high], "x": list(self.expired), "n": self.count}
+
+    @classmethod
+    def from_dict(cls, window: int, q: float, data: dict) -> "RollingQuantile":
+        quantile = cls(window, q)
+        quantile.low = [(-value, idx) for value, idx in zip(data["l"], data["li"])]
+        quantile.high = list(zip(data["h"], data["hi"]))
+        quantile.expired = set(data["x"])
+        quantile.low_ids = {idx for _, idx in quantile.low} - quantile.expired
+        quantile.count = data["n"]
+        return quantile
+
+
+# traderData codecs, Trader.codec picks the one used to write state. Values are packed one
+# field at a time so TraderState can keep untouched fields as raw segments between ticks.
+# Every codec can read legacy JSON blobs, and binary blobs carry a version header.
+class JsonCodec:
+    def pack(self, value) -> bytes:
+        return json.dumps(value).encode("utf-8")
+
+    def unpack(self, raw: bytes):
+        return json.loads(raw)
+
+    def encode_fields(self, segments: Dict[str, bytes]) -> str:
+        return "{" + ", ".join(json.dumps(name) + ": " + raw.decode("utf-8") for name, raw in segments.items()) + "}"
+
+    def decode_fields(self, blob: str) -> Dict[str, bytes]:
+        if blob.startswith("TD"):
+            # Written by BinaryCodec, re-pack so segments are in this codec's format
+            binary = BinaryCodec()
+            return {name: self.pack(binary.unpack(raw)) for name, raw in binary.decode_fields(blob).items()}
+        return {name: self.pack(value) for name, value in json.loads(blob).items()}
+
+    def encode(self, data: dict) -> str:
+        return json.dumps(data)
+
+    def decode(self, blob: str) -> dict:
+        if not blob.startswith("TD"):
+            return json.loads(blob)
+        return {name: self.unpack(raw) for name, raw in self.decode_fields(blob).items()}
+
+
+# Header is "TD" + version + compression flag ("z" zlib, "-" none) + text flag ("4" base64, "8" base85).
+# Version 2 payloads are a sequence of (name, length, segment) entries, each segment a tag-length-value
+# encoding where number lists are packed arrays instead of decimal text: D (float64), E (float32) or
+# q (int64). Version 1 payloads were a single TLV dict and are still readable.
+class BinaryCodec(JsonCodec):
+    VERSION = "2"
+
+    def __init__(self, float_type: str = "d", compress: bool = False, text: str = "b64"):
+        # Arrays are written as float32 whenever that is lossless, float_type "f" forces it even when lossy
+        self.float_type = float_type
+        self.compress = compress
+        self.text = text
+
+    def encode(self, data: dict) -> str:
+        return self.encode_fields({name: self.pack(value) for name, value in data.items()})
+
+    def pack(self, value) -> bytes:
+        out = bytearray()
+        self._pack(value, out)
+        return bytes(out)
+
+    def unpack(self, raw: bytes):
+        return self._unpack(raw, 0)[0]
+
+    def encode_fields(self, segments: Dict[str, bytes]) -> str:
+        out = bytearray()
+        for name, raw in segments.items():
+            encoded = name.encode("utf-8")
+            out += struct.pack("<B", len(encoded)) + encoded + struct.pack("<I", len(raw)) + raw
+        payload = bytes(out)
+
+        if self.compress:
+            payload = zlib.compress(payload)
+
+        if self.text == "b85":
+            body = base64.b85encode(payload)
+        else:
+            body = base64.b64encode(payload)
+
+        return "TD" + self.VERSION + ("z" if self.compress else "-") + ("8" if self.text == "b85" else "4") + body.decode("ascii")
+
+    def decode_fields(self, blob: str) -> Dict[str, bytes]:
+        if not blob.startswith("TD"):
+            return super().decode_fields(blob)
+
+        version, compressed, text = blob[2], blob[3], blob[4]
+        if version not in ("1", "2"):
+            raise ValueError("Unsupported traderData version " + version)
+
+        body = blob[5:].encode("ascii")
+        payload = base64.b85decode(body) if text == "8" else base64.b64decode(body)
+        if compressed == "z":
+            payload = zlib.decompress(payload)
+
+        if version == "1":
+            return {name: self.pack(value) for name, value in self._unpack(payload, 0)[0].items()}
+
+        segments, pos = {}, 0
+        while pos < len(payload):
+            name_length = payload[pos]
+            name = payload[pos + 1:pos + 1 + name_length].decode("utf-8")
+            pos += 1 + name_length
+            length = struct.unpack_from("<I", payload, pos)[0]
+            segments[name] = payload[pos + 4:pos + 4 + length]
+            pos += 4 + length
+
+        return segments
+
+    def _pack(self, value, out: bytearray):
+        if value is None:
+            out += b"N"
+        elif value is True:
+            out += b"T"
+        elif value is False:
+            out += b"F"
+        elif isinstance(value, int):
+            out += b"i" + struct.pack("<q", value)
+        elif isinstance(value, float):
+            out += b"d" + struct.pack("<d", value)
+        elif isinstance(value, str):
+            encoded = value.encode("utf-8")
+            out += b"s" + struct.pack("<I", len(encoded)) + encoded
+        elif isinstance(value, dict):
+            out += b"m" + struct.pack("<I", len(value))
+            for key, item in value.items():
+                encoded = key.encode("utf-8")
+                out += struct.pack("<B", len(encoded)) + encoded
+                self._pack(item, out)
+        elif all(type(item) is int for item in value):
+            out += b"q" + struct.pack("<I", len(value)) + array("q", value).tobytes()
+        elif all(type(item) in (int, float) for item in value):
+            packed = array("f", value)
+            # Mid prices are half-integers, which float32 holds exactly, so only widen when needed
+            if self.float_type == "f" or packed.tolist() == value:
+                out += b"E" + struct.pack("<I", len(value)) + packed.tobytes()
+            else:
+                out += b"D" + struct.pack("<I", len(value)) + array("d", value).tobytes()
+        else:
+            out += b"l" + struct.pack("<I", len(value))
+            for item in value:
+                self._pack(item, out)
+
+    def _unpack(self, payload: bytes, pos: int):
+        tag = payload[pos:pos + 1]
+        pos += 1
+
+        if tag == b"N":
+            return None, pos
+        if tag == b"T":
+            return True, pos
+        if tag == b"F":
+            return False, pos
+        if tag == b"i":
+            return struct.unpack_from("<q", payload, pos)[0], pos + 8
+        if tag == b"d":
+            return struct.unpack_from("<d", payload, pos)[0], pos + 8
+
+        length = struct.unpack_from("<I", payload, pos)[0]
+        pos += 4
+
+        if tag == b"s":
+            return payload[pos:pos + length].decode("utf-8"), pos + length
+        if tag == b"q":
+            end = pos + 8 * length
+            return array("q", payload[pos:end]).tolist(), end
+        if tag == b"D":
+            end = pos + 8 * length
+            return array("d", payload[pos:end]).tolist(), end
+        if tag == b"E":
+            end = pos + 4 * length
+            return array("f", payload[pos:end]).tolist(), end
+        if tag == b"m":
+            result = {}
+            for _ in range(length):
+                key_length = payload[pos]
+                key = payload[pos + 1:pos + 1 + key_length].decode("utf-8")
+                result[key], pos = self._unpack(payload, pos + 1 + key_length)
+            return result, pos
+        if tag == b"l":
+            result = []
+            for _ in range(length):
+                item, pos = self._unpack(payload, pos)
+                result.append(item)
+            return result, pos
+
+        raise ValueError("Corrupt traderData payload")
+
+
+# Declares one piece of Trader state carried between ticks in traderData. Used as a class
+# attribute on Trader, it reads and writes through Trader.trader_state, so the field list
+# lives in one place and marshal/unmarshal are generated from it.
+#   kind "value": plain JSON-like value, "list": list copied from default, "stats": RollingStats over windows,
+#   "quantile": RollingQuantile of q over windows[0]
+class StateField:
+    def __init__(self, kind: str = "value", default=None, windows: List[int] = (), q: float = 0.5):
+        self.kind = kind
+        self.default = default
+        self.windows = windows
+        self.q = q
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, trader, owner=None):
+        if trader is None:
+            return self
+        return trader.trader_state.get(self.name)
+
+    def __set__(self, trader, value):
+        trader.trader_state.set(self.name, value)
+
+    def new(self):
+        if self.kind == "stats":
+            return RollingStats(self.windows)
+        if self.kind == "quantile":
+            return RollingQuantile(self.windows[0], self.q)
+        if self.kind == "list":
+            return list(self.default or [])
+        return self.default
+
+    def load(self, data):
+        if self.kind == "stats":
+            return RollingStats.from_dict(self.windows, data)
+        if self.kind == "quantile":
+            return RollingQuantile.from_dict(self.windows[0], self.q, data)
+        return data
+
+    def dump(self, value):
+        if self.kind in ("stats", "quantile"):
+            return value.to_dict()
+        return value
+
+
+# Per-tick view of the declared StateFields. Fields are decoded on first access, and only
+# fields that were accessed (and so may have been mutated) are re-packed on encode, the
+# rest are written back as the raw segments they arrived in.
+class TraderState:
+    def __init__(self, fields: Dict[str, StateField], codec, segments: Dict[str, bytes] = None):
+        self.fields = fields
+        self.codec = codec
+        self.segments = segments or {}
+        self.values = {}
+
+    @staticmethod
+    def fields_of(cls) -> Dict[str, StateField]:
+        # Collected once per class, subclasses may add or override fields
+        if "_state_fields" not in cls.__dict__:
+            fields = {}
+            for klass in reversed(cls.__mro__):
+                for name, value in vars(klass).items():
+                    if isinstance(value, StateField):
+                        fields[name] = value
+            cls._state_fields = fields
+        return cls._state_fields
+
+    @classmethod
+    def decode(cls, fields: Dict[str, StateField], codec, blob: str) -> "TraderState":
+        return cls(fields, codec, codec.decode_fields(blob) if blob else {})
+
+    def get(self, name: str):
+        if name not in self.values:
+            field = self.fields[name]
+            if name in self.segments:
+                self.values[name] = field.load(self.codec.unpack(self.segments[name]))
+            else:
+                self.values[name] = field.new()
+        return self.values[name]
+
+    def set(self, name: str, value):
+        self.values[name] = value
+
+    def encode(self) -> str:
+        segments = {}
+        for name, field in self.fields.items():
+            if name in self.values:
+                segments[name] = self.codec.pack(field.dump(self.values[name]))
+            elif name in self.segments:
+                segments[name] = self.segments[name]
+        return self.codec.encode_fields(segments)
+
+
+# Structured log records collected during run() and printed once at the end of it, one line per
+# record: timestamp;level;product;side;price;quantity;signals... Records below `level` are
+# dropped as they are logged, before any formatting, and a tick's output is capped at
+# `max_bytes` (cut at a record boundary, with a count of what was cut) so logging can't eat
+# into the time limit or get truncated by the platform.
+class Logger:
+    DEBUG, INFO, WARNING = 10, 20, 30
+    LEVEL_NAMES = {DEBUG: "D", INFO: "I", WARNING: "W"}
+
+    def __init__(self, level: int = INFO, max_bytes: int = 2000, capacity: int = 64):
+        self.level = level
+        self.max_bytes = max_bytes
+        # Preallocated record slots, records past capacity are counted as dropped
+        self.records = [None] * capacity
+        self.size = 0
+        self.dropped = 0
+        self.timestamp = 0
+
+    def start(self, timestamp: int):
+        self.timestamp = timestamp
+        self.size = 0
+        self.dropped = 0
+
+    def log(self, level: int, product: str, side: str, price=None, quantity=None, *signals):
+        if level < self.level:
+            return
+        if self.size == len(self.records):
+            self.dropped += 1
+            return
+        self.records[self.size] = (level, product, side, price, quantity, signals)
+        self.size += 1
+
+    def order(self, product: str, price: int, quantity: int, position: int, *signals):
+        # An order sent this tick, the signals start with the position before it
+        self.log(self.INFO, product, "BUY" if quantity > 0 else "SELL", price, quantity, position, *signals)
+
+    def flush(self):
+        lines = []
+        # Room for the dropped records line
+        budget = self.max_bytes - 48
+
+        for idx in range(self.size):
+            level, product, side, price, quantity, signals = self.records[idx]
+            fields = [str(self.timestamp), self.LEVEL_NAMES[level], product, side, "" if price is None else str(price), "" if quantity is None else str(quantity)]
+            fields.extend(f"{signal:.6g}" if isinstance(signal, float) else str(signal) for signal in signals)
+            line = ";".join(fields)
+
+            budget -= len(line) + 1
+            if budget < 0:
+                self.dropped += self.size - idx
+                break
+            lines.append(line)
+
+        if self.dropped:
+            lines.append(f"{self.timestamp};W;;DROPPED;;{self.dropped}")
+        if lines:
+            print("\n".join(lines))
+
+        self.size = 0
+        self.dropped = 0
+
+
+# Opt-in timing of the sections of run(): building the snapshot, each strategy handler and the
+# traderData decode/encode. Per section it keeps the call count, total and max wall time and a
+# histogram in power-of-two microsecond buckets: bucket 0 is under 1us, bucket i is [2^(i-1), 2^i)us
+# and the last one takes everything slower. With memory=True it also traces allocations with
+# tracemalloc (several times slower) and keeps the peak bytes each section allocated above what
+# was allocated when it started.
+class Profiler:
+    BUCKETS = 16
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.ticks = 0
+        # section -> [calls, total ns, max ns, total peak bytes, max peak bytes, histogram]
+        self.sections: Dict[str, list] = {}
+        self.base = 0
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def start(self) -> int:
+        if self.memory:
+            tracemalloc.reset_peak()
+            self.base = tracemalloc.get_traced_memory()[0]
+        return time.perf_counter_ns()
+
+    def stop(self, name: str, start: int):
+        elapsed = time.perf_counter_ns() - start
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = [0, 0, 0, 0, 0, [0] * self.BUCKETS]
+        section[0] += 1
+        section[1] += elapsed
+        section[2] = max(section[2], elapsed)
+        section[5][min((elapsed // 1000).bit_length(), self.BUCKETS - 1)] += 1
+
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1] - self.base
+            section[3] += peak
+            section[4] = max(section[4], peak)
+
+    @staticmethod
+    def percentile_us(histogram: List[int], pct: float) -> int:
+        # Upper bound of the bucket holding the pct-th percentile call
+        target, seen = pct / 100.0 * sum(histogram), 0
+        for idx, count in enumerate(histogram):
+            seen += count
+            if count and seen >= target:
+                return 1 << idx
+        return 0
+
+    def report(self) -> Dict[str, dict]:
+        report = {}
+        for name, (calls, total_ns, max_ns, total_peak, max_peak, histogram) in self.sections.items():
+            report[name] = {
+                "calls": calls,
+                "mean_us": total_ns / calls / 1000,
+                "p50_us": self.percentile_us(histogram, 50),
+                "p99_us": self.percentile_us(histogram, 99),
+                "max_us": max_ns / 1000,
+                "histogram": list(histogram)
+            }
+            if self.memory:
+                report[name].update(mean_peak_bytes=total_peak / calls, max_peak_bytes=max_peak)
+        return report
+
+    def log(self, logger: "Logger"):
+        # One PROFILE record per section: calls, then mean, p99 and max us, and the max peak bytes
+        for name, section in self.report().items():
+            logger.log(Logger.INFO, name, "PROFILE", None, section["calls"], section["mean_us"], section["p99_us"], section["max_us"], section.get("max_peak_bytes", 0))
+
+
+# Black-Scholes call price, delta and gamma for one strike, expiry, rate and vol, as a function
+# of the underlying only. price() and delta() are built the first time one is used, not at
+# import: a table over [low, high] at multiples of `step`, as a closure with everything it
+# reads in local variables. S on a node (COCONUT mids are multiples of 0.5) is one dict lookup
+# of the exact value. Between nodes each interval stores the four coefficients of its
+# polynomial in t (the position inside the interval), cubic Hermite by default (the price uses
+# the tabulated deltas as slopes, the delta the gammas) or linear with cubic=False, and a
+# lookup is one Horner evaluation. Outside the grid it falls back to the exact formula.
+class CallPriceGrid:
+    SQRT2 = math.sqrt(2.0)
+    SQRT_2PI = math.sqrt(2.0 * math.pi)
+
+    def __init__(self, K: float, T: float, r: float, sigma: float, low: float, high: float, step: float = 0.5, cubic: bool = True):
+        self.K, self.T, self.r, self.sigma = K, T, r, sigma
+        self.vol = sigma * math.sqrt(T)
+        self.discount = K * math.exp(-r * T)
+        self.low, self.step, self.cubic = low, step, cubic
+        self.size = int(round((high - low) / step)) + 1
+        self.intervals = self.size - 1
+
+    def __getattr__(self, name: str):
+        # Only called while price and delta aren't set yet
+        if name not in ("price", "delta"):
+            raise AttributeError(name)
+        self.build()
+        return self.__dict__[name]
+
+    def build(self):
+        nodes = [self.exact(self.low + idx * self.step) for idx in range(self.size)]
+        self.price = self.lookup([node[0] for node in nodes], [node[1] for node in nodes], 0)
+        self.delta = self.lookup([node[1] for node in nodes], [node[2] for node in nodes], 1)
+
+    def lookup(self, values: List[float], slopes: List[float], exact_idx: int):
+        on_node = {self.low + idx * self.step: value for idx, value in enumerate(values)}
+
+        # (a, b, c, d) per interval, value = a + t * (b + t * (c + t * d))
+        coefs = array("d")
+        for idx in range(self.intervals):
+            v0, v1 = values[idx], values[idx + 1]
+            if not self.cubic:
+                coefs.extend((v0, v1 - v0, 0., 0.))
+                continue
+            m0, m1 = slopes[idx] * self.step, slopes[idx + 1] * self.step
+            coefs.extend((v0, m0, 3. * (v1 - v0) - 2. * m0 - m1, 2. * (v0 - v1) + m0 + m1))
+
+        low, inv_step, intervals, exact = self.low, 1.0 / self.step, self.intervals, self.exact
+
+        def lookup(S: float) -> float:
+            value = on_node.get(S)
+            if value is not None:
+                return value
+            pos = (S - low) * inv_step
+            if 0 <= pos < intervals:
+                idx = int(pos)
+                t = pos - idx
+                idx *= 4
+                return coefs[idx] + t * (coefs[idx + 1] + t * (coefs[idx + 2] + t * coefs[idx + 3]))
+            return exact(S)[exact_idx]
+
+        return lookup
+
+    def exact(self, S: float):
+        # (price, delta, gamma), N(x) = erfc(-x / sqrt(2)) / 2 like statistics.NormalDist.cdf
+        d1 = (math.log(S / self.K) + (self.r + self.sigma ** 2 / 2.) * self.T) / self.vol
+        d2 = d1 - self.vol
+        delta = 0.5 * math.erfc(-d1 / self.SQRT2)
+        price = S * delta - self.discount * (0.5 * math.erfc(-d2 / self.SQRT2))
+        gamma = math.exp(-d1 * d1 / 2.) / (self.SQRT_2PI * S * self.vol)
+        return price, delta, gamma
+
+    def max_error(self, points_per_step: int = 10):
+        # Largest absolute (price, delta) error against exact() over points between the nodes
+        price_error, delta_error = 0.0, 0.0
+        for idx in range(self.intervals * points_per_step):
+            S = self.low + idx * self.step / points_per_step
+            price, delta, _ = self.exact(S)
+            price_error = max(price_error, abs(self.price(S) - price))
+            delta_error = max(delta_error, abs(self.delta(S) - delta))
+        return price_error, delta_error
+
+
+# Implied vol of a call with fixed strike, expiry and rate, from its market price. Halley steps
+# on sigma (Newton with vega, corrected by volga) from a warm start, usually the previous
+# tick's vol, so one or two steps are enough. Every step narrows a bracket known to hold the root, and a
+# Newton step that would leave it is replaced by bisection. Prices outside the no-arbitrage
+# bounds have no implied vol and give None.
+class ImpliedVol:
+    def __init__(self, K: float, T: float, r: float = 0.0, low: float = 1e-6, high: float = 1.0, tolerance: float = 1e-8, max_steps: int = 60):
+        self.K, self.T, self.r = K, T, r
+        self.sqrt_t = math.sqrt(T)
+        self.discount = K * math.exp(-r * T)
+        self.low, self.high = low, high
+        self.tolerance = tolerance
+        self.max_steps = max_steps
+        # Steps taken by the last solve, for benchmarks
+        self.steps = 0
+
+    def price_vega(self, S: float, sigma: float):
+        # (price, vega, volga), volga being vega's derivative in sigma
+        vol = sigma * self.sqrt_t
+        d1 = (math.log(S / self.K) + (self.r + sigma ** 2 / 2.) * self.T) / vol
+        d2 = d1 - vol
+        price = S * (0.5 * math.erfc(-d1 / CallPriceGrid.SQRT2)) - self.discount * (0.5 * math.erfc(-d2 / CallPriceGrid.SQRT2))
+        vega = S * math.exp(-d1 * d1 / 2.) / CallPriceGrid.SQRT_2PI * self.sqrt_t
+        return price, vega, vega * d1 * d2 / sigma
+
+    def solve(self, price: float, S: float, guess: float):
+        if not max(S - self.discount, 0.0) < price < S:
+            return None
+
+        low, high = self.low, self.high
+        sigma = min(max(guess, low), high)
+        iteration = 0
+        for iteration in range(1, self.max_steps + 1):
+            value, vega, volga = self.price_vega(S, sigma)
+            diff = value - price
+            if abs(diff) < self.tolerance:
+                break
+
+            # The call price increases with sigma
+            if diff > 0:
+                high = sigma
+            else:
+                low = sigma
+
+            step = low
+            if vega > 0:
+                newton = diff / vega
+                # Halley's correction for the curvature, plain Newton if it would flip the step
+                denominator = 1. - newton * volga / (2. * vega)
+                step = sigma - (newton / denominator if denominator > 0.5 else newton)
+            sigma = step if low < step < high else (low + high) / 2
+
+        self.steps = iteration
+        return sigma
+
+
+# Keeps a portfolio's delta, in units of the hedge product, inside [-band, band] by trading the
+# hedge product back to the nearest edge of the band. One order per tick at most, clipped to the
+# position limit and to the volume on the visible book levels it would take (priced at the
+# deepest one), so the cost per tick doesn't grow with the position.
+class DeltaHedger:
+    def __init__(self, product: str, band: float, limit: int):
+        self.product = product
+        self.band = band
+        self.limit = limit
+
+    def orders(self, book: OrderBook, position: int, delta: float) -> List[Order]:
+        if delta > self.band:
+            quantity = max(-math.ceil(delta - self.band), -self.limit - position)
+            levels = book.buy_orders
+        elif delta < -self.band:
+            quantity = min(math.ceil(-self.band - delta), self.limit - position)
+            levels = book.sell_orders
+        else:
+            return []
+
+        wanted, available, price = abs(quantity), 0, None
+        for level_price, volume in levels.items():
+            if available >= wanted:
+                break
+            available += abs(volume)
+            price = level_price
+
+        quantity = min(wanted, available) * (1 if quantity > 0 else -1)
+        if not quantity:
+            return []
+        return [Order(self.product, price, quantity)]
+
+
+# A product or product group's part of run(). requires lists the products whose books it reads,
+# run() only calls orders() on ticks where every one of them has a two-sided book, so products
+# missing from a round (or a tick) just leave their strategies out. Trader.strategies is the
+# registry, in dispatch order.
+class Strategy:
+    name = ""
+    requires: Tuple[str, ...] = ()
+    # Conversions requested by the last orders() call
+    conversions = 0
+
+    def __init__(self, trader: "Trader"):
+        self.trader = trader
+
+    @classmethod
+    def active(cls, trader: "Trader") -> bool:
+        # Whether the trader's settings turn this strategy on, checked once per Trader
+        return True
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        raise NotImplementedError
+
+
+class AmethystsStrategy(Strategy):
+    name = "AMETHYSTS"
+    requires = ("AMETHYSTS",)
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        return {"AMETHYSTS": self.trader.compute_amethysts_orders(state)}
+
+
+class StarfruitStrategy(Strategy):
+    name = "STARFRUIT"
+    requires = ("STARFRUIT",)
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        return {"STARFRUIT": self.trader.compute_starfruit_orders(state)}
+
+
+# Not registered in Trader.strategies, ORCHIDS has been left untraded since round 2
+class OrchidsStrategy(Strategy):
+    name = "ORCHIDS"
+    requires = ("ORCHIDS",)
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        orders, self.conversions = self.trader.compute_orchids_orders(state)
+        return {"ORCHIDS": orders}
+
+
+# 6 strawberry, 4 choc and 1 rose in 1 basket
+class BasketStrategy(Strategy):
+    name = "GIFT_BASKET"
+    requires = ("GIFT_BASKET", "CHOCOLATE", "STRAWBERRIES", "ROSES")
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        return self.trader.compute_basket_orders3(state)
+
+
+class CoconutCouponStrategy(Strategy):
+    name = "COCONUT_COUPON"
+    requires = ("COCONUT_COUPON", "COCONUT")
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        return self.trader.compute_coconut_coupon_orders(state)
+
+
+class RosesStrategy(Strategy):
+    name = "ROSES"
+    requires = ("ROSES",)
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        return {"ROSES": self.trader.compute_roses_orders(state)}
+
+
+class ChocolateStrategy(Strategy):
+    name = "CHOCOLATE"
+    requires = ("CHOCOLATE",)
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        return self.trader.compute_chocolate_orders(state)
+
+
+class StrawberriesStrategy(Strategy):
+    name = "STRAWBERRIES"
+    requires = ("STRAWBERRIES",)
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        return self.trader.compute_strawberries_orders(state)
+
+
+class CoconutStrategy(Strategy):
+    name = "COCONUT"
+    requires = ("COCONUT",)
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        return self.trader.compute_coconut_orders(state)
+
+
+# Replaces CoconutStrategy's orders, dispatched after it
+class CoconutHedgeStrategy(Strategy):
+    name = "COCONUT_HEDGE"
+    requires = ("COCONUT", "COCONUT_COUPON")
+
+    @classmethod
+    def active(cls, trader: "Trader") -> bool:
+        return trader.coconut_hedge_band is not None
+
+    def orders(self, state: TradingState) -> Dict[str, List[Order]]:
+        return {"COCONUT": self.trader.compute_coconut_hedge_orders(state)}
+
+
+# Coefficients refitted by fit_regression.py, read from its artifact next to this file. Only
+# when REGRESSION_ARTIFACT is set: the pasted coefficients are what the platform runs, so local
+# backtests run them too unless a refit is being tried on purpose.
+REGRESSION_VERSION = 1
+REGRESSION_PATH = "regression-coefs.json"
+REGRESSION_ARTIFACT = False
+
+
+def load_regression(name: str, coef: List[float], intercept: float):
+    # A model's (coef, intercept) from the artifact, or the given ones when REGRESSION_ARTIFACT
+    # is off, there's no artifact (the platform only gets this file), it's another version or
+    # the model has other terms
+    if not REGRESSION_ARTIFACT:
+        return coef, intercept
+    try:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), REGRESSION_PATH)) as f:
+            artifact = json.load(f)
+        model = artifact["models"][name]
+        if artifact["version"] == REGRESSION_VERSION and len(model["coef"]) == len(coef):
+            return model["coef"], model["intercept"]
+    except (NameError, OSError, ValueError, KeyError):
+        pass
+    return coef, intercept
 
-import numpy as np
 
 class Trader:
     POSITION_LIMITS = {
@@ -31,22 +1067,23 @@ class Trader:
         "COCONUT_COUPON": 0
     }
 
-    # Linear regression parameters trained on data from days -2, -1 and 0
-    starfruit_coef = [0.19276398, 0.22111366, 0.24350053, 0.34038018]
-    starfruit_intercept = 11.302935408693884
+    # Linear regression parameters trained on data from days -2, -1 and 0, refit with fit_regression.py
+    starfruit_coef, starfruit_intercept = load_regression("starfruit", [0.19276398, 0.22111366, 0.24350053, 0.34038018], 11.302935408693884)
 
     # Cache latest 4 midprice of best_ask and best_bid every iteration
-    starfruit_cache = []
-    starfruit_spread_cache = []
+    starfruit_cache = StateField("list")
+    starfruit_spread_cache = StateField("list")
+    # Rolling median of the latest 5 STARFRUIT prices, for starfruit_fair_value = "median"
+    starfruit_median = StateField("quantile", windows=(5,))
 
-    # Linear regression parameters trained on data from days -1, 0 and 1
-    orchid_coef = [-2.16359544e-03, 9.82450923e-03, -1.23079864e-02, 1.00442531e+00, 8.65723543e+00, -2.78822090e+01, 2.97898002e+01, -1.05648098e+01, 2.34006780e+02, -1.29033746e+03, 1.87744151e+03, -8.21110222e+02]
-    orchid_intercept = 0.14551195562876273
+    # Linear regression parameters trained on data from days -1, 0 and 1, refit with fit_regression.py
+    orchid_coef, orchid_intercept = load_regression("orchid", [-2.16359544e-03, 9.82450923e-03, -1.23079864e-02, 1.00442531e+00, 8.65723543e+00, -2.78822090e+01, 2.97898002e+01, -1.05648098e+01, 2.34006780e+02, -1.29033746e+03, 1.87744151e+03, -8.21110222e+02], 0.14551195562876273)
 
     # Cache latest 4 values for orchid midprice, sunlight and humidity
-    orchid_cache = []
-    sunlight_cache = []
-    humidity_cache = []
+    orchid_cache = StateField("list")
+    orchid_spread_cache = StateField("list")
+    sunlight_cache = StateField("list")
+    humidity_cache = StateField("list")
 
     # To calculate cost basis of shorted ORCHIDS
     # orchid_cost_basis = 0
@@ -54,46 +1091,77 @@ class Trader:
 
     gift_basket_std = 75
 
-    etf_returns = []
-    assets_returns = []
-    chocolate_returns = []
-    chocolate_estimated_returns = []
-    strawberries_returns = []
-    strawberries_estimated_returns = []
-    roses_returns = []
-    roses_estimated_returns = []
-
-    coconut_coupon_returns = []
-    coconut_coupon_bsm_returns = []
-    coconut_returns = []
-    coconut_estimated_returns = []
-
-    rhianna_buy = False
-    rhianna_trade_before = False
-
-    N = statistics.NormalDist(mu=0, sigma=1)
-
-    def BS_CALL(self, S, K, T, r, sigma):
-        d1 = (np.log(S / K) + (r + sigma ** 2 / 2.) * T) / (sigma * np.sqrt(T))
-        d2 = d1 - sigma * np.sqrt(T)
-        return S * self.N.cdf(d1) - K * np.exp(-r * T) * self.N.cdf(d2)
-
-    def compute_vwap(self, order_depth):
-        total_ask, total_bid = 0, 0
-        ask_vol, bid_vol = 0, 0
-
-        for ask, vol in order_depth.sell_orders.items():
-            total_ask += ask * abs(vol)
-            ask_vol += abs(vol)
-
-        for bid, vol in order_depth.buy_orders.items():
-            total_bid += bid * vol
-            bid_vol += vol
-
-        vwap_ask = total_ask / ask_vol
-        vwap_bid = total_bid / bid_vol
-
-        return (vwap_ask + vwap_bid) / 2
+    # Empirically tuned thresholds, class attributes so backtest sweeps can override them in a subclass
+    # Fast (100) vs slow (200) moving average gap that triggers a trade, and the fixed size traded per tick
+    basket_band = 4
+    basket_entry = 3
+    chocolate_band = 1.5
+    chocolate_entry = 12
+    strawberries_band = 1.5
+    strawberries_entry = 18
+    coconut_band = 4
+    coconut_entry = 30
+    # Z-score gap between COCONUT_COUPON and its Black-Scholes price that triggers a trade ("bsm")
+    coconut_coupon_z = 1.2
+    # Z-score of the coupon's implied vol that triggers a trade ("iv"). Swept over round 4 with
+    # --names, 0.8-2.0 for each signal: choosing on two days and scoring the third gave 251.7k
+    # over the held-out days for "iv" against 134.3k for "bsm", and 1.6 was chosen in two folds of three
+    coconut_coupon_iv_z = 1.6
+    # "bsm": coupon price z-score against the z-score of its fixed-vol Black-Scholes price,
+    # "iv": z-score of the coupon's implied vol against its rolling mean
+    coconut_coupon_signal = "iv"
+    # COCONUT_COUPON's delta is hedged back inside this band (in COCONUT units) with COCONUT, None
+    # leaves it unhedged. While hedging, COCONUT is traded by the hedger only.
+    coconut_hedge_band = None
+    # STARFRUIT fair value: "mean" of the latest 4 prices, or their rolling "median" over 5
+    starfruit_fair_value = "mean"
+
+    # Price series with the trailing windows (in ticks) read from them, the longest one bounds how much is kept
+    etf_returns = StateField("stats", windows=(200,))
+    assets_returns = StateField("stats", windows=(100, 200))
+    chocolate_returns = StateField("stats", windows=(100, 200))
+    chocolate_estimated_returns = StateField("stats", windows=(200,))
+    strawberries_returns = StateField("stats", windows=(100, 200))
+    strawberries_estimated_returns = StateField("stats", windows=(200,))
+    roses_returns = StateField("stats", windows=(200,))
+    roses_estimated_returns = StateField("stats", windows=(200,))
+    coconut_coupon_returns = StateField("stats", windows=(200,))
+    coconut_coupon_bsm_returns = StateField("stats", windows=(200,))
+    coconut_returns = StateField("stats", windows=(100, 200))
+    coconut_estimated_returns = StateField("stats", windows=(200,))
+    coconut_coupon_ivs = StateField("stats", windows=(200,))
+
+    rhianna_buy = StateField("value", default=False)
+    rhianna_trade_before = StateField("value", default=False)
+
+    # Packed binary traderData, see BinaryCodec for the format. JsonCodec() restores the old plain JSON.
+    codec = BinaryCodec()
+
+    # Logger.DEBUG also logs the signal values of every tick, not only orders
+    log_level = Logger.INFO
+    log_max_bytes = 2000
+
+    # None leaves run() unprofiled, "time" times its sections with a Profiler, "memory" also
+    # traces their allocations. With profiling on, a summary is logged every profile_log_every
+    # ticks, 0 never logs one.
+    profile = None
+    profile_log_every = 0
+
+    # Every log_state_every ticks (by timestamp) run() also prints the state it got as a line in
+    # the TradingState.toCompactJSON layout, for log_replay.py replay --from. Only timestamp,
+    # traderData and position are filled in, the books and trades are in the platform log
+    # already. 0 never logs one.
+    log_state_every = 0
+
+    # COCONUT_COUPON is a call on COCONUT with strike 10000, 250 days to expiry and a vol fitted
+    # offline, priced off a table covering the COCONUT range seen so far with a wide margin
+    coconut_call = CallPriceGrid(K=10000, T=250, r=0, sigma=0.01011932923, low=9000, high=11000)
+    coconut_iv = ImpliedVol(K=10000, T=250, r=0)
+
+    # Strategies run() dispatches to, in order. When two return orders for the same product the
+    # later one wins. OrchidsStrategy can be added back here to trade ORCHIDS.
+    strategies = [AmethystsStrategy, StarfruitStrategy, BasketStrategy, CoconutCouponStrategy, RosesStrategy,
+                  ChocolateStrategy, StrawberriesStrategy, CoconutStrategy, CoconutHedgeStrategy]
 
     def compute_starfruit_price(self):
         price = self.starfruit_intercept
@@ -117,6 +1185,333 @@ class Trader:
 
         return int(round(price))
     
+    def compute_amethysts_orders(self, state: TradingState):
+        product = "AMETHYSTS"
+        order_depth: OrderDepth = state.order_depths[product]
+        orders: List[Order] = []
+
+        best_market_ask = self.snapshot.best_ask[product]
+        best_market_bid = self.snapshot.best_bid[product]
+
+        acceptable_price = 10000  # Eyeball graph
+
+        cur_position = self.positions[product]
+
+        # Market make
+        for ask, vol in order_depth.sell_orders.items():
+            # Check if asking price is below 
+            if ((ask < acceptable_price) or ((self.positions[product] < 0) and (ask == acceptable_price))) and cur_position < self.POSITION_LIMITS[product]:
+                order_vol = min(-vol, self.POSITION_LIMITS[product] - cur_position)
+                cur_position += order_vol
+                # print("BUY", product, str(order_vol) + "x", ask)
+                orders.append(Order(product, ask, order_vol))
+
+        # Derived from actual AMETHYSTS prices from previous iteration
+        undercut_market_ask = best_market_ask - 1
+        undercut_market_bid = best_market_bid + 1
+
+        # Spread = 1
+        own_ask = max(undercut_market_ask, acceptable_price + 1)
+        own_bid = min(undercut_market_bid, acceptable_price - 1)
+
+        # Market take
+        if cur_position < self.POSITION_LIMITS[product]:
+            # Current position is short
+            if self.positions[product] < 0:
+                # We want to try to balance position, give less aggressive bid
+                ask = min(undercut_market_bid + 1, acceptable_price - 1)
+            # Current position is long, close to limit
+            elif self.positions[product] > 15:
+                # Close to limit, don't need that many more, can give more aggressive bid
+                ask = min(undercut_market_bid - 1, acceptable_price - 1)
+            # Current position is long, not close to limit
+            else:
+                ask = own_bid
+
+            order_vol = min(self.POSITION_LIMITS[product], self.POSITION_LIMITS[product] - cur_position)
+            cur_position += order_vol
+            # print("BUY", product, str(order_vol) + "x", ask)
+            orders.append(Order(product, ask, order_vol))
+
+        cur_position = self.positions[product]
+
+        # Market make
+        for bid, vol in order_depth.buy_orders.items():
+            if ((bid > acceptable_price) or ((self.positions[product] > 0) and (bid == acceptable_price))) and cur_position > -self.POSITION_LIMITS[product]:
+                order_vol = max(-vol, -self.POSITION_LIMITS[product] - cur_position)
+                cur_position += order_vol
+                # print("SELL", product, str(order_vol) + "x", bid)
+                orders.append(Order(product, bid, order_vol))
+
+        # Market take
+        if cur_position > -self.POSITION_LIMITS[product]:
+            if self.positions[product] < 0:
+                bid = max(undercut_market_ask - 1, acceptable_price + 1)
+            elif self.positions[product] < -15:
+                bid = max(undercut_market_ask + 1, acceptable_price + 1)
+            else:
+                bid = own_ask
+
+            order_vol = max(-self.POSITION_LIMITS[product], -self.POSITION_LIMITS[product] - cur_position)
+            cur_position += order_vol
+            # print("SELL", product, str(order_vol) + "x", bid)
+            orders.append(Order(product, bid, order_vol))
+
+        return orders
+
+    def compute_starfruit_orders(self, state: TradingState):
+        product = "STARFRUIT"
+        order_depth: OrderDepth = state.order_depths[product]
+        orders: List[Order] = []
+
+        best_market_ask = self.snapshot.best_ask[product]
+        best_market_bid = self.snapshot.best_bid[product]
+
+        # market_price = (best_market_ask + best_market_bid) / 2
+        market_price = self.snapshot.vwap[product]
+
+        # Pop oldest value from starfruit_cache if full
+        if len(self.starfruit_cache) == 4:
+            self.starfruit_cache.pop(0)
+
+        # Cache STARFRUIT prices
+        self.starfruit_cache.append(market_price)
+        if self.starfruit_fair_value == "median":
+            self.starfruit_median.append(market_price)
+        # print(self.starfruit_cache)
+
+        if len(self.starfruit_spread_cache) == 4:
+            self.starfruit_spread_cache.pop(0)
+
+        # Cache spread of STARFRUIT orders
+        self.starfruit_spread_cache.append(best_market_ask - best_market_bid)
+
+        # Estimate price via linear regression
+        if len(self.starfruit_cache) == 4:
+            # acceptable_price = self.compute_starfruit_price()
+            # print(acceptable_price)
+            if self.starfruit_fair_value == "median":
+                acceptable_price = round(self.starfruit_median.value())
+            else:
+                acceptable_price = round(statistics.fmean(self.starfruit_cache[-5:]))
+            spread = round(statistics.fmean(self.starfruit_spread_cache[-5:]))
+
+            lower_bound = acceptable_price - (spread // 2)
+            upper_bound = acceptable_price + (spread // 2)
+            # lower_bound = acceptable_price - 1
+            # upper_bound = acceptable_price + 1
+        else:
+            # spread = int(1e9)
+            lower_bound = -int(1e9)
+            upper_bound = int(1e9)
+
+        cur_position = self.positions[product]
+
+        # Construct buy orders
+        for ask, vol in order_depth.sell_orders.items():
+            if ((ask <= lower_bound) or ((self.positions[product] < 0) and (ask <= lower_bound + (spread // 2)))) and cur_position < self.POSITION_LIMITS[product]:
+            # if ((ask <= lower_bound) or ((self.positions[product] < 0) and (ask == lower_bound + 1))) and cur_position < self.POSITION_LIMITS[product]:
+                order_vol = min(-vol, self.POSITION_LIMITS[product] - cur_position)
+                cur_position += order_vol
+                #print("BUY", product, str(order_vol) + "x", ask)
+                orders.append(Order(product, ask, order_vol))
+
+        undercut_market_ask = best_market_ask - 1
+        undercut_market_bid = best_market_bid + 1
+
+        # Spread = 1
+        own_ask = max(undercut_market_ask, upper_bound)
+        own_bid = min(undercut_market_bid, lower_bound)
+
+        # Market take
+        if cur_position < self.POSITION_LIMITS[product]:
+            order_vol = self.POSITION_LIMITS[product] - cur_position
+            cur_position += order_vol
+            #print("BUY", product, str(order_vol) + "x", own_bid)
+            orders.append(Order(product, own_bid, order_vol))
+
+        cur_position = self.positions[product]
+
+        # Construct sell orders
+        for bid, vol in order_depth.buy_orders.items():
+            if ((bid >= upper_bound) or ((self.positions[product] > 0) and (bid >= upper_bound - (spread // 2)))) and cur_position > -self.POSITION_LIMITS[product]:
+            # if ((bid >= upper_bound) or ((self.positions[product] > 0) and (bid == upper_bound - 1))) and cur_position > -self.POSITION_LIMITS[product]:
+                order_vol = max(-vol, -self.POSITION_LIMITS[product] - cur_position)
+                cur_position += order_vol
+                #print("SELL", product, str(order_vol) + "x", bid)
+                orders.append(Order(product, bid, order_vol))
+
+        if cur_position > -self.POSITION_LIMITS[product]:
+            order_vol = max(-self.POSITION_LIMITS[product], -self.POSITION_LIMITS[product] - cur_position)
+            cur_position += order_vol
+            #print("SELL", product, str(order_vol) + "x", own_ask)
+            orders.append(Order(product, own_ask, order_vol))
+
+        return orders
+
+    # sunlight less than 7 hour, production decrease 4% for every 10 min
+    # humidity ideal 60 - 80, outside fall 2% for every 5% humidity change
+    # import / export tariff
+    # storage costs per timestamp: 0.1 seashell
+
+    # each day (1000000 timesteps) = 12 hours
+
+    # orchid quality does not deteriorate overnight
+    def compute_orchids_orders(self, state: TradingState):
+        product = "ORCHIDS"
+        order_depth: OrderDepth = state.order_depths[product]
+        orders: List[Order] = []
+
+        best_market_ask = self.snapshot.best_ask[product]
+        best_market_bid = self.snapshot.best_bid[product]
+
+        # market_price = (best_market_ask + best_market_bid) / 2
+        market_price = self.snapshot.vwap[product]
+
+        conversions = 0
+
+        if len(self.orchid_cache) == 4:
+            self.orchid_cache.pop(0)
+
+        self.orchid_cache.append(market_price)
+
+        if len(self.orchid_spread_cache) == 4:
+            self.orchid_spread_cache.pop(0)
+
+        self.orchid_spread_cache.append(best_market_ask - best_market_bid)
+
+        conversion_observations = state.observations.conversionObservations[product]
+
+        if len(self.sunlight_cache) == 4:
+            self.sunlight_cache.pop(0)
+
+        self.sunlight_cache.append(conversion_observations.sunlight)
+
+        if len(self.humidity_cache) == 4:
+            self.humidity_cache.pop(0)
+
+        self.humidity_cache.append(conversion_observations.humidity)
+
+        if len(self.orchid_cache) == 4:
+            acceptable_price = self.compute_orchid_price()
+            spread = round(statistics.fmean(self.orchid_spread_cache[-5:]))
+
+            lower_bound = acceptable_price - (spread // 2)
+            upper_bound = acceptable_price + (spread // 2)
+            # lower_bound = acceptable_price - 1
+            # upper_bound = acceptable_price + 1
+        else:
+            return orders, conversions
+
+        own_trades = state.own_trades[product] if product in state.own_trades else []
+
+        # Re-calculate cost_basis
+        # if len(own_trades) != 0:
+        #     self.shorted_orchid = 0
+
+        #     new_cost_basis, new_quantity = 0, 0
+
+        #     for trade in own_trades:
+        #         if trade.seller == "SUBMISSION" and trade.timestamp > self.orchid_last_trade:
+        #             print(trade)
+        #             new_cost_basis += trade.price * trade.quantity
+        #             new_quantity += trade.quantity
+
+        #     self.orchid_last_trade = own_trades[0].timestamp
+
+        #     old_quantity = new_quantity - self.positions[product]
+        #     new_cost_basis += abs(self.orchid_cost_basis) * old_quantity
+        #     new_cost_basis /= self.positions[product]
+        #     self.orchid_cost_basis = new_cost_basis
+
+        # own_trades = state.own_trades[product] if product in state.own_trades else []
+        # cost_basis, traded_quantity = 0, 0
+
+        cost_basis, traded_quantity = 0, 0
+        for trade in own_trades:
+            # Long orchids
+            if trade.buyer == "SUBMISSION":
+                cost_basis += trade.price * trade.quantity
+                traded_quantity += trade.quantity
+            # Short orchids
+            else:
+                cost_basis -= trade.price * trade.quantity
+                traded_quantity += trade.quantity
+
+        if traded_quantity > 0:
+            cost_basis /= traded_quantity
+        # print("COST_BASIS", cost_basis)
+
+        cur_position = self.positions[product]
+        # print("POSITION", product, cur_position)
+
+        # print("CONVERSION_BID", conversion_observations.bidPrice - conversion_observations.exportTariff)
+        # print("CONVERSION_ASK", conversion_observations.askPrice + conversion_observations.importTariff)
+        # print("TRANSPORT_FEES", conversion_observations.transportFees)
+        # Construct conversions
+        if cur_position != 0:
+            # Export conversions
+            if cur_position > 0:
+                conversion_bid = conversion_observations.bidPrice - conversion_observations.exportTariff
+                if conversion_bid - (conversion_observations.transportFees / cur_position) >= cost_basis:
+                    # print("EXPORT", product, str(cur_position) + "x", conversion_bid)
+                    conversions = cur_position
+                    cur_position = 0 # All current positions converted
+
+            # Import conversions
+            else:
+                conversion_ask = conversion_observations.askPrice + conversion_observations.importTariff
+                if conversion_ask + (conversion_observations.transportFees / cur_position) <= -cost_basis:
+                    # print("IMPORT", product, str(cur_position) + "x", conversion_ask)
+                    conversions = -cur_position
+                    cur_position = 0 # All current positions converted
+
+        # Construct buy orders
+        for ask, vol in order_depth.sell_orders.items():
+            # print("ASK", ask, "VOL", vol)
+            # if ((ask <= lower_bound) or ((self.positions[product] < 0) and (ask <= lower_bound + (spread // 2)))) and cur_position < self.POSITION_LIMITS[product]:
+            # if ((ask <= lower_bound) or ((self.positions[product] < 0) and (ask == lower_bound + 1))) and cur_position < self.POSITION_LIMITS[product]:
+            if (ask < cost_basis) and (cur_position < self.POSITION_LIMITS[product]):
+                order_vol = min(-vol, self.POSITION_LIMITS[product] - cur_position)
+                cur_position += order_vol
+                # print("BUY", product, str(order_vol) + "x", ask)
+                orders.append(Order(product, ask, order_vol))
+
+        undercut_market_ask = best_market_ask - 1
+        undercut_market_bid = best_market_bid + 1
+
+        # Spread = 1
+        own_ask = max(undercut_market_ask, upper_bound)
+        own_bid = min(undercut_market_bid, lower_bound)
+
+        # Market take
+        # if cur_position < self.POSITION_LIMITS[product]:
+        #     order_vol = self.POSITION_LIMITS[product] - cur_position
+        #     cur_position += order_vol
+        #     print("BUY", product, str(order_vol) + "x", undercut_market_bid)
+        #     orders.append(Order(product, undercut_market_bid, order_vol))
+
+        cur_position = self.positions[product]
+
+        # Construct sell orders
+        for bid, vol in order_depth.buy_orders.items():
+            # print("BID", ask, "VOL", vol)
+            if ((bid >= upper_bound) or ((self.positions[product] > 0) and (bid >= upper_bound - (spread // 2)))) and cur_position > -self.POSITION_LIMITS[product]:
+            # if ((bid >= upper_bound) or ((self.positions[product] > 0) and (bid == upper_bound - 1))) and cur_position > -self.POSITION_LIMITS[product]:
+                order_vol = max(-vol, -self.POSITION_LIMITS[product] - cur_position)
+                cur_position += order_vol
+                # print("SELL", product, str(order_vol) + "x", bid)
+                orders.append(Order(product, bid, order_vol))
+
+        if cur_position > -self.POSITION_LIMITS[product]:
+            order_vol = max(-self.POSITION_LIMITS[product], -self.POSITION_LIMITS[product] - cur_position)
+            # order_vol = max(int(0.05 * -self.POSITION_LIMITS[product]), -self.POSITION_LIMITS[product] - cur_position) # Buy at most 5% of POSITION_LIMITS
+            cur_position += order_vol
+            # print("SELL", product, str(order_vol) + "x", undercut_market_ask)
+            orders.append(Order(product, undercut_market_ask, order_vol))
+
+        return orders, conversions
+
     def compute_basket_orders(self, order_depths):
         products = ["CHOCOLATE", "STRAWBERRIES", "ROSES", "GIFT_BASKET"]
         mid_prices, orders = {}, {"GIFT_BASKET": []}
@@ -185,19 +1580,10 @@ class Trader:
 
     # Z-score based algo, fails when spikes in assets correspond to dips in etf during downtrends
     def compute_basket_orders2(self, state: TradingState):
-        products = ["CHOCOLATE", "STRAWBERRIES", "ROSES", "GIFT_BASKET"]
-        positions, buy_orders, sell_orders, best_bids, best_asks, prices, orders = {}, {}, {}, {}, {}, {}, {"CHOCOLATE": [], "STRAWBERRIES": [], "ROSES": [], "GIFT_BASKET": []}
-
-        for product in products:
-            positions[product] = state.position[product] if product in state.position else 0
-
-            buy_orders[product] = state.order_depths[product].buy_orders
-            sell_orders[product] = state.order_depths[product].sell_orders
-
-            best_bids[product] = max(buy_orders[product].keys())
-            best_asks[product] = min(sell_orders[product].keys())
-
-            prices[product] = (best_bids[product] + best_asks[product]) / 2.0
+        snapshot = self.snapshot
+        positions, buy_orders, sell_orders = snapshot.position, snapshot.buy_orders, snapshot.sell_orders
+        best_bids, best_asks, prices = snapshot.best_bid, snapshot.best_ask, snapshot.mid
+        orders = {"CHOCOLATE": [], "STRAWBERRIES": [], "ROSES": [], "GIFT_BASKET": []}
 
         estimated_price = 4.0 * prices["CHOCOLATE"] + 6.0 * prices["STRAWBERRIES"] + prices["ROSES"]
 
@@ -209,11 +1595,11 @@ class Trader:
         if len(self.etf_returns) < 2 or len(self.assets_returns) < 2:
             return orders
 
-        etf_rolling_mean = statistics.fmean(self.etf_returns[-200:])
-        etf_rolling_std = statistics.stdev(self.etf_returns[-200:])
+        etf_rolling_mean = self.etf_returns.mean(200)
+        etf_rolling_std = self.etf_returns.stdev(200)
 
-        assets_rolling_mean = statistics.fmean(self.assets_returns[-200:])
-        assets_rolling_std = statistics.stdev(self.assets_returns[-200:])
+        assets_rolling_mean = self.assets_returns.mean(200)
+        assets_rolling_std = self.assets_returns.stdev(200)
 
         if etf_rolling_std != 0:
             etf_z_score = (self.etf_returns[-1] - etf_rolling_mean) / etf_rolling_std
@@ -260,8 +1646,7 @@ class Trader:
 
             limit_mult = min(limit_mult, self.POSITION_LIMITS["GIFT_BASKET"] - positions["GIFT_BASKET"], self.POSITION_LIMITS["GIFT_BASKET"])
 
-            print("GIFT_BASKET positions:", positions["GIFT_BASKET"])
-            print("BUY", "GIFT_BASKET", str(limit_mult) + "x", best_asks["GIFT_BASKET"])
+            self.logger.order("GIFT_BASKET", best_asks["GIFT_BASKET"], limit_mult, positions["GIFT_BASKET"], z_score_diff)
             orders["GIFT_BASKET"].append(Order("GIFT_BASKET", best_asks["GIFT_BASKET"], limit_mult))
         # GIFT_BASKET overvalued
         elif z_score_diff > 2:
@@ -277,8 +1662,7 @@ class Trader:
             
             limit_mult = max(limit_mult, -self.POSITION_LIMITS["GIFT_BASKET"] - positions["GIFT_BASKET"], -self.POSITION_LIMITS["GIFT_BASKET"])
 
-            print("GIFT_BASKET positions:", positions["GIFT_BASKET"])
-            print("SELL", "GIFT_BASKET", str(limit_mult) + "x", best_bids["GIFT_BASKET"])
+            self.logger.order("GIFT_BASKET", best_bids["GIFT_BASKET"], limit_mult, positions["GIFT_BASKET"], z_score_diff)
             orders["GIFT_BASKET"].append(Order("GIFT_BASKET", best_bids["GIFT_BASKET"], limit_mult))
 
         # Supposed to be higher
@@ -454,21 +1838,12 @@ class Trader:
 
     # Trend based algo
     def compute_basket_orders3(self, state: TradingState):
-        products = ["CHOCOLATE", "STRAWBERRIES", "ROSES", "GIFT_BASKET"]
-        positions, buy_orders, sell_orders, best_bids, best_asks, prices, orders = {}, {}, {}, {}, {}, {}, {
+        snapshot = self.snapshot
+        positions, buy_orders, sell_orders = snapshot.position, snapshot.buy_orders, snapshot.sell_orders
+        best_bids, best_asks, prices = snapshot.best_bid, snapshot.best_ask, snapshot.mid
+        orders = {
             "CHOCOLATE": [], "STRAWBERRIES": [], "ROSES": [], "GIFT_BASKET": []}
 
-        for product in products:
-            positions[product] = state.position[product] if product in state.position else 0
-
-            buy_orders[product] = state.order_depths[product].buy_orders
-            sell_orders[product] = state.order_depths[product].sell_orders
-
-            best_bids[product] = max(buy_orders[product].keys())
-            best_asks[product] = min(sell_orders[product].keys())
-
-            prices[product] = (best_bids[product] + best_asks[product]) / 2.0
-
         estimated_price = 4.0 * prices["CHOCOLATE"] + 6.0 * prices["STRAWBERRIES"] + prices["ROSES"]
 
         price_diff = prices["GIFT_BASKET"] - estimated_price
@@ -481,75 +1856,53 @@ class Trader:
             return orders
 
         # Slow moving average
-        assets_rolling_mean = statistics.fmean(self.assets_returns[-200:])
+        assets_rolling_mean = self.assets_returns.mean(200)
         # Fast moving average
-        assets_rolling_mean_fast = statistics.fmean(self.assets_returns[-100:])
+        assets_rolling_mean_fast = self.assets_returns.mean(100)
+
+        self.logger.log(Logger.DEBUG, "GIFT_BASKET", "SIGNAL", None, None, assets_rolling_mean_fast, assets_rolling_mean)
 
         # Empirically tuned to avoid noisy buy and sell signals - do nothing if sideways market
-        if assets_rolling_mean_fast > assets_rolling_mean + 4:
+        if assets_rolling_mean_fast > assets_rolling_mean + self.basket_band:
 
             # Fixed entry every timestep that criteria is met, max-ing out early
-            limit_mult = 3
+            limit_mult = self.basket_entry
 
             limit_mult = min(limit_mult, self.POSITION_LIMITS["GIFT_BASKET"] - positions["GIFT_BASKET"],
                              self.POSITION_LIMITS["GIFT_BASKET"])
 
-            print("GIFT_BASKET positions:", positions["GIFT_BASKET"])
-            print("BUY", "GIFT_BASKET", str(limit_mult) + "x", best_asks["GIFT_BASKET"])
+            self.logger.order("GIFT_BASKET", best_asks["GIFT_BASKET"], limit_mult, positions["GIFT_BASKET"], assets_rolling_mean_fast, assets_rolling_mean)
             orders["GIFT_BASKET"].append(Order("GIFT_BASKET", best_asks["GIFT_BASKET"], limit_mult))
 
-        elif assets_rolling_mean_fast < assets_rolling_mean - 4:
+        elif assets_rolling_mean_fast < assets_rolling_mean - self.basket_band:
 
             # Fixed entry every timestep, max-ing out early
-            limit_mult = -3
+            limit_mult = -self.basket_entry
 
             limit_mult = max(limit_mult, -self.POSITION_LIMITS["GIFT_BASKET"] - positions["GIFT_BASKET"],
                              -self.POSITION_LIMITS["GIFT_BASKET"])
 
-            print("GIFT_BASKET positions:", positions["GIFT_BASKET"])
-            print("SELL", "GIFT_BASKET", str(limit_mult) + "x", best_bids["GIFT_BASKET"])
+            self.logger.order("GIFT_BASKET", best_bids["GIFT_BASKET"], limit_mult, positions["GIFT_BASKET"], assets_rolling_mean_fast, assets_rolling_mean)
             orders["GIFT_BASKET"].append(Order("GIFT_BASKET", best_bids["GIFT_BASKET"], limit_mult))
 
         return orders
 
-    def compute_coconut_coupon_orders(self, state: TradingState):
-        products = ["COCONUT_COUPON", "COCONUT"]
-        positions, buy_orders, sell_orders, best_bids, best_asks, prices, orders = {}, {}, {}, {}, {}, {}, {"COCONUT_COUPON": [], "COCONUT": []}
-
-        for product in products:
-            positions[product] = state.position[product] if product in state.position else 0
-
-            buy_orders[product] = state.order_depths[product].buy_orders
-            sell_orders[product] = state.order_depths[product].sell_orders
-
-            best_bids[product] = max(buy_orders[product].keys())
-            best_asks[product] = min(sell_orders[product].keys())
-
-            prices[product] = (best_bids[product] + best_asks[product]) / 2.0
-
+    def compute_coconut_coupon_bsm_z_score(self, coupon_price: float, coconut_price: float):
+        # Z-score of the coupon's price minus the z-score of its fixed-vol BSM price, None until both have two values
         # Use BSM
-        S = prices["COCONUT"]
-        K = 10000
-        T = 250
-        r = 0
-        sigma = 0.01011932923
-        bsm_price = self.BS_CALL(S, K, T, r, sigma)
-
-        self.coconut_coupon_returns.append(prices["COCONUT_COUPON"])
-        self.coconut_coupon_bsm_returns.append(bsm_price)
+        bsm_price = self.coconut_call.price(coconut_price)
 
-        # Dummy for now
-        self.coconut_returns.append(prices["COCONUT"])
-        self.coconut_estimated_returns.append(prices["COCONUT"])
+        self.coconut_coupon_returns.append(coupon_price)
+        self.coconut_coupon_bsm_returns.append(bsm_price)
 
         if len(self.coconut_coupon_returns) < 2 or len(self.coconut_coupon_bsm_returns) < 2:
-            return orders
+            return None
 
-        coconut_coupon_rolling_mean = statistics.fmean(self.coconut_coupon_returns[-200:])
-        coconut_coupon_rolling_std = statistics.stdev(self.coconut_coupon_returns[-200:])
+        coconut_coupon_rolling_mean = self.coconut_coupon_returns.mean(200)
+        coconut_coupon_rolling_std = self.coconut_coupon_returns.stdev(200)
 
-        coconut_coupon_bsm_rolling_mean = statistics.fmean(self.coconut_coupon_bsm_returns[-200:])
-        coconut_coupon_bsm_rolling_std = statistics.stdev(self.coconut_coupon_bsm_returns[-200:])
+        coconut_coupon_bsm_rolling_mean = self.coconut_coupon_bsm_returns.mean(200)
+        coconut_coupon_bsm_rolling_std = self.coconut_coupon_bsm_returns.stdev(200)
 
         if coconut_coupon_rolling_std != 0:
             coconut_coupon_z_score = (self.coconut_coupon_returns[-1] - coconut_coupon_rolling_mean) / coconut_coupon_rolling_std
@@ -563,10 +1916,46 @@ class Trader:
 
         # May need a catch here to set both == 0 if one or the other is 0, to avoid errorneous z scores
 
-        coconut_coupon_z_score_diff = coconut_coupon_z_score - coconut_coupon_bsm_z_score
+        return coconut_coupon_z_score - coconut_coupon_bsm_z_score
+
+    def compute_coconut_coupon_iv_z_score(self, coupon_price: float, coconut_price: float):
+        # Z-score of the coupon's implied vol over the trailing 200 ticks, warm-started from the
+        # previous tick's vol. None until there are two vols, ticks without one are skipped.
+        ivs = self.coconut_coupon_ivs
+        iv = self.coconut_iv.solve(coupon_price, coconut_price, ivs.last() if len(ivs) else self.coconut_call.sigma)
+        if iv is None:
+            return None
+
+        ivs.append(iv)
+        if len(ivs) < 2:
+            return None
+
+        iv_rolling_std = ivs.stdev(200)
+        return (iv - ivs.mean(200)) / iv_rolling_std if iv_rolling_std != 0 else 0
+
+    def compute_coconut_coupon_orders(self, state: TradingState):
+        snapshot = self.snapshot
+        positions, buy_orders, sell_orders = snapshot.position, snapshot.buy_orders, snapshot.sell_orders
+        best_bids, best_asks, prices = snapshot.best_bid, snapshot.best_ask, snapshot.mid
+        orders = {"COCONUT_COUPON": [], "COCONUT": []}
+
+        # Dummy for now
+        self.coconut_returns.append(prices["COCONUT"])
+        self.coconut_estimated_returns.append(prices["COCONUT"])
+
+        if self.coconut_coupon_signal == "iv":
+            coconut_coupon_z_score_diff = self.compute_coconut_coupon_iv_z_score(prices["COCONUT_COUPON"], prices["COCONUT"])
+        else:
+            coconut_coupon_z_score_diff = self.compute_coconut_coupon_bsm_z_score(prices["COCONUT_COUPON"], prices["COCONUT"])
+
+        if coconut_coupon_z_score_diff is None:
+            return orders
+        threshold = self.coconut_coupon_iv_z if self.coconut_coupon_signal == "iv" else self.coconut_coupon_z
+
+        self.logger.log(Logger.DEBUG, "COCONUT_COUPON", "SIGNAL", None, None, coconut_coupon_z_score_diff)
 
         # Option is underpriced
-        if coconut_coupon_z_score_diff < -1.2:
+        if coconut_coupon_z_score_diff < -threshold:
             coconut_coupon_best_ask_vol = sell_orders["COCONUT_COUPON"][best_asks["COCONUT_COUPON"]]
 
             limit_mult = -coconut_coupon_best_ask_vol
@@ -576,12 +1965,11 @@ class Trader:
             limit_mult = min(limit_mult, self.POSITION_LIMITS["COCONUT_COUPON"] - positions["COCONUT_COUPON"],
                              self.POSITION_LIMITS["COCONUT_COUPON"])
 
-            print("COCONUT_COUPON positions:", positions["COCONUT_COUPON"])
-            print("BUY", "COCONUT_COUPON", str(limit_mult) + "x", best_asks["COCONUT_COUPON"])
+            self.logger.order("COCONUT_COUPON", best_asks["COCONUT_COUPON"], limit_mult, positions["COCONUT_COUPON"], coconut_coupon_z_score_diff)
             orders["COCONUT_COUPON"].append(Order("COCONUT_COUPON", best_asks["COCONUT_COUPON"], limit_mult))
 
         # Option is overpriced
-        elif coconut_coupon_z_score_diff > 1.2:
+        elif coconut_coupon_z_score_diff > threshold:
             coconut_coupon_best_bid_vol = buy_orders["COCONUT_COUPON"][best_bids["COCONUT_COUPON"]]
 
             limit_mult = coconut_coupon_best_bid_vol
@@ -591,8 +1979,7 @@ class Trader:
             limit_mult = max(limit_mult, -self.POSITION_LIMITS["COCONUT_COUPON"] - positions["COCONUT_COUPON"],
                              -self.POSITION_LIMITS["COCONUT_COUPON"])
 
-            print("COCONUT_COUPON positions:", positions["COCONUT_COUPON"])
-            print("SELL", "COCONUT_COUPON", str(limit_mult) + "x", best_bids["COCONUT_COUPON"])
+            self.logger.order("COCONUT_COUPON", best_bids["COCONUT_COUPON"], limit_mult, positions["COCONUT_COUPON"], coconut_coupon_z_score_diff)
             orders["COCONUT_COUPON"].append(Order("COCONUT_COUPON", best_bids["COCONUT_COUPON"], limit_mult))
 
         return orders
@@ -600,11 +1987,12 @@ class Trader:
     def compute_roses_orders(self, state: TradingState):
         orders = []
 
-        roses_pos = state.position["ROSES"] if "ROSES" in state.position else 0
-        best_bid = max(state.order_depths["ROSES"].buy_orders.keys())
-        bid_vol = state.order_depths["ROSES"].buy_orders[best_bid]
-        best_ask = min(state.order_depths["ROSES"].sell_orders.keys())
-        ask_vol = state.order_depths["ROSES"].sell_orders[best_ask]
+        snapshot = self.snapshot
+        roses_pos = snapshot.position["ROSES"]
+        best_bid = snapshot.best_bid["ROSES"]
+        bid_vol = snapshot.best_bid_volume["ROSES"]
+        best_ask = snapshot.best_ask["ROSES"]
+        ask_vol = snapshot.best_ask_volume["ROSES"]
 
         if "ROSES" not in state.market_trades:
             return orders
@@ -620,558 +2008,275 @@ class Trader:
             # Buy signal
             if self.rhianna_buy:
                 vol = max(-bid_vol, -self.POSITION_LIMITS["ROSES"] - min(0, roses_pos))
-                print("SELL", "ROSES", str(vol) + "x", best_bid)
+                self.logger.order("ROSES", best_bid, vol, roses_pos)
                 orders.append(Order("ROSES", best_bid, vol))
                 self.rhianna_buy = False
             # Sell signal
             elif self.rhianna_trade_before:
                 vol = min(-ask_vol, self.POSITION_LIMITS["ROSES"] - max(0, roses_pos))
-                print("BUY", "ROSES", str(vol) + "x", best_bid)
+                self.logger.order("ROSES", best_ask, vol, roses_pos)
                 orders.append(Order("ROSES", best_ask, vol))
                 self.rhianna_buy = True
 
         return orders
 
     def compute_chocolate_orders(self, state: TradingState):
-        products = ["CHOCOLATE"]
-        positions, buy_orders, sell_orders, best_bids, best_asks, prices, orders = {}, {}, {}, {}, {}, {}, {
+        snapshot = self.snapshot
+        positions, buy_orders, sell_orders = snapshot.position, snapshot.buy_orders, snapshot.sell_orders
+        best_bids, best_asks, prices = snapshot.best_bid, snapshot.best_ask, snapshot.mid
+        orders = {
             "CHOCOLATE": []}
 
-        for product in products:
-            positions[product] = state.position[product] if product in state.position else 0
-
-            buy_orders[product] = state.order_depths[product].buy_orders
-            sell_orders[product] = state.order_depths[product].sell_orders
-
-            best_bids[product] = max(buy_orders[product].keys())
-            best_asks[product] = min(sell_orders[product].keys())
-
-            prices[product] = (best_bids[product] + best_asks[product]) / 2.0
-
         self.chocolate_returns.append(prices["CHOCOLATE"])
 
         if len(self.chocolate_returns) < 100:
             return orders
 
         # Slow moving average
-        chocolate_rolling_mean = statistics.fmean(self.chocolate_returns[-200:])
+        chocolate_rolling_mean = self.chocolate_returns.mean(200)
         # Fast moving average
-        chocolate_rolling_mean_fast = statistics.fmean(self.chocolate_returns[-100:])
+        chocolate_rolling_mean_fast = self.chocolate_returns.mean(100)
+
+        self.logger.log(Logger.DEBUG, "CHOCOLATE", "SIGNAL", None, None, chocolate_rolling_mean_fast, chocolate_rolling_mean)
 
         # Empirically tuned to avoid noisy buy and sell signals - do nothing if sideways market
-        if chocolate_rolling_mean_fast > chocolate_rolling_mean + 1.5:
+        if chocolate_rolling_mean_fast > chocolate_rolling_mean + self.chocolate_band:
 
             # Fixed entry every timestep that criteria is met, max-ing out early
-            limit_mult = 12
+            limit_mult = self.chocolate_entry
 
             limit_mult = min(limit_mult, self.POSITION_LIMITS["CHOCOLATE"] - positions["CHOCOLATE"],
                              self.POSITION_LIMITS["CHOCOLATE"])
 
-            print("CHOCOLATE positions:", positions["CHOCOLATE"])
-            print("BUY", "CHOCOLATE", str(limit_mult) + "x", best_asks["CHOCOLATE"])
+            self.logger.order("CHOCOLATE", best_asks["CHOCOLATE"], limit_mult, positions["CHOCOLATE"], chocolate_rolling_mean_fast, chocolate_rolling_mean)
             orders["CHOCOLATE"].append(Order("CHOCOLATE", best_asks["CHOCOLATE"], limit_mult))
 
-        elif chocolate_rolling_mean_fast < chocolate_rolling_mean - 1.5:
+        elif chocolate_rolling_mean_fast < chocolate_rolling_mean - self.chocolate_band:
 
             # Fixed entry every timestep, max-ing out early
-            limit_mult = -12
+            limit_mult = -self.chocolate_entry
 
             limit_mult = max(limit_mult, -self.POSITION_LIMITS["CHOCOLATE"] - positions["CHOCOLATE"],
                              -self.POSITION_LIMITS["CHOCOLATE"])
 
-            print("CHOCOLATE positions:", positions["CHOCOLATE"])
-            print("SELL", "CHOCOLATE", str(limit_mult) + "x", best_bids["CHOCOLATE"])
+            self.logger.order("CHOCOLATE", best_bids["CHOCOLATE"], limit_mult, positions["CHOCOLATE"], chocolate_rolling_mean_fast, chocolate_rolling_mean)
             orders["CHOCOLATE"].append(Order("CHOCOLATE", best_bids["CHOCOLATE"], limit_mult))
 
         return orders
 
     def compute_strawberries_orders(self, state: TradingState):
-        products = ["STRAWBERRIES"]
-        positions, buy_orders, sell_orders, best_bids, best_asks, prices, orders = {}, {}, {}, {}, {}, {}, {
+        snapshot = self.snapshot
+        positions, buy_orders, sell_orders = snapshot.position, snapshot.buy_orders, snapshot.sell_orders
+        best_bids, best_asks, prices = snapshot.best_bid, snapshot.best_ask, snapshot.mid
+        orders = {
             "STRAWBERRIES": []}
 
-        for product in products:
-            positions[product] = state.position[product] if product in state.position else 0
-
-            buy_orders[product] = state.order_depths[product].buy_orders
-            sell_orders[product] = state.order_depths[product].sell_orders
-
-            best_bids[product] = max(buy_orders[product].keys())
-            best_asks[product] = min(sell_orders[product].keys())
-
-            prices[product] = (best_bids[product] + best_asks[product]) / 2.0
-
         self.strawberries_returns.append(prices["STRAWBERRIES"])
 
         if len(self.strawberries_returns) < 100:
             return orders
 
         # Slow moving average
-        strawberries_rolling_mean = statistics.fmean(self.strawberries_returns[-200:])
+        strawberries_rolling_mean = self.strawberries_returns.mean(200)
         # Fast moving average
-        strawberries_rolling_mean_fast = statistics.fmean(self.strawberries_returns[-100:])
+        strawberries_rolling_mean_fast = self.strawberries_returns.mean(100)
+
+        self.logger.log(Logger.DEBUG, "STRAWBERRIES", "SIGNAL", None, None, strawberries_rolling_mean_fast, strawberries_rolling_mean)
 
         # Empirically tuned to avoid noisy buy and sell signals - do nothing if sideways market
-        if strawberries_rolling_mean_fast > strawberries_rolling_mean + 1.5:
+        if strawberries_rolling_mean_fast > strawberries_rolling_mean + self.strawberries_band:
 
             # Fixed entry every timestep that criteria is met, max-ing out early
-            limit_mult = 18
+            limit_mult = self.strawberries_entry
 
             limit_mult = min(limit_mult, self.POSITION_LIMITS["STRAWBERRIES"] - positions["STRAWBERRIES"],
                              self.POSITION_LIMITS["STRAWBERRIES"])
 
-            print("STRAWBERRIES positions:", positions["STRAWBERRIES"])
-            print("BUY", "STRAWBERRIES", str(limit_mult) + "x", best_asks["STRAWBERRIES"])
+            self.logger.order("STRAWBERRIES", best_asks["STRAWBERRIES"], limit_mult, positions["STRAWBERRIES"], strawberries_rolling_mean_fast, strawberries_rolling_mean)
             orders["STRAWBERRIES"].append(Order("STRAWBERRIES", best_asks["STRAWBERRIES"], limit_mult))
 
-        elif strawberries_rolling_mean_fast < strawberries_rolling_mean - 1.5:
+        elif strawberries_rolling_mean_fast < strawberries_rolling_mean - self.strawberries_band:
 
             # Fixed entry every timestep, max-ing out early
-            limit_mult = -18
+            limit_mult = -self.strawberries_entry
 
             limit_mult = max(limit_mult, -self.POSITION_LIMITS["STRAWBERRIES"] - positions["STRAWBERRIES"],
                              -self.POSITION_LIMITS["STRAWBERRIES"])
 
-            print("STRAWBERRIES positions:", positions["STRAWBERRIES"])
-            print("SELL", "STRAWBERRIES", str(limit_mult) + "x", best_bids["STRAWBERRIES"])
+            self.logger.order("STRAWBERRIES", best_bids["STRAWBERRIES"], limit_mult, positions["STRAWBERRIES"], strawberries_rolling_mean_fast, strawberries_rolling_mean)
             orders["STRAWBERRIES"].append(Order("STRAWBERRIES", best_bids["STRAWBERRIES"], limit_mult))
 
         return orders
 
+    def compute_coconut_hedge_orders(self, state: TradingState):
+        # Delta of the positions held going into the tick, with the coupon's delta at the fixed vol
+        snapshot = self.snapshot
+        coupon_position = snapshot.position["COCONUT_COUPON"]
+        coconut_position = snapshot.position["COCONUT"]
+        book = snapshot.books["COCONUT"]
+        if book.mid is None:
+            return []
+        delta = coupon_position * self.coconut_call.delta(book.mid) + coconut_position
+
+        orders = self.hedger.orders(book, coconut_position, delta)
+        for order in orders:
+            self.logger.order("COCONUT", order.price, order.quantity, coconut_position, delta)
+        return orders
+
     def compute_coconut_orders(self, state: TradingState):
-        products = ["COCONUT"]
-        positions, buy_orders, sell_orders, best_bids, best_asks, prices, orders = {}, {}, {}, {}, {}, {}, {
+        snapshot = self.snapshot
+        positions, buy_orders, sell_orders = snapshot.position, snapshot.buy_orders, snapshot.sell_orders
+        best_bids, best_asks, prices = snapshot.best_bid, snapshot.best_ask, snapshot.mid
+        orders = {
             "COCONUT": []}
 
-        for product in products:
-            positions[product] = state.position[product] if product in state.position else 0
-
-            buy_orders[product] = state.order_depths[product].buy_orders
-            sell_orders[product] = state.order_depths[product].sell_orders
-
-            best_bids[product] = max(buy_orders[product].keys())
-            best_asks[product] = min(sell_orders[product].keys())
-
-            prices[product] = (best_bids[product] + best_asks[product]) / 2.0
-
         self.coconut_returns.append(prices["COCONUT"])
 
         if len(self.coconut_returns) < 100:
             return orders
 
         # Slow moving average
-        coconut_rolling_mean = statistics.fmean(self.coconut_returns[-200:])
+        coconut_rolling_mean = self.coconut_returns.mean(200)
         # Fast moving average
-        coconut_rolling_mean_fast = statistics.fmean(self.coconut_returns[-100:])
+        coconut_rolling_mean_fast = self.coconut_returns.mean(100)
+
+        self.logger.log(Logger.DEBUG, "COCONUT", "SIGNAL", None, None, coconut_rolling_mean_fast, coconut_rolling_mean)
 
         # Empirically tuned to avoid noisy buy and sell signals - do nothing if sideways market
-        if coconut_rolling_mean_fast > coconut_rolling_mean + 4:
+        if coconut_rolling_mean_fast > coconut_rolling_mean + self.coconut_band:
 
             # Fixed entry every timestep that criteria is met, max-ing out early
-            limit_mult = 30
+            limit_mult = self.coconut_entry
 
             limit_mult = min(limit_mult, self.POSITION_LIMITS["COCONUT"] - positions["COCONUT"],
                              self.POSITION_LIMITS["COCONUT"])
 
-            print("COCONUT positions:", positions["COCONUT"])
-            print("BUY", "COCONUT", str(limit_mult) + "x", best_asks["COCONUT"])
+            self.logger.order("COCONUT", best_asks["COCONUT"], limit_mult, positions["COCONUT"], coconut_rolling_mean_fast, coconut_rolling_mean)
             orders["COCONUT"].append(Order("COCONUT", best_asks["COCONUT"], limit_mult))
 
-        elif coconut_rolling_mean_fast < coconut_rolling_mean - 4:
+        elif coconut_rolling_mean_fast < coconut_rolling_mean - self.coconut_band:
 
             # Fixed entry every timestep, max-ing out early
-            limit_mult = -30
+            limit_mult = -self.coconut_entry
 
             limit_mult = max(limit_mult, -self.POSITION_LIMITS["COCONUT"] - positions["COCONUT"],
                              -self.POSITION_LIMITS["COCONUT"])
 
-            print("COCONUT positions:", positions["COCONUT"])
-            print("SELL", "COCONUT", str(limit_mult) + "x", best_bids["COCONUT"])
+            self.logger.order("COCONUT", best_bids["COCONUT"], limit_mult, positions["COCONUT"], coconut_rolling_mean_fast, coconut_rolling_mean)
             orders["COCONUT"].append(Order("COCONUT", best_bids["COCONUT"], limit_mult))
 
         return orders
 
+    @classmethod
+    def hedged_products(cls) -> Dict[str, List[str]]:
+        # Hedged product -> products hedging it, the backtester reports their pnl with and without the hedge
+        return {"COCONUT_COUPON": ["COCONUT"]} if cls.coconut_hedge_band is not None else {}
+
+    @property
+    def hedger(self) -> DeltaHedger:
+        if "_hedger" not in self.__dict__:
+            self._hedger = DeltaHedger("COCONUT", self.coconut_hedge_band, self.POSITION_LIMITS["COCONUT"])
+        return self._hedger
+
+    @property
+    def handlers(self) -> List[Strategy]:
+        # One instance per active strategy, made on the first tick
+        if "_handlers" not in self.__dict__:
+            self._handlers = [strategy(self) for strategy in self.strategies if strategy.active(self)]
+        return self._handlers
+
+    @property
+    def profiler(self) -> Profiler:
+        if "_profiler" not in self.__dict__:
+            self._profiler = Profiler(self.profile == "memory") if self.profile else None
+        return self._profiler
+
+    @property
+    def features(self) -> FeatureEngine:
+        if "_features" not in self.__dict__:
+            self._features = FeatureEngine()
+        return self._features
+
+    @property
+    def logger(self) -> Logger:
+        if "_logger" not in self.__dict__:
+            self._logger = Logger(self.log_level, self.log_max_bytes)
+        return self._logger
+
+    @property
+    def trader_state(self) -> TraderState:
+        # Fresh, empty state until unmarshalTraderData loads the tick's traderData
+        if "_trader_state" not in self.__dict__:
+            self._trader_state = TraderState(TraderState.fields_of(type(self)), self.codec)
+        return self._trader_state
+
     def marshalTraderData(self) -> str: 
-        return json.dumps({"starfruit_cache": self.starfruit_cache, "starfruit_spread_cache": self.starfruit_spread_cache, "orchid_cache": self.orchid_cache, "orchid_spread_cache": [], "sunlight_cache": self.sunlight_cache, "humidity_cache": self.humidity_cache, "etf_returns": self.etf_returns, "assets_returns": self.assets_returns, "strawberries_returns": self.strawberries_returns, "strawberries_estimated_returns": self.strawberries_estimated_returns, "chocolate_returns": self.chocolate_returns, "chocolate_estimated_returns": self.chocolate_estimated_returns, "roses_returns": self.roses_returns, "roses_estimated_returns": self.roses_estimated_returns, "coconut_coupon_returns": self.coconut_coupon_returns, "coconut_coupon_bsm_returns": self.coconut_coupon_bsm_returns, "coconut_returns": self.coconut_returns, "coconut_estimated_returns": self.coconut_estimated_returns, "rhianna_buy": self.rhianna_buy, "rhianna_trade_before": self.rhianna_trade_before})
+        return self.trader_state.encode()
 
     def unmarshalTraderData(self, state: TradingState): 
-        if not state.traderData:
-            state.traderData = json.dumps({"starfruit_cache": [], "starfruit_spread_cache": [], "orchid_cache": [], "orchid_spread_cache": [], "sunlight_cache": [], "humidity_cache": [], "etf_returns": [], "assets_returns": [], "strawberries_returns": [], "strawberries_estimated_returns": [], "chocolate_returns": [], "chocolate_estimated_returns": [], "roses_returns": [], "roses_estimated_returns": [], "coconut_coupon_returns": [], "coconut_coupon_bsm_returns": [], "coconut_returns": [], "coconut_estimated_returns": [], "rhianna_buy": False, "rhianna_trade_before": False})
-        
-        traderDataDict = json.loads(state.traderData)
-        self.starfruit_cache = traderDataDict["starfruit_cache"]
-        self.starfruit_spread_cache = traderDataDict["starfruit_spread_cache"]
-        
-        self.orchid_cache = traderDataDict["orchid_cache"]
-        self.orchid_spread_cache = traderDataDict["orchid_spread_cache"]
-        self.sunlight_cache = traderDataDict["sunlight_cache"]
-        self.humidity_cache = traderDataDict["humidity_cache"]
-
-        self.etf_returns = traderDataDict["etf_returns"]
-        self.assets_returns = traderDataDict["assets_returns"]
-        self.chocolate_returns = traderDataDict["chocolate_returns"]
-        self.chocolate_estimated_returns = traderDataDict["chocolate_estimated_returns"]
-        self.strawberries_returns = traderDataDict["strawberries_returns"]
-        self.strawberries_estimated_returns = traderDataDict["strawberries_estimated_returns"]
-        self.roses_returns = traderDataDict["roses_returns"]
-        self.roses_estimated_returns = traderDataDict["roses_estimated_returns"]
-
-        self.coconut_returns = traderDataDict["coconut_returns"]
-        self.coconut_estimated_returns = traderDataDict["coconut_estimated_returns"]
-        self.coconut_coupon_returns = traderDataDict["coconut_coupon_returns"]
-        self.coconut_coupon_bsm_returns = traderDataDict["coconut_coupon_bsm_returns"]
-
-        self.rhianna_buy = traderDataDict["rhianna_buy"]
-        self.rhianna_trade_before = traderDataDict["rhianna_trade_before"]
+        self._trader_state = TraderState.decode(TraderState.fields_of(type(self)), self.codec, state.traderData)
 
     def run(self, state: TradingState):
         # Update positions
         for product, position in state.position.items():
             self.positions[product] = position
 
+        # None unless profiling, then each section below is timed on its own
+        profiler = self.profiler
+
         # initialize the caches
+        if profiler is not None:
+            start = profiler.start()
         self.unmarshalTraderData(state)
-
-        result = {}
-
-        for product in state.order_depths:
-            order_depth: OrderDepth = state.order_depths[product]
-            orders: List[Order] = []
-
-            best_market_ask = min(order_depth.sell_orders.keys())
-            best_market_bid = max(order_depth.buy_orders.keys())
-
-            # market_price = (best_market_ask + best_market_bid) / 2
-            market_price = self.compute_vwap(order_depth)
-
-            conversions = 0
-
-            if product == "AMETHYSTS":
-                acceptable_price = 10000  # Eyeball graph
-
-                cur_position = self.positions[product]
-
-                # Market make
-                for ask, vol in order_depth.sell_orders.items():
-                    # Check if asking price is below 
-                    if ((ask < acceptable_price) or ((self.positions[product] < 0) and (ask == acceptable_price))) and cur_position < self.POSITION_LIMITS[product]:
-                        order_vol = min(-vol, self.POSITION_LIMITS[product] - cur_position)
-                        cur_position += order_vol
-                        # print("BUY", product, str(order_vol) + "x", ask)
-                        orders.append(Order(product, ask, order_vol))
-
-                # Derived from actual AMETHYSTS prices from previous iteration
-                undercut_market_ask = best_market_ask - 1
-                undercut_market_bid = best_market_bid + 1
-
-                # Spread = 1
-                own_ask = max(undercut_market_ask, acceptable_price + 1)
-                own_bid = min(undercut_market_bid, acceptable_price - 1)
-
-                # Market take
-                if cur_position < self.POSITION_LIMITS[product]:
-                    # Current position is short
-                    if self.positions[product] < 0:
-                        # We want to try to balance position, give less aggressive bid
-                        ask = min(undercut_market_bid + 1, acceptable_price - 1)
-                    # Current position is long, close to limit
-                    elif self.positions[product] > 15:
-                        # Close to limit, don't need that many more, can give more aggressive bid
-                        ask = min(undercut_market_bid - 1, acceptable_price - 1)
-                    # Current position is long, not close to limit
-                    else:
-                        ask = own_bid
-
-                    order_vol = min(self.POSITION_LIMITS[product], self.POSITION_LIMITS[product] - cur_position)
-                    cur_position += order_vol
-                    # print("BUY", product, str(order_vol) + "x", ask)
-                    orders.append(Order(product, ask, order_vol))
-
-                cur_position = self.positions[product]
-
-                # Market make
-                for bid, vol in order_depth.buy_orders.items():
-                    if ((bid > acceptable_price) or ((self.positions[product] > 0) and (bid == acceptable_price))) and cur_position > -self.POSITION_LIMITS[product]:
-                        order_vol = max(-vol, -self.POSITION_LIMITS[product] - cur_position)
-                        cur_position += order_vol
-                        # print("SELL", product, str(order_vol) + "x", bid)
-                        orders.append(Order(product, bid, order_vol))
-
-                # Market take
-                if cur_position > -self.POSITION_LIMITS[product]:
-                    if self.positions[product] < 0:
-                        bid = max(undercut_market_ask - 1, acceptable_price + 1)
-                    elif self.positions[product] < -15:
-                        bid = max(undercut_market_ask + 1, acceptable_price + 1)
-                    else:
-                        bid = own_ask
-
-                    order_vol = max(-self.POSITION_LIMITS[product], -self.POSITION_LIMITS[product] - cur_position)
-                    cur_position += order_vol
-                    # print("SELL", product, str(order_vol) + "x", bid)
-                    orders.append(Order(product, bid, order_vol))
-
-            elif product == "STARFRUIT":
-                # Pop oldest value from starfruit_cache if full
-                if len(self.starfruit_cache) == 4:
-                    self.starfruit_cache.pop(0)
-
-                # Cache STARFRUIT prices
-                self.starfruit_cache.append(market_price)
-                # print(self.starfruit_cache)
-
-                if len(self.starfruit_spread_cache) == 4:
-                    self.starfruit_spread_cache.pop(0)
-
-                # Cache spread of STARFRUIT orders
-                self.starfruit_spread_cache.append(best_market_ask - best_market_bid)
-
-                # Estimate price via linear regression
-                if len(self.starfruit_cache) == 4:
-                    # acceptable_price = self.compute_starfruit_price()
-                    # print(acceptable_price)
-                    acceptable_price = round(statistics.fmean(self.starfruit_cache[-5:]))
-                    spread = round(statistics.fmean(self.starfruit_spread_cache[-5:]))
-
-                    lower_bound = acceptable_price - (spread // 2)
-                    upper_bound = acceptable_price + (spread // 2)
-                    # lower_bound = acceptable_price - 1
-                    # upper_bound = acceptable_price + 1
+        if profiler is not None:
+            profiler.stop("unmarshalTraderData", start)
+
+        self.logger.start(state.timestamp)
+        if self.log_state_every and state.timestamp // 100 % self.log_state_every == 0:
+            print(json.dumps([state.timestamp, state.traderData, [], [], [], [], [item for pair in state.position.items() for item in pair], [], []], separators=(",", ":")))
+
+        if profiler is not None:
+            start = profiler.start()
+        self.snapshot = snapshot = MarketSnapshot(state, self.features)
+        if profiler is not None:
+            profiler.stop("MarketSnapshot", start)
+
+        # Products whose books have both sides. A one-sided book has no mid or VWAP, the
+        # strategies that need it sit the tick out while the others trade as usual.
+        present = set()
+        for product, vwap in snapshot.vwap.items():
+            if vwap is None:
+                self.logger.log(Logger.WARNING, product, "NO_VWAP")
+            else:
+                present.add(product)
+
+        result = {product: [] for product in state.order_depths}
+        conversions = 0
+
+        for handler in self.handlers:
+            if present.issuperset(handler.requires):
+                if profiler is None:
+                    result.update(handler.orders(state))
                 else:
-                    # spread = int(1e9)
-                    lower_bound = -int(1e9)
-                    upper_bound = int(1e9)
+                    start = profiler.start()
+                    result.update(handler.orders(state))
+                    profiler.stop(handler.name, start)
+                conversions += handler.conversions
 
-                cur_position = self.positions[product]
-
-                # Construct buy orders
-                for ask, vol in order_depth.sell_orders.items():
-                    if ((ask <= lower_bound) or ((self.positions[product] < 0) and (ask <= lower_bound + (spread // 2)))) and cur_position < self.POSITION_LIMITS[product]:
-                    # if ((ask <= lower_bound) or ((self.positions[product] < 0) and (ask == lower_bound + 1))) and cur_position < self.POSITION_LIMITS[product]:
-                        order_vol = min(-vol, self.POSITION_LIMITS[product] - cur_position)
-                        cur_position += order_vol
-                        #print("BUY", product, str(order_vol) + "x", ask)
-                        orders.append(Order(product, ask, order_vol))
-
-                undercut_market_ask = best_market_ask - 1
-                undercut_market_bid = best_market_bid + 1
-
-                # Spread = 1
-                own_ask = max(undercut_market_ask, upper_bound)
-                own_bid = min(undercut_market_bid, lower_bound)
-
-                # Market take
-                if cur_position < self.POSITION_LIMITS[product]:
-                    order_vol = self.POSITION_LIMITS[product] - cur_position
-                    cur_position += order_vol
-                    #print("BUY", product, str(order_vol) + "x", own_bid)
-                    orders.append(Order(product, own_bid, order_vol))
-
-                cur_position = self.positions[product]
-
-                # Construct sell orders
-                for bid, vol in order_depth.buy_orders.items():
-                    if ((bid >= upper_bound) or ((self.positions[product] > 0) and (bid >= upper_bound - (spread // 2)))) and cur_position > -self.POSITION_LIMITS[product]:
-                    # if ((bid >= upper_bound) or ((self.positions[product] > 0) and (bid == upper_bound - 1))) and cur_position > -self.POSITION_LIMITS[product]:
-                        order_vol = max(-vol, -self.POSITION_LIMITS[product] - cur_position)
-                        cur_position += order_vol
-                        #print("SELL", product, str(order_vol) + "x", bid)
-                        orders.append(Order(product, bid, order_vol))
-
-                if cur_position > -self.POSITION_LIMITS[product]:
-                    order_vol = max(-self.POSITION_LIMITS[product], -self.POSITION_LIMITS[product] - cur_position)
-                    cur_position += order_vol
-                    #print("SELL", product, str(order_vol) + "x", own_ask)
-                    orders.append(Order(product, own_ask, order_vol))
-
-            # sunlight less than 7 hour, production decrease 4% for every 10 min
-            # humidity ideal 60 - 80, outside fall 2% for every 5% humidity change
-            # import / export tariff
-            # storage costs per timestamp: 0.1 seashell
-
-            # each day (1000000 timesteps) = 12 hours
-
-            """
-            # orchid quality does not deteriorate overnight
-            elif product == "ORCHIDS":
-                if len(self.orchid_cache) == 4:
-                    self.orchid_cache.pop(0)
-
-                self.orchid_cache.append(market_price)
-
-                if len(self.orchid_spread_cache) == 4:
-                    self.orchid_spread_cache.pop(0)
-
-                self.orchid_spread_cache.append(best_market_ask - best_market_bid)
-
-                conversion_observations = state.observations.conversionObservations[product]
-
-                if len(self.sunlight_cache) == 4:
-                    self.sunlight_cache.pop(0)
-
-                self.sunlight_cache.append(conversion_observations.sunlight)
-
-                if len(self.humidity_cache) == 4:
-                    self.humidity_cache.pop(0)
-
-                self.humidity_cache.append(conversion_observations.humidity)
+        if profiler is not None:
+            start = profiler.start()
+        traderData = self.marshalTraderData()
+        if profiler is not None:
+            profiler.stop("marshalTraderData", start)
 
-                if len(self.orchid_cache) == 4:
-                    acceptable_price = self.compute_orchid_price()
-                    spread = round(statistics.fmean(self.orchid_spread_cache[-5:]))
+            profiler.ticks += 1
+            if self.profile_log_every and profiler.ticks % self.profile_log_every == 0:
+                profiler.log(self.logger)
 
-                    lower_bound = acceptable_price - (spread // 2)
-                    upper_bound = acceptable_price + (spread // 2)
-                    # lower_bound = acceptable_price - 1
-                    # upper_bound = acceptable_price + 1
-                else:
-                    continue
-
-                own_trades = state.own_trades[product] if product in state.own_trades else []
-
-                # Re-calculate cost_basis
-                # if len(own_trades) != 0:
-                #     self.shorted_orchid = 0
-
-                #     new_cost_basis, new_quantity = 0, 0
-
-                #     for trade in own_trades:
-                #         if trade.seller == "SUBMISSION" and trade.timestamp > self.orchid_last_trade:
-                #             print(trade)
-                #             new_cost_basis += trade.price * trade.quantity
-                #             new_quantity += trade.quantity
-
-                #     self.orchid_last_trade = own_trades[0].timestamp
-
-                #     old_quantity = new_quantity - self.positions[product]
-                #     new_cost_basis += abs(self.orchid_cost_basis) * old_quantity
-                #     new_cost_basis /= self.positions[product]
-                #     self.orchid_cost_basis = new_cost_basis
-
-                # own_trades = state.own_trades[product] if product in state.own_trades else []
-                # cost_basis, traded_quantity = 0, 0
-
-                cost_basis, traded_quantity = 0, 0
-                for trade in own_trades:
-                    # Long orchids
-                    if trade.buyer == "SUBMISSION":
-                        cost_basis += trade.price * trade.quantity
-                        traded_quantity += trade.quantity
-                    # Short orchids
-                    else:
-                        cost_basis -= trade.price * trade.quantity
-                        traded_quantity += trade.quantity
-
-                if traded_quantity > 0:
-                    cost_basis /= traded_quantity
-                # print("COST_BASIS", cost_basis)
-
-                cur_position = self.positions[product]
-                # print("POSITION", product, cur_position)
-
-                # print("CONVERSION_BID", conversion_observations.bidPrice - conversion_observations.exportTariff)
-                # print("CONVERSION_ASK", conversion_observations.askPrice + conversion_observations.importTariff)
-                # print("TRANSPORT_FEES", conversion_observations.transportFees)
-                # Construct conversions
-                if cur_position != 0:
-                    # Export conversions
-                    if cur_position > 0:
-                        conversion_bid = conversion_observations.bidPrice - conversion_observations.exportTariff
-                        if conversion_bid - (conversion_observations.transportFees / cur_position) >= cost_basis:
-                            # print("EXPORT", product, str(cur_position) + "x", conversion_bid)
-                            conversions = cur_position
-                            cur_position = 0 # All current positions converted
-
-                    # Import conversions
-                    else:
-                        conversion_ask = conversion_observations.askPrice + conversion_observations.importTariff
-                        if conversion_ask + (conversion_observations.transportFees / cur_position) <= -cost_basis:
-                            # print("IMPORT", product, str(cur_position) + "x", conversion_ask)
-                            conversions = -cur_position
-                            cur_position = 0 # All current positions converted
-
-                # Construct buy orders
-                for ask, vol in order_depth.sell_orders.items():
-                    # print("ASK", ask, "VOL", vol)
-                    # if ((ask <= lower_bound) or ((self.positions[product] < 0) and (ask <= lower_bound + (spread // 2)))) and cur_position < self.POSITION_LIMITS[product]:
-                    # if ((ask <= lower_bound) or ((self.positions[product] < 0) and (ask == lower_bound + 1))) and cur_position < self.POSITION_LIMITS[product]:
-                    if (ask < cost_basis) and (cur_position < self.POSITION_LIMITS[product]):
-                        order_vol = min(-vol, self.POSITION_LIMITS[product] - cur_position)
-                        cur_position += order_vol
-                        # print("BUY", product, str(order_vol) + "x", ask)
-                        orders.append(Order(product, ask, order_vol))
-
-                undercut_market_ask = best_market_ask - 1
-                undercut_market_bid = best_market_bid + 1
-
-                # Spread = 1
-                own_ask = max(undercut_market_ask, upper_bound)
-                own_bid = min(undercut_market_bid, lower_bound)
-
-                # Market take
-                # if cur_position < self.POSITION_LIMITS[product]:
-                #     order_vol = self.POSITION_LIMITS[product] - cur_position
-                #     cur_position += order_vol
-                #     print("BUY", product, str(order_vol) + "x", undercut_market_bid)
-                #     orders.append(Order(product, undercut_market_bid, order_vol))
-
-                cur_position = self.positions[product]
-
-                # Construct sell orders
-                for bid, vol in order_depth.buy_orders.items():
-                    # print("BID", ask, "VOL", vol)
-                    if ((bid >= upper_bound) or ((self.positions[product] > 0) and (bid >= upper_bound - (spread // 2)))) and cur_position > -self.POSITION_LIMITS[product]:
-                    # if ((bid >= upper_bound) or ((self.positions[product] > 0) and (bid == upper_bound - 1))) and cur_position > -self.POSITION_LIMITS[product]:
-                        order_vol = max(-vol, -self.POSITION_LIMITS[product] - cur_position)
-                        cur_position += order_vol
-                        # print("SELL", product, str(order_vol) + "x", bid)
-                        orders.append(Order(product, bid, order_vol))
-
-                if cur_position > -self.POSITION_LIMITS[product]:
-                    order_vol = max(-self.POSITION_LIMITS[product], -self.POSITION_LIMITS[product] - cur_position)
-                    # order_vol = max(int(0.05 * -self.POSITION_LIMITS[product]), -self.POSITION_LIMITS[product] - cur_position) # Buy at most 5% of POSITION_LIMITS
-                    cur_position += order_vol
-                    # print("SELL", product, str(order_vol) + "x", undercut_market_ask)
-                    orders.append(Order(product, undercut_market_ask, order_vol))
-            """
-
-            result[product] = orders
-
-        # 6 strawberry, 4 choc and 1 rose in 1 basket
-        # treasure chest 7500 seashells each
-        # basket_orders = self.compute_basket_orders(state.order_depths)
-        basket_orders = self.compute_basket_orders3(state)
-
-        for product, orders in basket_orders.items():
-            result[product] = orders
-
-        coconut_coupon_orders = self.compute_coconut_coupon_orders(state)
-
-        for product, orders in coconut_coupon_orders.items():
-            result[product] = orders
-
-        result["ROSES"] = self.compute_roses_orders(state)
-
-        chocolate_orders = self.compute_chocolate_orders(state)
-
-        for product, orders in chocolate_orders.items():
-            result[product] = orders
-
-        strawberries_orders = self.compute_strawberries_orders(state)
-
-        for product, orders in strawberries_orders.items():
-            result[product] = orders
-
-        coconut_orders = self.compute_coconut_orders(state)
-
-        for product, orders in coconut_orders.items():
-            result[product] = orders
-
-        traderData = self.marshalTraderData()
+        self.logger.flush()
 
         return result, conversions, traderData
 
-
 if __name__ == '__main__':
     """
     N = statistics.NormalDist(mu=0, sigma=1)
@@ -0,0 +1,190 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+import backtester
+import data_cache
+
+# Grid search over a strategy's Trader class attributes, e.g. the round 5 thresholds:
+#   python sweep.py round5-joshlee.py 3+4 --param basket_band=2,4,6 --param coconut_coupon_iv_z=0.8,1.2,1.6
+#   python sweep.py round5-joshlee.py 3+4 --grid grid.json      ({"basket_band": [2, 4, 6], ...})
+# Every (combination, day) is one task on a process pool. Workers replay from the memory-mapped
+# data_cache arrays, so they share one copy of the market data through the page cache. Each
+# finished task is appended to --out as a JSON line, rerunning the same command skips those.
+# Lines carry the run's configuration (strategy file and its content hash, rounds, --names,
+# --passive, --budget-ms), so a rerun with any of them changed runs its tasks again instead of
+# reusing results from another setup.
+
+
+def parse_value(text: str):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    if text in ("True", "False"):
+        return text == "True"
+    if text == "None":
+        return None
+    return text
+
+
+def parse_grid(grid_path: str = None, params: List[str] = ()) -> Dict[str, list]:
+    grid = {}
+    if grid_path:
+        with open(grid_path) as f:
+            grid.update(json.load(f))
+    for param in params:
+        name, _, values = param.partition("=")
+        grid[name] = [parse_value(value) for value in values.split(",")]
+    return grid
+
+
+def combinations(grid: Dict[str, list]) -> List[Dict]:
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*[grid[name] for name in names])]
+
+
+def sweep_config(strategy_path: str, rounds: List[int], names: bool, passive: bool, budget_ms: float) -> Dict:
+    # Everything besides params and day that changes a task's result
+    with open(strategy_path, "rb") as f:
+        strategy_hash = hashlib.sha1(f.read()).hexdigest()
+    return {"strategy": os.path.abspath(strategy_path), "strategy_sha1": strategy_hash, "rounds": rounds, "names": names, "passive": passive, "budget_ms": budget_ms}
+
+
+def task_key(config: Dict, params: Dict, day: int) -> str:
+    return json.dumps({"config": config, "params": params, "day": day}, sort_keys=True)
+
+
+def read_done(out_path: str) -> Dict[str, dict]:
+    # Finished tasks by key, a line cut short by an interrupted run is ignored and redone. Lines
+    # written before the configuration was recorded have none and never match.
+    done = {}
+    if not os.path.exists(out_path):
+        return done
+
+    with open(out_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            done[task_key(result.get("config"), result["params"], result["day"])] = result
+
+    return done
+
+
+_strategies = {}
+
+
+def run_task(strategy_path: str, rounds: List[int], day: int, params: Dict, names: bool, passive: bool, budget_ms: float, config: Dict) -> dict:
+    # Runs in a worker: one day with the params set on a Trader subclass. The strategy file is
+    # loaded once per worker process.
+    if strategy_path not in _strategies:
+        _strategies[strategy_path] = backtester.load_strategy(strategy_path)
+    trader_class = type("SweepTrader", (_strategies[strategy_path].Trader,), dict(params))
+
+    result = backtester.run_backtest(strategy_path, rounds, [day], names, budget_ms, passive, cached=True, trader_class=trader_class)[0]
+    latency = result["latency"]
+
+    return {
+        "config": config,
+        "params": params,
+        "day": day,
+        "pnl": result["pnl"],
+        "max_drawdown": result["max_drawdown"],
+        "pnl_by_product": result["pnl_by_product"],
+        "hedges": result["hedges"],
+        "errors": result["errors"],
+        "ticks": result["ticks"],
+        "seconds": result["seconds"],
+        "p50_ms": latency["p50_ms"],
+        "p99_ms": latency["p99_ms"],
+        "max_ms": latency["max_ms"],
+        "over_budget": len(latency["over_budget"])
+    }
+
+
+def summarise(results: List[dict]) -> List[dict]:
+    # Per combination: total pnl over the days, worst single-day drawdown and latency
+    by_params = {}
+    for result in results:
+        by_params.setdefault(json.dumps(result["params"], sort_keys=True), []).append(result)
+
+    rows = []
+    for days in by_params.values():
+        rows.append({
+            "params": days[0]["params"],
+            "days": len(days),
+            "pnl": sum(day["pnl"] for day in days),
+            "max_drawdown": max(day["max_drawdown"] for day in days),
+            "p99_ms": max(day["p99_ms"] for day in days),
+            "max_ms": max(day["max_ms"] for day in days),
+            "errors": sum(day["errors"] for day in days)
+        })
+
+    return sorted(rows, key=lambda row: row["pnl"], reverse=True)
+
+
+def sweep(strategy_path: str, rounds: List[int], grid: Dict[str, list], days: List[int] = None, out_path: str = "sweep-results.jsonl", workers: int = None,
+          names: bool = False, passive: bool = False, budget_ms: float = backtester.DEFAULT_BUDGET_MS) -> List[dict]:
+    trader_class = backtester.load_strategy(strategy_path).Trader
+    unknown = [name for name in grid if not hasattr(trader_class, name)]
+    if unknown:
+        raise ValueError("Trader has no attribute " + ", ".join(unknown) + ", a typo would silently sweep nothing")
+
+    data_cache.build()
+    all_days = [day for day, _ in backtester.day_streams(rounds, names, cached=True)]
+    days = [day for day in all_days if days is None or day in days]
+
+    config = sweep_config(strategy_path, rounds, names, passive, budget_ms)
+    done = read_done(out_path)
+    tasks = [(params, day) for params in combinations(grid) for day in days]
+    todo = [(params, day) for params, day in tasks if task_key(config, params, day) not in done]
+    print(f"{len(tasks)} tasks, {len(tasks) - len(todo)} already in {out_path}, running {len(todo)} on {workers or os.cpu_count()} workers")
+
+    start = time.perf_counter()
+    with open(out_path, "a") as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_task, strategy_path, rounds, day, params, names, passive, budget_ms, config): (params, day) for params, day in todo}
+
+        for finished, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            # One line per task, flushed right away so an interrupted sweep loses only running tasks
+            out.write(json.dumps(result, sort_keys=True) + "\n")
+            out.flush()
+            done[task_key(config, result["params"], result["day"])] = result
+            print(f"[{finished}/{len(todo)}] {time.perf_counter() - start:.0f}s day {result['day']} {result['params']}: pnl {result['pnl']:.1f}")
+
+    return summarise([done[task_key(config, params, day)] for params, day in tasks])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sweep Trader class attributes over a grid of backtests")
+    parser.add_argument("strategy", help="strategy file, e.g. round5-joshlee.py")
+    parser.add_argument("round", help="round number, or rounds joined with + to replay them together (e.g. 3+4)")
+    parser.add_argument("--grid", help="JSON file of attribute name -> list of values")
+    parser.add_argument("--param", action="append", default=[], help="name=v1,v2,... added to the grid, can be repeated")
+    parser.add_argument("--days", type=int, nargs="*", help="only replay these days (of the first round)")
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to the number of cores")
+    parser.add_argument("--out", default="sweep-results.jsonl", help="results file, also what a rerun resumes from")
+    parser.add_argument("--names", action="store_true", help="use the round 5 trade files, which name buyers and sellers")
+    parser.add_argument("--passive", action="store_true", help="also fill resting orders against the trades printed each tick")
+    parser.add_argument("--budget-ms", type=float, default=backtester.DEFAULT_BUDGET_MS, help="count run() calls slower than this")
+    parser.add_argument("--top", type=int, default=20, help="combinations to print")
+    args = parser.parse_args()
+
+    grid = parse_grid(args.grid, args.param)
+    if not grid:
+        parser.error("give the grid with --grid and/or --param")
+
+    rounds = [int(round_num) for round_num in args.round.split("+")]
+    rows = sweep(args.strategy, rounds, grid, args.days, args.out, args.workers, args.names, args.passive, args.budget_ms)
+
+    print(f"{'pnl':>12} {'drawdown':>10} {'p99 ms':>8} {'max ms':>8} {'errors':>6}  params")
+    for row in rows[:args.top]:
+        print(f"{row['pnl']:>12.1f} {row['max_drawdown']:>10.1f} {row['p99_ms']:>8.3f} {row['max_ms']:>8.3f} {row['errors']:>6}  {json.dumps(row['params'], sort_keys=True)}")
@@ -0,0 +1,98 @@
+import base64
+import os
+
+import pytest
+
+import backtester
+
+# traderData codecs of round5-joshlee.py: every codec reads back what it wrote, and what the
+# others wrote, and TraderState keeps fields it never touched as the raw segments they came in.
+
+strategy = backtester.load_strategy(os.path.join(backtester.ROOT, "round5-joshlee.py"))
+
+CODECS = {
+    "json": strategy.JsonCodec(),
+    "binary": strategy.BinaryCodec(),
+    "binary-zlib": strategy.BinaryCodec(compress=True),
+    "binary-b85": strategy.BinaryCodec(text="b85"),
+    "binary-zlib-b85": strategy.BinaryCodec(compress=True, text="b85"),
+}
+
+DATA = {
+    "none": None,
+    "flags": [True, False],
+    "ints": [0, -1, 2 ** 40, -2 ** 62],
+    "mids": [9999.5, 10000.0, 10000.5],
+    "floats": [0.1, -1e-300, 1e300, 2.0 / 3],
+    "mixed": [1, 2.5, 3],
+    "empty": [],
+    "text": "ROSES é→",
+    "nested": {"a": {"b": [1, "two", [3.25, None]]}, "": 7},
+    "scalar_float": 0.30000000000000004,
+    "scalar_int": -5,
+}
+
+
+@pytest.mark.parametrize("codec", CODECS.values(), ids=CODECS.keys())
+def test_round_trip(codec):
+    assert codec.decode(codec.encode(DATA)) == DATA
+
+
+@pytest.mark.parametrize("codec", CODECS.values(), ids=CODECS.keys())
+def test_fields_round_trip(codec):
+    segments = {name: codec.pack(value) for name, value in DATA.items()}
+    decoded = codec.decode_fields(codec.encode_fields(segments))
+    assert {name: codec.unpack(raw) for name, raw in decoded.items()} == DATA
+
+
+@pytest.mark.parametrize("writer", CODECS.values(), ids=CODECS.keys())
+@pytest.mark.parametrize("reader", CODECS.values(), ids=CODECS.keys())
+def test_reads_every_format(writer, reader):
+    assert reader.decode(writer.encode(DATA)) == DATA
+
+
+def test_binary_reads_version_1():
+    # Version 1 blobs were the whole dict as one TLV value
+    codec = strategy.BinaryCodec()
+    blob = "TD1-4" + base64.b64encode(codec.pack(DATA)).decode("ascii")
+    assert codec.decode(blob) == DATA
+
+
+def test_binary_rejects_unknown_version():
+    with pytest.raises(ValueError):
+        strategy.BinaryCodec().decode("TD9-4")
+
+
+def test_float32_only_when_lossless():
+    codec = strategy.BinaryCodec()
+    assert codec.pack([9999.5, 1.25])[:1] == b"E"
+    assert codec.pack([0.1])[:1] == b"D"
+    assert codec.unpack(strategy.BinaryCodec(float_type="f").pack([0.1]))[0] == pytest.approx(0.1, rel=1e-7)
+
+
+@pytest.mark.parametrize("codec", CODECS.values(), ids=CODECS.keys())
+def test_trader_state_round_trip(codec):
+    fields = {
+        "stats": strategy.StateField("stats", windows=(3, 5)),
+        "median": strategy.StateField("quantile", windows=(5,)),
+        "history": strategy.StateField("list"),
+        "flag": strategy.StateField("value", default=False),
+    }
+    state = strategy.TraderState(fields, codec)
+    for value in (10.0, 10.5, 11.0, 9.5, 12.0, 10.0):
+        state.get("stats").append(value)
+        state.get("median").append(value)
+        state.get("history").append(value)
+    state.set("flag", True)
+    blob = state.encode()
+
+    loaded = strategy.TraderState.decode(fields, codec, blob)
+    assert loaded.get("stats").to_dict() == state.get("stats").to_dict()
+    assert loaded.get("median").value() == state.get("median").value() == 10.5
+    assert loaded.get("history") == state.get("history")
+    assert loaded.get("flag") is True
+
+    # Untouched fields go back out as the segments they arrived in
+    untouched = strategy.TraderState.decode(fields, codec, blob)
+    untouched.get("flag")
+    assert untouched.encode() == blob
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+import data_cache
+
+# build() against a throwaway bottle: rebuilding a changed CSV replaces what the day held.
+
+HEADER = "day;timestamp;product;bid_price_1;bid_volume_1;bid_price_2;bid_volume_2;bid_price_3;bid_volume_3;ask_price_1;ask_volume_1;ask_price_2;ask_volume_2;ask_price_3;ask_volume_3;mid_price;profit_and_loss"
+
+
+def write_prices(root, products):
+    bottle = root / "round-1-island-data-bottle"
+    bottle.mkdir(exist_ok=True)
+    rows = [f"0;{timestamp};{product};99;5;;;;;101;5;;;;;100.0;0.0" for timestamp in (0, 100) for product in products]
+    path = bottle / "prices_round_1_day_0.csv"
+    path.write_text("\n".join([HEADER] + rows) + "\n")
+    # A new mtime even within the filesystem's timestamp resolution
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, "ROOT", str(tmp_path))
+    monkeypatch.setattr(data_cache, "CACHE_DIR", str(tmp_path / "island-data-cache"))
+    monkeypatch.setattr(data_cache, "INDEX_PATH", str(tmp_path / "island-data-cache" / "index.json"))
+    monkeypatch.setattr(data_cache, "_index", None)
+    return tmp_path
+
+
+def test_rebuild_drops_removed_products(cache):
+    write_prices(cache, ["ROSES", "CHOCOLATE"])
+    data_cache.build()
+    assert data_cache.products(1, 0) == ["CHOCOLATE", "ROSES"]
+
+    write_prices(cache, ["ROSES"])
+    data_cache.build()
+    assert data_cache.products(1, 0) == ["ROSES"]
+    assert not os.path.exists(os.path.join(data_cache.day_dir(1, 0), "prices", "CHOCOLATE.npy"))
+    assert data_cache.load_prices(1, 0, "ROSES")["mid_price"].tolist() == [100.0, 100.0]
+
+
+def test_missing_data_raises_key_error(cache):
+    write_prices(cache, ["ROSES"])
+    data_cache.build()
+    with pytest.raises(KeyError, match="CHOCOLATE prices for round 1 day 0"):
+        data_cache.load_prices(1, 0, "CHOCOLATE")
+    with pytest.raises(KeyError, match="observations for round 1 day 0"):
+        data_cache.load_observations(1, 0)
@@ -0,0 +1,88 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+import backtester
+from rolling_quantile import rolling_quantile
+
+# RollingQuantile in round5-joshlee.py against np.quantile over the same trailing window, and
+# the batch rolling_quantile against pandas-style partial windows.
+
+strategy = backtester.load_strategy(os.path.join(backtester.ROOT, "round5-joshlee.py"))
+
+
+def random_prices(rng: random.Random, n: int) -> list:
+    # Half-integer mids from a narrow range, so windows are full of repeated values
+    return [rng.randint(9990, 10010) / 2 for _ in range(n)]
+
+
+@pytest.mark.parametrize("window", [1, 2, 5, 17, 200])
+@pytest.mark.parametrize("q", [0.0, 0.1, 0.25, 0.5, 0.9, 1.0])
+def test_matches_np_quantile(window, q):
+    rng = random.Random(window * 1000 + int(q * 100))
+    values = random_prices(rng, 3 * window + 50)
+    quantile = strategy.RollingQuantile(window, q)
+
+    for idx, value in enumerate(values):
+        quantile.append(value)
+        assert len(quantile) == min(idx + 1, window)
+        assert quantile.value() == pytest.approx(np.quantile(values[max(0, idx + 1 - window):idx + 1], q), abs=1e-9)
+
+
+def test_constant_and_sorted_runs():
+    # Duplicates only, then monotone runs, where one heap takes every new value
+    for values in ([100.0] * 50, [float(value) for value in range(60)], [float(value) for value in range(60, 0, -1)]):
+        quantile = strategy.RollingQuantile(7, 0.5)
+        for idx, value in enumerate(values):
+            quantile.append(value)
+            assert quantile.value() == np.quantile(values[max(0, idx - 6):idx + 1], 0.5)
+
+
+def test_heaps_stay_bounded():
+    window = 10
+    quantile = strategy.RollingQuantile(window, 0.5)
+    for value in random_prices(random.Random(7), 5000):
+        quantile.append(value)
+        assert len(quantile.low) + len(quantile.high) <= 2 * window + 1
+
+
+@pytest.mark.parametrize("codec", [strategy.JsonCodec(), strategy.BinaryCodec(), strategy.BinaryCodec(compress=True, text="b85")],
+                         ids=["json", "binary", "binary-zlib-b85"])
+def test_round_trip_mid_stream(codec):
+    # Reloading from traderData at any tick carries on exactly as if it never stopped
+    window, q = 20, 0.3
+    values = random_prices(random.Random(3), 400)
+    live = strategy.RollingQuantile(window, q)
+    reloaded = strategy.RollingQuantile(window, q)
+
+    for idx, value in enumerate(values):
+        live.append(value)
+        reloaded.append(value)
+        if idx % 13 == 0:
+            reloaded = strategy.RollingQuantile.from_dict(window, q, codec.unpack(codec.pack(reloaded.to_dict())))
+        assert reloaded.value() == live.value()
+
+
+def test_batch_matches_live():
+    values = np.array(random_prices(random.Random(11), 1000))
+    for window, q in [(5, 0.5), (50, 0.1), (200, 0.75)]:
+        batch = rolling_quantile(values, window, q, min_periods=1)
+        live = strategy.RollingQuantile(window, q)
+        for idx, value in enumerate(values.tolist()):
+            live.append(value)
+            assert batch[idx] == pytest.approx(live.value(), abs=1e-9)
+
+
+def test_batch_min_periods_and_center():
+    values = np.arange(10, dtype=np.float64)
+    trailing = rolling_quantile(values, 4, 0.5, min_periods=2)
+    assert np.isnan(trailing[0])
+    assert trailing[1] == 0.5
+    assert trailing[9] == np.quantile(values[6:10], 0.5)
+
+    centered = rolling_quantile(values, 5, 0.5, min_periods=3, center=True)
+    assert centered[0] == np.quantile(values[0:3], 0.5)
+    assert centered[5] == np.quantile(values[3:8], 0.5)
+    assert centered[9] == np.quantile(values[7:10], 0.5)
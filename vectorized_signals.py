@@ -0,0 +1,212 @@
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import backtester
+import data_cache
+
+# Offline, whole-day version of the round 5 moving average crossover strategies
+# (compute_basket_orders3, compute_chocolate_orders, compute_strawberries_orders,
+# compute_coconut_orders). The fast/slow rolling means and buy/sell signals come from one
+# cumsum pass per day, only the position-dependent sizing runs in a loop, so trying a band
+# or entry size costs milliseconds instead of a full replay.
+# Usage: python vectorized_signals.py <strategy file> <round> [--days D ...] [--verify]
+#
+# The fill model is the backtester's default one: the order sits at the best opposite
+# price, so it fills up to the volume of that level.
+
+# Book columns used per product, all int64 except mid
+BOOK_COLUMNS = ["timestamp", "bid_price_1", "bid_volume_1", "ask_price_1", "ask_volume_1"]
+
+
+def load_day(round_days: List[Tuple[int, int]]) -> Dict[str, Dict[str, np.ndarray]]:
+    # product -> {column -> array} for the (round, day) pairs replayed side by side
+    book = {}
+    for round_num, day in round_days:
+        for product in data_cache.products(round_num, day):
+            prices = data_cache.load_prices(round_num, day, product)
+            book[product] = {name: np.asarray(prices[name]) for name in BOOK_COLUMNS}
+
+            # Total visible volume per side, run() skips a product's strategies on ticks where a side has none
+            book[product]["bid_total"] = sum(np.asarray(prices[f"bid_volume_{level}"]) for level in (1, 2, 3))
+            book[product]["ask_total"] = sum(np.asarray(prices[f"ask_volume_{level}"]) for level in (1, 2, 3))
+            book[product]["mid"] = (book[product]["bid_price_1"] + book[product]["ask_price_1"]) / 2.0
+
+    timestamps = [columns["timestamp"] for columns in book.values()]
+    if any(not np.array_equal(timestamps[0], other) for other in timestamps[1:]):
+        raise ValueError("Products of " + str(round_days) + " are not on the same ticks")
+
+    return book
+
+
+def two_sided(book: Dict[str, Dict[str, np.ndarray]], products: Tuple[str, ...]) -> np.ndarray:
+    # Ticks where every one of the products has volume on both book sides, the ticks the live
+    # run() dispatches a strategy requiring them on. Other ticks append nothing to its histories
+    # and send no orders for it.
+    live = np.ones(len(next(iter(book.values()))["timestamp"]), dtype=bool)
+    for product in products:
+        live &= (book[product]["bid_total"] != 0) & (book[product]["ask_total"] != 0)
+    return live
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    # Trailing mean over up to `window` values, shorter at the start like RollingStats.mean.
+    # Mid prices are multiples of 0.5 so the cumsum is exact and matches the live running totals.
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    return (sums[end] - sums[start]) / (end - start)
+
+
+def crossover(values: np.ndarray, band: float, fast: int = 100, slow: int = 200, warmup: int = 100, pushes_per_tick=1) -> np.ndarray:
+    # +1 buy / -1 sell / 0 per tick, from the history each tick appends `pushes_per_tick` copies of
+    # its value to, a number or one per tick (COCONUT is appended twice on ticks where
+    # compute_coconut_coupon_orders runs too)
+    pushes = np.broadcast_to(pushes_per_tick, values.shape)
+    history = np.repeat(values, pushes)
+    # Index of each tick's last value in the history, the one the means are read after
+    last = np.cumsum(pushes) - 1
+    fast_mean = rolling_mean(history, fast)[last]
+    slow_mean = rolling_mean(history, slow)[last]
+
+    signal = np.where(fast_mean > slow_mean + band, 1, np.where(fast_mean < slow_mean - band, -1, 0)).astype(np.int8)
+    # run() returns before looking at the means until the history holds `warmup` values
+    signal[last + 1 < warmup] = 0
+    return signal
+
+
+def signals(book: Dict[str, Dict[str, np.ndarray]], trader_class) -> Dict[str, np.ndarray]:
+    # Signal per tick for each traded product, with the bands read off trader_class
+    basket = ("GIFT_BASKET", "CHOCOLATE", "STRAWBERRIES", "ROSES")
+    per_product = {}
+
+    if all(product in book for product in basket):
+        # Basket history is the basket's premium over its components
+        live = two_sided(book, basket)
+        mids = {product: book[product]["mid"][live] for product in basket}
+        premium = mids["GIFT_BASKET"] - (4.0 * mids["CHOCOLATE"] + 6.0 * mids["STRAWBERRIES"] + mids["ROSES"])
+        per_product["GIFT_BASKET"] = live, crossover(premium, trader_class.basket_band)
+
+    for product, band in (("CHOCOLATE", trader_class.chocolate_band), ("STRAWBERRIES", trader_class.strawberries_band)):
+        if product in book:
+            live = two_sided(book, (product,))
+            per_product[product] = live, crossover(book[product]["mid"][live], band)
+
+    if "COCONUT" in book:
+        live = two_sided(book, ("COCONUT",))
+        pushes = 1 + two_sided(book, ("COCONUT", "COCONUT_COUPON")) if "COCONUT_COUPON" in book else 1
+        per_product["COCONUT"] = live, crossover(book["COCONUT"]["mid"][live], trader_class.coconut_band, pushes_per_tick=np.broadcast_to(pushes, live.shape)[live])
+
+    # Back onto every tick, skipped ones trade nothing
+    result = {}
+    for product, (live, signal) in per_product.items():
+        result[product] = np.zeros(len(live), dtype=np.int8)
+        result[product][live] = signal
+    return result
+
+
+def size_orders(signal: np.ndarray, columns: Dict[str, np.ndarray], entry: int, limit: int) -> Dict[str, np.ndarray]:
+    # The position-dependent part: fixed entry size clipped to the limit, filled against level 1
+    n = len(signal)
+    quantity = np.zeros(n, dtype=np.int64)
+    filled = np.zeros(n, dtype=np.int64)
+    price = np.zeros(n, dtype=np.int64)
+    position = 0
+
+    ask_price, ask_volume = columns["ask_price_1"].tolist(), columns["ask_volume_1"].tolist()
+    bid_price, bid_volume = columns["bid_price_1"].tolist(), columns["bid_volume_1"].tolist()
+
+    for idx in np.flatnonzero(signal).tolist():
+        if signal[idx] > 0:
+            qty = min(entry, limit - position, limit)
+            fill = min(qty, ask_volume[idx])
+            price[idx] = ask_price[idx]
+        else:
+            qty = max(-entry, -limit - position, -limit)
+            fill = max(qty, -bid_volume[idx])
+            price[idx] = bid_price[idx]
+
+        quantity[idx] = qty
+        filled[idx] = fill
+        position += fill
+
+    return {"price": price, "quantity": quantity, "filled": filled}
+
+
+def simulate(book: Dict[str, Dict[str, np.ndarray]], trader_class) -> Dict[str, dict]:
+    # Orders, fills and mark-to-market pnl per product for a whole day
+    limits = backtester.position_limits(trader_class)
+    entries = {"GIFT_BASKET": trader_class.basket_entry, "CHOCOLATE": trader_class.chocolate_entry,
+               "STRAWBERRIES": trader_class.strawberries_entry, "COCONUT": trader_class.coconut_entry}
+    results = {}
+
+    for product, signal in signals(book, trader_class).items():
+        orders = size_orders(signal, book[product], entries[product], limits[product])
+        cash = -np.cumsum(orders["price"] * orders["filled"]).astype(np.float64)
+        position = np.cumsum(orders["filled"])
+        pnl = cash + position * book[product]["mid"]
+
+        orders.update(signal=signal, position=position, pnl=pnl)
+        orders["max_drawdown"] = float(np.max(np.maximum.accumulate(np.maximum(pnl, 0.0)) - pnl))
+        results[product] = orders
+
+    return results
+
+
+def verify(strategy_path: str, round_days: List[Tuple[int, int]], names: bool = False) -> int:
+    # Replays the live Trader over the same ticks and compares its orders and pnl for the
+    # crossover products with simulate(), returns the number of mismatches
+    trader_class = backtester.load_strategy(strategy_path).Trader
+    book = load_day(round_days)
+    simulated = simulate(book, trader_class)
+
+    orders_log = []
+    replay = backtester.replay_day(trader_class(), backtester.iter_cached_ticks(round_days, names), backtester.position_limits(trader_class), orders_log=orders_log)
+    mismatches = 0
+
+    for product, expected in simulated.items():
+        for idx, (timestamp, orders) in enumerate(orders_log):
+            live = [(order.price, order.quantity) for order in (orders or {}).get(product, [])]
+            vectorized = [(int(expected["price"][idx]), int(expected["quantity"][idx]))] if expected["signal"][idx] else []
+            if live != vectorized:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"{product} at {timestamp}: live {live}, vectorized {vectorized}")
+
+        live_pnl, vectorized_pnl = replay["pnl_by_product"].get(product, 0.0), float(expected["pnl"][-1])
+        print(f"{product:<14} live pnl {live_pnl:>10.1f}  vectorized pnl {vectorized_pnl:>10.1f}  orders {int(np.count_nonzero(expected['signal']))}")
+        if live_pnl != vectorized_pnl:
+            mismatches += 1
+
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Whole-day vectorized signals of the round 5 crossover strategies")
+    parser.add_argument("strategy", help="strategy file, e.g. round5-joshlee.py")
+    parser.add_argument("round", help="round number, or rounds joined with + to replay them together (e.g. 3+4)")
+    parser.add_argument("--days", type=int, nargs="*", help="only these days (of the first round)")
+    parser.add_argument("--names", action="store_true", help="verify against the round 5 trade files, which name buyers and sellers")
+    parser.add_argument("--verify", action="store_true", help="check orders and pnl against a live replay of run()")
+    args = parser.parse_args()
+
+    rounds = [int(round_num) for round_num in args.round.split("+")]
+    trader_class = backtester.load_strategy(args.strategy).Trader
+
+    for day_group in zip(*[data_cache.days(round_num) for round_num in rounds]):
+        if args.days is not None and day_group[0] not in args.days:
+            continue
+        round_days = list(zip(rounds, day_group))
+
+        start = time.perf_counter()
+        book = load_day(round_days)
+        results = simulate(book, trader_class)
+        elapsed = time.perf_counter() - start
+
+        print(f"day {day_group[0]}: {elapsed * 1000:.1f}ms, pnl " + ", ".join(f"{product} {float(result['pnl'][-1]):.1f}" for product, result in results.items()))
+
+        if args.verify:
+            mismatches = verify(args.strategy, round_days, args.names)
+            print(f"    {mismatches} mismatches against run()")